@@ -0,0 +1,18 @@
+"""
+ASGI config for moviecomments project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Async versions of API views are served unless ASYNC_VIEWS is set to 0.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviecomments.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
@@ -76,6 +76,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'moviecomments.wsgi.application'
 
+ASGI_APPLICATION = 'moviecomments.asgi.application'
+
+# Async views are routed when served over ASGI, see asgi.py
+ASYNC_VIEWS = bool(int(os.environ.get('ASYNC_VIEWS', default=False)))
+
 
 DATABASES = {
     'default': {
@@ -88,7 +93,9 @@ DATABASES = {
 }
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
-db_from_env = dj_database_url.config(default=DATABASE_URL, conn_max_age=500, ssl_require=True)
+# Under ASGI every request gets its own thread, persistent connections would pile up
+db_from_env = dj_database_url.config(default=DATABASE_URL, conn_max_age=0 if ASYNC_VIEWS else 500,
+                                     ssl_require=True)
 DATABASES['default'].update(db_from_env)
 
 # Password validation
@@ -119,8 +126,6 @@ TIME_ZONE = 'Europe/Warsaw'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 
@@ -129,5 +134,98 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
 OMDB_URL = 'http://www.omdbapi.com'
 OMDB_KEY = os.environ.get('OMDB_KEY', "6e6ef6dd")
+
+# Pagination and streaming of list endpoints
+
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+STREAM_CHUNK_SIZE = 2000
+
+# Seconds clients may reuse lists without revalidating them with ETag or Last-Modified
+
+LIST_CACHE_MAX_AGE = int(os.environ.get('LIST_CACHE_MAX_AGE', 0))
+
+# Caching
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# OMDb responses are cached in a separate, size bounded cache. Backend and location
+# can be changed e.g. to file based or Redis one, to share cached responses between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'top': {
+        'BACKEND': os.environ.get('TOP_CACHE_BACKEND',
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('TOP_CACHE_LOCATION', 'top'),
+    },
+    'omdb': {
+        'BACKEND': os.environ.get('OMDB_CACHE_BACKEND',
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('OMDB_CACHE_LOCATION', 'omdb'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('OMDB_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+OMDB_CACHE = 'omdb'
+OMDB_CACHE_TIMEOUT = int(os.environ.get('OMDB_CACHE_TIMEOUT', 60 * 60 * 24))
+OMDB_CACHE_NOT_FOUND_TIMEOUT = int(os.environ.get('OMDB_CACHE_NOT_FOUND_TIMEOUT', 60 * 60))
+
+# Rankings returned by /top/ are cached by date range and invalidated when comments
+# in the range change. Cache has to be shared by all workers (e.g. Redis) for other
+# workers to see invalidations, otherwise rankings can be outdated for up to timeout.
+# Registry of cached ranges is locked in the same cache, for at most the lock timeout.
+
+TOP_CACHE = 'top'
+TOP_CACHE_TIMEOUT = int(os.environ.get('TOP_CACHE_TIMEOUT', 60))
+TOP_CACHE_MAX_RANGES = int(os.environ.get('TOP_CACHE_MAX_RANGES', 1000))
+TOP_CACHE_LOCK_TIMEOUT = int(os.environ.get('TOP_CACHE_LOCK_TIMEOUT', 5))
+
+# Trending scores of movies, every comment weighs half as much after given number of days,
+# movies with scores below the minimum are left out
+
+TRENDING_HALF_LIFE_DAYS = float(os.environ.get('TRENDING_HALF_LIFE_DAYS', 7))
+TRENDING_MIN_SCORE = float(os.environ.get('TRENDING_MIN_SCORE', 0.01))
+
+# OMDb HTTP client, connections are pooled and kept alive between requests
+
+OMDB_CONNECT_TIMEOUT = float(os.environ.get('OMDB_CONNECT_TIMEOUT', 3.05))
+OMDB_READ_TIMEOUT = float(os.environ.get('OMDB_READ_TIMEOUT', 10))
+OMDB_MAX_RETRIES = int(os.environ.get('OMDB_MAX_RETRIES', 2))
+OMDB_RETRY_BACKOFF = float(os.environ.get('OMDB_RETRY_BACKOFF', 0.3))
+OMDB_POOL_SIZE = int(os.environ.get('OMDB_POOL_SIZE', 10))
+
+# Movies requested concurrently with the same title are created only once. Lock is
+# always held within process, it can be additionally shared between workers with
+# 'database' (PostgreSQL advisory lock) or 'cache' (default cache) value.
+
+MOVIE_CREATION_LOCK = os.environ.get('MOVIE_CREATION_LOCK', 'process')
+MOVIE_CREATION_LOCK_TIMEOUT = int(os.environ.get('MOVIE_CREATION_LOCK_TIMEOUT', 30))
+
+# Bulk import of movies
+
+MOVIE_IMPORT_MAX_ITEMS = int(os.environ.get('MOVIE_IMPORT_MAX_ITEMS', 1000))
+MOVIE_IMPORT_WORKERS = int(os.environ.get('MOVIE_IMPORT_WORKERS', 8))
+MOVIE_IMPORT_BATCH_SIZE = int(os.environ.get('MOVIE_IMPORT_BATCH_SIZE', 100))
+
+# Batches of comments saved with a single POST request
+
+COMMENTS_BATCH_MAX_ITEMS = int(os.environ.get('COMMENTS_BATCH_MAX_ITEMS', 50000))
+
+# Comment timelines, at most that many buckets (over all requested movies) in a response
+
+COMMENT_TIMELINE_MAX_BUCKETS = int(os.environ.get('COMMENT_TIMELINE_MAX_BUCKETS', 10000))
+
+# Asynchronous movie lookups. If enabled, POST /movies/ of a title that isn't saved
+# yet only queues it and returns 202, background worker (process_movie_lookups
+# command) looks it up later. Can be also requested per request with `async` param.
+
+MOVIES_ASYNC_LOOKUPS = bool(int(os.environ.get('MOVIES_ASYNC_LOOKUPS', default=False)))
+MOVIE_LOOKUP_CLAIM_TIMEOUT = int(os.environ.get('MOVIE_LOOKUP_CLAIM_TIMEOUT', 60))
+MOVIE_LOOKUP_MAX_ATTEMPTS = int(os.environ.get('MOVIE_LOOKUP_MAX_ATTEMPTS', 3))
@@ -0,0 +1,21 @@
+""" Used when served over ASGI. Views that don't wait for external services
+stay synchronous and are run in a thread by Django. """
+from django.urls import path
+
+from .views.movies import async_movies, movies_import, movie_lookup
+from .views.comments import async_comments, search_comments, comment_timeline
+from .views.others import async_top, top_cache, top_metrics, trending
+
+app_name = 'moviecommentsapi'
+urlpatterns = [
+    path('movies/', async_movies, name='movies'),
+    path('movies/import/', movies_import, name='movies_import'),
+    path('movies/lookups/<int:lookup_id>/', movie_lookup, name='movie_lookup'),
+    path('comments/', async_comments, name='comments'),
+    path('comments/search/', search_comments, name='search_comments'),
+    path('comments/timeline/', comment_timeline, name='comment_timeline'),
+    path('top/', async_top, name='top'),
+    path('top/cache/', top_cache, name='top_cache'),
+    path('top/metrics/', top_metrics, name='top_metrics'),
+    path('trending/', trending, name='trending'),
+]
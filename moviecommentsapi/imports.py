@@ -0,0 +1,143 @@
+""" Bulk import of movies, given either by titles to be looked up with
+details provider or directly by documents in the same format as OMDb's. """
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from rest_framework.exceptions import APIException
+
+from .models import Movie, Rating, ResourceVersion
+from .ranking_cache import RankingCache
+from .serializers import MovieSerializer
+
+
+class MovieImporter:
+
+    def __init__(self, details_provider_factory, workers=8, batch_size=100):
+        """ details_provider_factory is called for every looked up title, as
+        providers may keep details of a single title only. """
+        self.details_provider_factory = details_provider_factory
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def run(self, items):
+        """ Items are titles or movie documents. Returns report
+        of created and already existing movies and of errors. """
+        report = {"Created": list(), "Existing": list(), "Errors": list()}
+        titles, documents = self.__split(items, report)
+        existing = self.__find_existing(titles)
+        self.__report_existing(existing, report)
+        titles = [t for t in titles if Movie.normalize_title(t) not in existing]
+        documents += self.__fetch_details(titles, report)
+        documents = self.__skip_existing(documents, report)
+        movies = self.__validate(documents, report)
+        for batch in self.__batches(movies):
+            for movie in self.__insert(batch):
+                report["Created"].append({"Id": movie.pk, "Title": movie.title})
+        return report
+
+    def __split(self, items, report):
+        """ Titles and documents, each title and document only once. """
+        titles, documents, seen = list(), list(), set()
+        for item in items:
+            title = item.get("Title") if isinstance(item, dict) else item
+            if not isinstance(title, str) or not title.strip():
+                report["Errors"].append({"Title": title, "message": "no movie title provided"})
+            elif Movie.normalize_title(title) not in seen:
+                seen.add(Movie.normalize_title(title))
+                (documents if isinstance(item, dict) else titles).append(item)
+        return titles, documents
+
+    @staticmethod
+    def __find_existing(titles):
+        """ Ids of saved movies by normalized title, found with a single query
+        that compares titles case-insensitively, like the index of movie titles. """
+        normalized = {Movie.normalize_title(t) for t in titles}
+        if not normalized:
+            return dict()
+        same_title = (Q(title__iexact=" ".join(t.split())) for t in titles)
+        movies = Movie.objects.filter(reduce(or_, same_title)).values_list("pk", "title")
+        return {Movie.normalize_title(title): (pk, title) for pk, title in movies
+                if Movie.normalize_title(title) in normalized}
+
+    @staticmethod
+    def __report_existing(existing, report):
+        for pk, title in existing.values():
+            report["Existing"].append({"Id": pk, "Title": title})
+
+    def __fetch_details(self, titles, report):
+        """ Details are fetched concurrently by bounded pool of workers. """
+        def fetch(title):
+            try:
+                return title, self.details_provider_factory().get_details(title), None
+            except (APIException, ConnectionError) as e:
+                return title, None, str(e)
+
+        documents = list()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for title, details, error in executor.map(fetch, titles):
+                if error:
+                    report["Errors"].append({"Title": title, "message": error})
+                else:
+                    documents.append(details)
+        return documents
+
+    def __skip_existing(self, documents, report):
+        """ Looked up titles may differ from formal ones, which
+        have to be checked against saved movies once again. """
+        existing = self.__find_existing([d["Title"] for d in documents])
+        self.__report_existing(existing, report)
+        unique, seen = list(), set(existing)
+        for document in documents:
+            normalized = Movie.normalize_title(document["Title"])
+            if normalized not in seen:
+                seen.add(normalized)
+                unique.append(document)
+        return unique
+
+    @staticmethod
+    def __validate(documents, report):
+        movies = list()
+        for document in documents:
+            serializer = MovieSerializer(data=document)
+            if serializer.is_valid():
+                movies.append(MovieSerializer.build(serializer.validated_data))
+            else:
+                report["Errors"].append({"Title": document["Title"],
+                                         "message": "wrong movie details provided",
+                                         "Fields": serializer.errors})
+        return movies
+
+    def __batches(self, movies):
+        movies = iter(movies)
+        batch = list(islice(movies, self.batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(movies, self.batch_size))
+
+    @staticmethod
+    def __insert(batch):
+        """ Every batch is inserted in its own transaction. Databases that can't
+        return ids of bulk inserted rows get movies inserted one by one. """
+        with transaction.atomic():
+            movies = [movie for movie, _ in batch]
+            features = connection.features
+            if getattr(features, "can_return_rows_from_bulk_insert",
+                       getattr(features, "can_return_ids_from_bulk_insert", False)):
+                Movie.objects.bulk_create(movies)
+                Movie.link_genres_and_people(movies)
+            else:
+                for movie in movies:
+                    movie.save()
+            ratings = list()
+            for movie, movie_ratings in batch:
+                for rating in movie_ratings:
+                    rating.movie = movie
+                    ratings.append(rating)
+            Rating.objects.bulk_create(ratings)
+            ResourceVersion.bump(ResourceVersion.MOVIES)
+            RankingCache.invalidate(include_all=True)
+        return movies
@@ -0,0 +1,82 @@
+""" Single-flight locks, making sure that only one of concurrent requests
+for the same key does the work, while others wait for it to finish. """
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+_process_locks = dict()
+_process_locks_guard = threading.Lock()
+
+
+@contextmanager
+def single_flight(key):
+    """ Lock is held within process and, depending on MOVIE_CREATION_LOCK
+    setting, also between workers through database or cache. """
+    with _process_lock(key):
+        if settings.MOVIE_CREATION_LOCK == "database" and connection.vendor == "postgresql":
+            with _advisory_lock(key):
+                yield
+        elif settings.MOVIE_CREATION_LOCK == "cache":
+            with _cache_lock(key):
+                yield
+        else:
+            yield
+
+
+@contextmanager
+def _process_lock(key):
+    with _process_locks_guard:
+        lock, waiting = _process_locks.get(key, (threading.Lock(), 0))
+        _process_locks[key] = (lock, waiting + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _process_locks_guard:
+            lock, waiting = _process_locks[key]
+            if waiting > 1:
+                _process_locks[key] = (lock, waiting - 1)
+            else:
+                del _process_locks[key]
+
+
+@contextmanager
+def _advisory_lock(key):
+    lock_id = int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big", signed=True)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+@contextmanager
+def _cache_lock(key):
+    with cache_lock(key, cache, settings.MOVIE_CREATION_LOCK_TIMEOUT):
+        yield
+
+
+@contextmanager
+def cache_lock(key, lock_cache, timeout):
+    """ Lock shared by all workers using the same cache. It expires after timeout,
+    so it can't be held forever by a killed worker. Waiting ends after the same
+    time, without the lock. """
+    lock_key, token = f"lock:{key}", uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    acquired = lock_cache.add(lock_key, token, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.05)
+        acquired = lock_cache.add(lock_key, token, timeout)
+    try:
+        yield
+    finally:
+        if acquired and lock_cache.get(lock_key) == token:
+            lock_cache.delete(lock_key)
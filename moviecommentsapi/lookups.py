@@ -0,0 +1,45 @@
+""" Background processing of queued movie lookups. """
+import datetime
+import logging
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+
+from .models import Movie, MovieLookup
+
+logger = logging.getLogger(__name__)
+
+
+def process_lookups(details_provider_factory, limit=10):
+    """ Claims and processes up to limit pending lookups, returns them. """
+    claim_for = datetime.timedelta(seconds=settings.MOVIE_LOOKUP_CLAIM_TIMEOUT)
+    lookups = MovieLookup.claim(limit, claim_for)
+    for lookup in lookups:
+        process_lookup(lookup, details_provider_factory())
+    return lookups
+
+
+def process_lookup(lookup, details_provider):
+    """ Unexpected errors (e.g. malformed details or database errors) fail only the
+    lookup, which is retried like others, so processing of the batch goes on. """
+    try:
+        lookup.finish(get_or_create_movie(lookup.title, details_provider))
+    except (APIException, ConnectionError) as e:
+        """ movies that don't exist won't appear after retry """
+        not_found = str(e) == getattr(details_provider, "NOT_FOUND_ERROR", None)
+        lookup.fail(str(e), not not_found and
+                    lookup.attempts < settings.MOVIE_LOOKUP_MAX_ATTEMPTS)
+    except Exception as e:
+        logger.exception("Lookup of %r failed", lookup.title)
+        lookup.fail(str(e) or type(e).__name__,
+                    lookup.attempts < settings.MOVIE_LOOKUP_MAX_ATTEMPTS)
+
+
+def get_or_create_movie(title, details_provider):
+    existing = Movie.objects.filter(title__iexact=title).first()
+    if existing:
+        return existing
+    try:
+        return Movie.create(title, details_provider)
+    except Movie.DuplicateError:
+        return Movie.objects.get(title=details_provider.get_formal_title(title))
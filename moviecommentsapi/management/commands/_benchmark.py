@@ -0,0 +1,74 @@
+""" Helpers shared by benchmark commands. Everything they seed is meant
+to be created inside a transaction that is rolled back afterwards. """
+import datetime
+import random
+import time
+
+from django.db import connection
+
+from ...models import Movie, Rating, Comment
+
+BENCHMARK_TITLE = "Benchmark movie"
+
+
+def seed_movies(count):
+    Movie.objects.bulk_create((Movie(title=f"{BENCHMARK_TITLE} {i}", year=1950 + i % 70, rated="",
+                                     released="", runtime="", genre="", director="", writer="",
+                                     actors="", plot="", language="", country="", awards="",
+                                     poster="", metascore="", imdb_rating="", imdb_votes="",
+                                     imdb_id="", type="", dvd="", box_office="", production="",
+                                     website="")
+                               for i in range(count)))
+    return list(Movie.objects.filter(title__startswith=BENCHMARK_TITLE)
+                .values_list("pk", flat=True))
+
+
+def seed_ratings(movie_ids, per_movie=3):
+    Rating.objects.bulk_create((Rating(movie_id=movie_id, source=f"Source {i}", value=f"{i}/10")
+                                for movie_id in movie_ids for i in range(per_movie)))
+
+
+def seed_comments(movie_ids, count, first_day, days, text="benchmark comment",
+                  batch_size=10000, model=Comment):
+    """ Inserted with plain SQL, as bulk_create would override created_date. Any
+    model with the same columns as Comment can be seeded. """
+    qn = connection.ops.quote_name
+    sql = f"INSERT INTO {qn(model._meta.db_table)} " \
+          f"({qn('movie_id')}, {qn('created_date')}, {qn('text')}) VALUES (%s, %s, %s)"
+    rnd = random.Random(0)
+    with connection.cursor() as cursor:
+        for start in range(0, count, batch_size):
+            cursor.executemany(sql, [
+                (rnd.choice(movie_ids),
+                 (first_day + datetime.timedelta(days=rnd.randrange(days))).isoformat(), text)
+                for _ in range(min(batch_size, count - start))])
+    analyze(model)
+
+
+def analyze(model):
+    """ Refreshes planner statistics, so plans reflect seeded data. """
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+
+def best_time_ms(func, repeat):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def rank_dicts(pairs):
+    """ Ranking built the way /top/ used to do it: a dict per movie, sorted twice
+    and dense ranked in a loop looking one movie ahead. Kept as a reference. """
+    ranking = [{"MovieId": movie_id, "TotalComments": total} for movie_id, total in pairs]
+    ranking.sort(key=lambda m: m["MovieId"])
+    ranking.sort(key=lambda m: m["TotalComments"], reverse=True)
+    rank = 1
+    for i, movie in enumerate(ranking):
+        movie.update({"Rank": rank})
+        if i + 1 < len(ranking) and movie["TotalComments"] != ranking[i + 1]["TotalComments"]:
+            rank += 1
+    return ranking
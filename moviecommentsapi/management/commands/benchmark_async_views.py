@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, AsyncClient, override_settings
+from rest_framework import status
+from rest_framework.utils import json
+
+from ...models import Movie, ResourceVersion
+from ...ranking_cache import RankingCache
+from ...serializers import MovieSerializer
+from ._benchmark import BENCHMARK_TITLE
+
+
+class Command(BaseCommand):
+    help = "Load tests POST /movies/ of synchronous and async views in a single process, " \
+           "with OMDb replaced by a local stub answering after given latency. " \
+           "Created movies are deleted afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=50,
+                            help="Maximum number of requests served by async views at once.")
+        parser.add_argument("--latency", type=float, default=0.2,
+                            help="Seconds OMDb stub waits before answering.")
+
+    def handle(self, *args, **options):
+        run, requests = f"{BENCHMARK_TITLE} {uuid.uuid4().hex[:8]}", options["requests"]
+        with serve_stub_omdb(options["latency"]) as url, \
+                override_settings(OMDB_URL=url,
+                                  ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            try:
+                with override_settings(ROOT_URLCONF="moviecommentsapi.urls"):
+                    seconds = self.run_sync([f"{run} sync {i}" for i in range(requests)])
+                self.report("sync views, 1 request at a time", requests, seconds)
+                with override_settings(ROOT_URLCONF="moviecommentsapi.async_urls"):
+                    seconds = asyncio.run(self.run_async(
+                        [f"{run} async {i}" for i in range(requests)], options["concurrency"]))
+                self.report(f"async views, up to {options['concurrency']} requests at once",
+                            requests, seconds)
+            finally:
+                Movie.objects.filter(title__startswith=run).delete()
+                ResourceVersion.bump(ResourceVersion.MOVIES)
+                RankingCache.invalidate(include_all=True)
+
+    def report(self, name, requests, seconds):
+        self.stdout.write(f"{name}: {requests} requests in {seconds:.2f} s "
+                          f"({requests / seconds:.1f} requests/s)")
+
+    @staticmethod
+    def run_sync(titles):
+        """ Single synchronous worker serves requests one after another. """
+        client = Client()
+        start = time.perf_counter()
+        for title in titles:
+            check_response(client.post("/movies/", {"title": title},
+                                       content_type="application/json"))
+        return time.perf_counter() - start
+
+    @staticmethod
+    async def run_async(titles, concurrency):
+        """ Every request has its own thread for database queries,
+        the same as when served by ASGI handler. """
+        client, semaphore = AsyncClient(), asyncio.Semaphore(concurrency)
+
+        async def post(title):
+            async with semaphore, ThreadSensitiveContext():
+                check_response(await client.post("/movies/", {"title": title},
+                                                 content_type="application/json"))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(title) for title in titles))
+        return time.perf_counter() - start
+
+
+def check_response(response):
+    if response.status_code != status.HTTP_201_CREATED:
+        raise CommandError(f"movie not created: {response.status_code} {response.content}")
+
+
+@contextmanager
+def serve_stub_omdb(latency):
+    """ Answers every lookup with made up details of requested movie. """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = json.dumps(stub_details(parse_qs(urlparse(self.path).query)["t"][0]))
+            self.send_response(status.HTTP_200_OK)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body.encode())))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def stub_details(title):
+    details = {field: "N/A" for field in MovieSerializer().fields if field != "Id"}
+    details.update(Title=title, Year="2019", Ratings=[{"Source": "Stub", "Value": "5/10"}],
+                   Response="True")
+    return details
@@ -0,0 +1,110 @@
+import datetime
+
+from django.apps.registry import Apps
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import Count
+
+from ...models import Comment
+from ._benchmark import seed_comments, analyze, best_time_ms
+
+SCRATCH_TABLE = "benchmark_comment"
+
+
+class Command(BaseCommand):
+    help = "Seeds a scratch copy of the comment table and compares query plans and timings " \
+           "of date range queries without and with Comment indexes. The comment table " \
+           "itself isn't touched, the copy is dropped afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=100)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        model = self.get_scratch_model()
+        with transaction.atomic():
+            self.create_table(model)
+            first_day = datetime.date(2019, 1, 1)
+            movie_ids = list(range(1, options["movies"] + 1))
+            seed_comments(movie_ids, options["comments"], first_day, options["days"],
+                          model=model)
+            self.stdout.write(f"Seeded {options['comments']} comments "
+                              f"for {len(movie_ids)} movies.")
+            date_from = first_day + datetime.timedelta(days=options["days"] // 2)
+            date_to = date_from + datetime.timedelta(days=6)
+            queries = self.get_queries(model, movie_ids[0], date_from, date_to)
+
+            before = self.run_queries(queries, options["repeat"], "before (without indexes)")
+            self.create_indexes(model)
+            after = self.run_queries(queries, options["repeat"], "after (with indexes)")
+
+            self.stdout.write("== summary ==")
+            for name in queries:
+                self.stdout.write(f"{name}: {before[name]:.2f} ms -> {after[name]:.2f} ms")
+            # not every database rolls back creating a table
+            self.drop_table(model)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def get_scratch_model():
+        """ Model of a table with the same columns and indexes as Comment, kept in a
+        registry of its own, so it isn't one of the app's models. Movie id isn't a
+        foreign key, but is indexed like one. """
+        class Meta:
+            apps = Apps()
+            app_label = Comment._meta.app_label
+            db_table = SCRATCH_TABLE
+            indexes = [models.Index(fields=index.fields, name=f"{SCRATCH_TABLE}_{i}")
+                       for i, index in enumerate(Comment._meta.indexes)]
+
+        return type("BenchmarkComment", (models.Model,), {
+            "__module__": __name__, "Meta": Meta,
+            "movie": models.IntegerField(db_column="movie_id"),
+            "created_date": models.DateField(),
+            "text": models.TextField()})
+
+    @staticmethod
+    def get_queries(model, movie_id, date_from, date_to):
+        in_range = dict(created_date__gte=date_from, created_date__lte=date_to)
+        return {
+            "for_movie_in_range": model.objects.filter(movie=movie_id, **in_range),
+            "sum_for_movie_in_range": model.objects.filter(movie=movie_id, **in_range)
+                .values("movie").annotate(total=Count("pk")),
+            "in_range": model.objects.filter(**in_range),
+        }
+
+    def run_queries(self, queries, repeat, title):
+        self.stdout.write(f"== {title} ==")
+        timings = dict()
+        for name, queryset in queries.items():
+            timings[name] = best_time_ms(lambda: list(queryset.all()), repeat)
+            self.stdout.write(f"{name}: {timings[name]:.2f} ms")
+            self.stdout.write(f"    {queryset.explain()}".replace("\n", "\n    "))
+        return timings
+
+    @staticmethod
+    def create_table(model):
+        """ SQL is executed directly, as SQLite schema editor can't be used
+        inside of a transaction. Only the index of movie id is created along
+        with the table. """
+        editor = connection.schema_editor(atomic=False)
+        sql, params = editor.table_sql(model)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            cursor.execute(str(models.Index(fields=["movie"], name=f"{SCRATCH_TABLE}_movie")
+                               .create_sql(model, editor)))
+
+    @staticmethod
+    def create_indexes(model):
+        editor = connection.schema_editor(atomic=False)
+        with connection.cursor() as cursor:
+            for index in model._meta.indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+        analyze(model)
+
+    @staticmethod
+    def drop_table(model):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {connection.ops.quote_name(model._meta.db_table)}")
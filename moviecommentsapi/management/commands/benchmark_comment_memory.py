@@ -0,0 +1,72 @@
+import datetime
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Comment
+from ._benchmark import seed_movies, seed_comments
+
+
+class Command(BaseCommand):
+    help = "Seeds a large comment table and compares memory used to count comments per movie " \
+           "in a date range spanning all of them, by loading comments into a list, iterating " \
+           "over them in chunks and iterating over movie IDs only. All changes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=100)
+        parser.add_argument("--comments", type=int, default=1000000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--text-length", type=int, default=500)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            first_day = datetime.date(2019, 1, 1)
+            last_day = first_day + datetime.timedelta(days=options["days"] - 1)
+            movie_ids = seed_movies(options["movies"])
+            seed_comments(movie_ids, options["comments"], first_day, options["days"],
+                          text="x" * options["text_length"])
+            self.stdout.write(f"Seeded {options['comments']} comments "
+                              f"for {len(movie_ids)} movies.")
+            chunk_size = options["chunk_size"]
+            # leanest first, as peak RSS of the process can only grow
+            variants = {
+                "movie_ids_in_range": lambda: Counter(
+                    Comment.movie_ids_in_range(first_day, last_day, chunk_size)),
+                "in_range iterator": lambda: Counter(
+                    c.movie_id for c in Comment.in_range(first_day, last_day)
+                    .iterator(chunk_size=chunk_size)),
+                "in_range list": lambda: Counter(
+                    c.movie_id for c in list(Comment.in_range(first_day, last_day))),
+            }
+            expected = None
+            for name, count in variants.items():
+                counts, seconds, peak = measure(count)
+                if expected is not None and counts != expected:
+                    raise CommandError(f"{name} counted comments differently")
+                expected = counts
+                self.stdout.write(f"{name}: {seconds:.2f} s, peak allocated {peak / 2**20:.1f} MB,"
+                                  f" peak RSS of process {peak_rss() / 2**20:.1f} MB")
+            transaction.set_rollback(True)
+
+
+def measure(func):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def peak_rss():
+    """ ru_maxrss is given in bytes on macOS and in kilobytes elsewhere. """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
@@ -0,0 +1,41 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import ranking
+from ...views.others import prepare_ranking
+from ._benchmark import best_time_ms, rank_dicts
+
+
+class Command(BaseCommand):
+    help = "Compares ranking of movies by number of comments built from dicts with its " \
+           "columnar counterparts, with and without NumPy, on random totals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, nargs="+", default=[10000, 100000, 1000000])
+        parser.add_argument("--max-total", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        for movies in options["movies"]:
+            movie_ids = rnd.sample(range(1, movies * 10), movies)
+            totals = [rnd.randint(0, options["max_total"]) for _ in movie_ids]
+            pairs = list(zip(movie_ids, totals))
+            if rank_dicts(pairs) != prepare_ranking(pairs):
+                raise CommandError("rankings differ")
+            self.stdout.write(f"== {movies} movies ==")
+            variants = [("dicts", lambda: rank_dicts(pairs)),
+                        ("columns", lambda: ranking.rank_totals(movie_ids, totals,
+                                                                use_numpy=False)),
+                        ("columns to dicts", lambda: prepare_ranking(pairs))]
+            if ranking.numpy is not None:
+                variants.append(("columns, NumPy",
+                                 lambda: ranking.rank_totals(movie_ids, totals, use_numpy=True)))
+            else:
+                self.stdout.write("NumPy isn't installed, skipping it")
+            baseline = None
+            for name, func in variants:
+                elapsed = best_time_ms(func, options["repeat"])
+                baseline = baseline or elapsed
+                self.stdout.write(f"{name}: {elapsed:.0f} ms ({baseline / elapsed:.1f}x)")
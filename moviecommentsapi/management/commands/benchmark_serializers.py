@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Movie, Comment
+from ...serializers import MovieSerializer, CommentSerializer, ValuesSerializer
+from ._benchmark import seed_movies, seed_ratings, seed_comments, best_time_ms
+
+
+class Command(BaseCommand):
+    help = "Compares serializers with their fast read-only counterparts on seeded movies " \
+           "and comments. All changes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+        parser.add_argument("--repeat", type=int, default=1)
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            with transaction.atomic():
+                movie_ids = seed_movies(rows)
+                seed_ratings(movie_ids)
+                seed_comments(movie_ids, rows, datetime.date(2019, 1, 1), 365)
+                self.stdout.write(f"== {rows} rows ==")
+                self.compare("movies", MovieSerializer,
+                             Movie.objects.order_by("pk").prefetch_related("ratings"),
+                             Movie.objects.order_by("pk"), options["repeat"])
+                self.compare("comments", CommentSerializer, Comment.objects.order_by("pk"),
+                             Comment.objects.order_by("pk"), options["repeat"])
+                transaction.set_rollback(True)
+
+    def compare(self, name, serializer_class, queryset, values_queryset, repeat):
+        values_serializer = ValuesSerializer(serializer_class)
+        if serializer_class(queryset.all(), many=True).data != \
+                list(values_serializer.serialize(values_queryset.all())):
+            raise CommandError(f"{name} serialized differently")
+        regular = best_time_ms(lambda: serializer_class(queryset.all(), many=True).data, repeat)
+        fast = best_time_ms(lambda: list(values_serializer.serialize(values_queryset.all())),
+                            repeat)
+        self.stdout.write(f"{name}: serializer {regular:.0f} ms, values serializer {fast:.0f} ms "
+                          f"({regular / fast:.1f}x faster)")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...models import TrendingScore
+
+
+class Command(BaseCommand):
+    help = "Moves epoch of trending scores to today and drops scores that faded away. " \
+           "Meant to be run periodically, e.g. daily. With --rebuild, scores are " \
+           "recomputed from daily comment counts instead."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            scores = TrendingScore.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt trending scores of {scores} movies."))
+        else:
+            dropped = TrendingScore.compact()
+            self.stdout.write(self.style.SUCCESS(f"Compacted trending scores, "
+                                                 f"dropped {dropped} faded ones."))
@@ -0,0 +1,47 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.utils import json
+
+from ...imports import MovieImporter
+from ...views.movies import OMDbDetailsProvider
+
+
+class Command(BaseCommand):
+    help = "Imports movies from JSON lines file. Every line is either a movie title " \
+           "(as JSON string or plain text) or a movie document in OMDb format."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--workers", type=int, default=settings.MOVIE_IMPORT_WORKERS)
+        parser.add_argument("--batch-size", type=int, default=settings.MOVIE_IMPORT_BATCH_SIZE)
+        parser.add_argument("--chunk-size", type=int, default=settings.MOVIE_IMPORT_MAX_ITEMS,
+                            help="Number of lines read and imported at once.")
+
+    def handle(self, *args, **options):
+        importer = MovieImporter(OMDbDetailsProvider, workers=options["workers"],
+                                 batch_size=options["batch_size"])
+        totals = {"Created": 0, "Existing": 0, "Errors": 0}
+        with open(options["path"]) as lines:
+            items = (self.parse(line) for line in lines if line.strip())
+            chunk = list(islice(items, options["chunk_size"]))
+            while chunk:
+                report = importer.run(chunk)
+                for key in totals:
+                    totals[key] += len(report[key])
+                for error in report["Errors"]:
+                    self.stderr.write(f"{error['Title']}: {error['message']}")
+                chunk = list(islice(items, options["chunk_size"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['Created']} movies, {totals['Existing']} already existed, "
+            f"{totals['Errors']} failed."))
+
+    @staticmethod
+    def parse(line):
+        """ Lines that aren't JSON strings or objects, like '1917', are plain titles. """
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return line.strip()
+        return item if isinstance(item, (str, dict)) else line.strip()
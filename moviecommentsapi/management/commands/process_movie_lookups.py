@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...lookups import process_lookups
+from ...views.movies import OMDbDetailsProvider
+
+
+class Command(BaseCommand):
+    help = "Background worker looking up queued movie titles and saving them. " \
+           "Several workers can be run at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument("--sleep", type=float, default=1,
+                            help="Seconds to wait when there are no pending lookups.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when there are no more pending lookups.")
+
+    def handle(self, *args, **options):
+        while True:
+            lookups = process_lookups(OMDbDetailsProvider, options["batch_size"])
+            for lookup in lookups:
+                self.stdout.write(f"{lookup.title}: {lookup.status}")
+            if not lookups:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
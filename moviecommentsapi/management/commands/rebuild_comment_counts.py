@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ...models import CommentDailyCount, CommentMonthlyCount
+
+
+class Command(BaseCommand):
+    help = "Rebuilds daily and monthly comment counts from scratch, based on saved comments."
+
+    def handle(self, *args, **options):
+        days = CommentDailyCount.rebuild()
+        months = CommentMonthlyCount.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt comment counts, {days} daily "
+                                             f"and {months} monthly rows saved."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Movie, CommentDailyCount, CommentMonthlyCount
+
+
+class Command(BaseCommand):
+    help = "Repairs comment counters of movies and daily and monthly comment counts " \
+           "that drifted from saved comments, leaving correct ones untouched."
+
+    def handle(self, *args, **options):
+        movies = Movie.reconcile_comment_counts()
+        days = CommentDailyCount.reconcile()
+        months = CommentMonthlyCount.reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {movies} movie counters, {days} daily "
+                                             f"and {months} monthly counts."))
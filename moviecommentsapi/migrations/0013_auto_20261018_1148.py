@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_existing_comments(apps, schema_editor):
+    Comment = apps.get_model('moviecommentsapi', 'Comment')
+    CommentDailyCount = apps.get_model('moviecommentsapi', 'CommentDailyCount')
+    counts = Comment.objects.values('movie', 'created_date').annotate(
+        count=models.Count('pk')).order_by()
+    CommentDailyCount.objects.bulk_create(
+        (CommentDailyCount(movie_id=c['movie'], day=c['created_date'], count=c['count'])
+         for c in counts.iterator()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0012_auto_20190908_1229'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_comment_counts', to='moviecommentsapi.Movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='commentdailycount',
+            index=models.Index(fields=['day'], name='moviecommen_day_f9d0a6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentdailycount',
+            unique_together={('movie', 'day')},
+        ),
+        migrations.RunPython(count_existing_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0013_auto_20261018_1148'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', 'created_date'], name='moviecommen_movie_i_502be8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_date'], name='moviecommen_created_3a1b9b_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0014_auto_20261018_1149'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieLookup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=600)),
+                ('normalized_title', models.CharField(max_length=600)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('in progress', 'in progress'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=30)),
+                ('error', models.CharField(blank=True, max_length=600)),
+                ('attempts', models.IntegerField(default=0)),
+                ('claimed_until', models.DateTimeField(null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('movie', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lookups', to='moviecommentsapi.Movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movielookup',
+            index=models.Index(fields=['status', 'claimed_until'], name='moviecommen_status_76ec10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movielookup',
+            index=models.Index(fields=['normalized_title', 'status'], name='moviecommen_normali_ccf1a8_idx'),
+        ),
+    ]
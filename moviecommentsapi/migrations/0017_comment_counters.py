@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def count_existing_comments(apps, schema_editor):
+    Movie = apps.get_model('moviecommentsapi', 'Movie')
+    Comment = apps.get_model('moviecommentsapi', 'Comment')
+    CommentMonthlyCount = apps.get_model('moviecommentsapi', 'CommentMonthlyCount')
+    counts = Comment.objects.annotate(month=TruncMonth('created_date')) \
+        .values('movie', 'month').annotate(count=models.Count('pk')).order_by()
+    CommentMonthlyCount.objects.bulk_create(
+        (CommentMonthlyCount(movie_id=c['movie'], month=c['month'], count=c['count'])
+         for c in counts.iterator()))
+    comment_count = models.Subquery(
+        Comment.objects.filter(movie=models.OuterRef('pk')).order_by()
+        .values('movie').annotate(count=models.Count('pk')).values('count'))
+    Movie.objects.update(comment_count=Coalesce(comment_count, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0016_resourceversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentMonthlyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['comment_count', 'id'], name='moviecommen_comment_6bc9ea_idx'),
+        ),
+        migrations.AddField(
+            model_name='commentmonthlycount',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_comment_counts', to='moviecommentsapi.movie'),
+        ),
+        migrations.AddIndex(
+            model_name='commentmonthlycount',
+            index=models.Index(fields=['month'], name='moviecommen_month_06562a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentmonthlycount',
+            unique_together={('movie', 'month')},
+        ),
+        migrations.RunPython(count_existing_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_text_search_index(apps, schema_editor):
+    """ Only PostgreSQL has text search, elsewhere comments are searched in process. """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX moviecommentsapi_comment_text_search ON moviecommentsapi_comment "
+            "USING GIN (to_tsvector('english', text))")
+
+
+def drop_text_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS moviecommentsapi_comment_text_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0017_comment_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_text_search_index, drop_text_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:31
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+# fields filtered with LIKE patterns matching any part of them
+TRIGRAM_INDEXED_FIELDS = ('title', 'genre', 'director', 'actors', 'language', 'country')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """ Indexed expressions match the ones Django uses for case insensitive lookups
+    on PostgreSQL. Other databases don't have trigram indexes. """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in TRIGRAM_INDEXED_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX moviecommentsapi_movie_{field}_trgm ON moviecommentsapi_movie "
+                f"USING GIN (UPPER({field}::text) gin_trgm_ops)")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for field in TRIGRAM_INDEXED_FIELDS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS moviecommentsapi_movie_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0018_comment_text_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['year', 'id'], name='moviecommen_year_98ff1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='movie_upper_title_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
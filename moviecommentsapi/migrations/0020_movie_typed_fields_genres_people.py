@@ -0,0 +1,135 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:34
+
+from django.db import migrations, models
+import django.db.models.functions.text
+from itertools import islice
+
+from moviecommentsapi.parsing import TYPED_FIELDS, split_names
+
+
+def fill_typed_fields_and_links(apps, schema_editor):
+    """ Existing movies are processed in batches, names are created once. """
+    Movie = apps.get_model('moviecommentsapi', 'Movie')
+    Genre = apps.get_model('moviecommentsapi', 'Genre')
+    Person = apps.get_model('moviecommentsapi', 'Person')
+    text_fields = [text_field for text_field, _ in TYPED_FIELDS.values()]
+    movies = Movie.objects.order_by('pk').only('pk', 'genre', 'director', 'actors', *text_fields) \
+        .iterator(chunk_size=500)
+    name_ids = {Genre: dict(), Person: dict()}
+    while True:
+        batch = list(islice(movies, 500))
+        if not batch:
+            return
+        for movie in batch:
+            for field, (text_field, parse) in TYPED_FIELDS.items():
+                setattr(movie, field, parse(getattr(movie, text_field)))
+        Movie.objects.bulk_update(batch, list(TYPED_FIELDS))
+        for through, model, target, text_field in (
+                (Movie.genres.through, Genre, 'genre_id', 'genre'),
+                (Movie.directors.through, Person, 'person_id', 'director'),
+                (Movie.cast.through, Person, 'person_id', 'actors')):
+            names = {movie.pk: split_names(getattr(movie, text_field)) for movie in batch}
+            ids = name_ids[model]
+            missing = {name for movie_names in names.values() for name in movie_names
+                       if name not in ids}
+            model.objects.bulk_create([model(name=name) for name in missing],
+                                      ignore_conflicts=True)
+            ids.update(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+            through.objects.bulk_create(through(movie_id=movie_id, **{target: ids[name]})
+                                        for movie_id, movie_names in names.items()
+                                        for name in movie_names)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0019_movie_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=600, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=600, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='box_office_value',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='dvd_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_rating_value',
+            field=models.DecimalField(decimal_places=1, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='imdb_votes_value',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='metascore_value',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='released_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='runtime_minutes',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['imdb_rating_value', 'id'], name='moviecommen_imdb_ra_4de04f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['imdb_votes_value', 'id'], name='moviecommen_imdb_vo_2b4f56_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['box_office_value', 'id'], name='moviecommen_box_off_7845ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='person_upper_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='genre_upper_name_idx'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='cast',
+            field=models.ManyToManyField(related_name='played_in_movies', to='moviecommentsapi.person'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='directors',
+            field=models.ManyToManyField(related_name='directed_movies', to='moviecommentsapi.person'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genres',
+            field=models.ManyToManyField(related_name='movies', to='moviecommentsapi.genre'),
+        ),
+        migrations.RunPython(fill_typed_fields_and_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0020_movie_typed_fields_genres_people'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['metascore_value', 'id'], name='moviecommen_metasco_16a709_idx'),
+        ),
+    ]
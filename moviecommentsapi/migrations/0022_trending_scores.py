@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import datetime
+import math
+
+from django.conf import settings
+
+
+def score_existing_comments(apps, schema_editor):
+    """ Scores are computed from daily counts within horizon, with epoch set to today. """
+    TrendingEpoch = apps.get_model('moviecommentsapi', 'TrendingEpoch')
+    TrendingScore = apps.get_model('moviecommentsapi', 'TrendingScore')
+    CommentDailyCount = apps.get_model('moviecommentsapi', 'CommentDailyCount')
+    today = datetime.date.today()
+    half_life, min_score = settings.TRENDING_HALF_LIFE_DAYS, settings.TRENDING_MIN_SCORE
+    horizon = math.ceil(half_life * math.log2(1 / min_score))
+    weights = dict()
+    for movie_id, day, count in CommentDailyCount.objects \
+            .filter(day__gt=today - datetime.timedelta(days=horizon)) \
+            .values_list('movie', 'day', 'count').iterator():
+        weights[movie_id] = weights.get(movie_id, 0) + count * 2 ** ((day - today).days / half_life)
+    TrendingEpoch.objects.create(pk=1, day=today)
+    TrendingScore.objects.bulk_create(TrendingScore(movie_id=movie_id, weight=weight)
+                                      for movie_id, weight in weights.items()
+                                      if weight >= min_score)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0021_movie_metascore_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='moviecommentsapi.movie')),
+                ('weight', models.FloatField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['weight', 'movie'], name='moviecommen_weight_625f79_idx')],
+            },
+        ),
+        migrations.RunPython(score_existing_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def recreate_text_search_index(apps, schema_editor):
+    """ Index expression matches the one SearchVector builds, which coalesces text. """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS moviecommentsapi_comment_text_search")
+        schema_editor.execute(
+            "CREATE INDEX moviecommentsapi_comment_text_search ON moviecommentsapi_comment "
+            "USING GIN (to_tsvector('english'::regconfig, COALESCE(text, '')))")
+
+
+def restore_text_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS moviecommentsapi_comment_text_search")
+        schema_editor.execute(
+            "CREATE INDEX moviecommentsapi_comment_text_search ON moviecommentsapi_comment "
+            "USING GIN (to_tsvector('english', text))")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0022_trending_scores'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_text_search_index, restore_text_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviecommentsapi', '0023_comment_text_search_index_coalesce'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-imdb_rating_value', 'id'], name='moviecommen_imdb_ra_5bc39a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-imdb_votes_value', 'id'], name='moviecommen_imdb_vo_87e367_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-metascore_value', 'id'], name='moviecommen_metasco_dfba47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-box_office_value', 'id'], name='moviecommen_box_off_45fccb_idx'),
+        ),
+    ]
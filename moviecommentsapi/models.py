@@ -1,11 +1,26 @@
 import abc
+import datetime
+import math
+from collections import Counter
 
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import Count, F, FilteredRelation, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek, Upper
+from django.utils import timezone
+
+from .locks import single_flight
+from .parsing import TYPED_FIELDS, split_names
+from .ranking_cache import RankingCache
+from .search import CommentSearch
 
 # CharField max_lengths
 
 short, medium, long = 30, 300, 600
 
+# many-to-many relation of movie -> text field it's linked from
+LINKED_FIELDS = {"genres": "genre", "directors": "director", "cast": "actors"}
+
 
 class Movie(models.Model):
 
@@ -19,11 +34,31 @@ class Movie(models.Model):
     def __create_movie_with_details_from_provider(title, details_provider):
         details = details_provider.get_details(title)
         formal_title = details_provider.get_formal_title(title)
-        if Movie.objects.filter(title=formal_title).exists():
-            raise Movie.DuplicateError
-        serializer = details_provider.get_serializer(data=details)
-        serializer.is_valid(True)
-        return serializer.save()
+        with single_flight(f"movie:{Movie.normalize_title(formal_title)}"):
+            if Movie.objects.filter(title=formal_title).exists():
+                raise Movie.DuplicateError
+            serializer = details_provider.get_serializer(data=details)
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+    @staticmethod
+    def reconcile_comment_counts():
+        """ Repairs counters that drifted from number of saved comments,
+        returns number of repaired movies. """
+        with transaction.atomic():
+            drifted = [Movie(pk=pk, comment_count=count) for pk, count in
+                       Movie.objects.annotate(count=Count('comments'))
+                       .exclude(comment_count=F('count')).values_list('pk', 'count')]
+            Movie.objects.bulk_update(drifted, ['comment_count'])
+            if drifted:
+                ResourceVersion.bump(ResourceVersion.MOVIES)
+                RankingCache.invalidate(everything=True)
+        return len(drifted)
+
+    @staticmethod
+    def normalize_title(title):
+        """ Titles differing only in case or whitespace point to the same movie. """
+        return " ".join(title.split()).casefold()
 
     title = models.CharField(max_length=long)
     year = models.IntegerField()
@@ -48,6 +83,110 @@ class Movie(models.Model):
     box_office = models.CharField(max_length=medium)
     production = models.CharField(max_length=medium)
     website = models.CharField(max_length=long)
+    # maintained on every comment write, see Comment.count_changed
+    comment_count = models.IntegerField(default=0)
+    # typed copies of text fields above, see fill_typed_fields
+    imdb_rating_value = models.DecimalField(max_digits=3, decimal_places=1, null=True)
+    imdb_votes_value = models.IntegerField(null=True)
+    metascore_value = models.IntegerField(null=True)
+    runtime_minutes = models.IntegerField(null=True)
+    box_office_value = models.BigIntegerField(null=True)
+    released_date = models.DateField(null=True)
+    dvd_date = models.DateField(null=True)
+    # items of genre, director and actors, see link_genres_and_people
+    genres = models.ManyToManyField('Genre', related_name='movies')
+    directors = models.ManyToManyField('Person', related_name='directed_movies')
+    cast = models.ManyToManyField('Person', related_name='played_in_movies')
+
+    class Meta:
+        # case insensitive title lookups are served from index of upper cased titles, on
+        # PostgreSQL also filters matching parts of text fields, from trigram indexes
+        # created in migration 0019_movie_filter_indexes
+        indexes = [models.Index(fields=['comment_count', 'id']),
+                   models.Index(fields=['year', 'id']),
+                   models.Index(Upper('title'), name='movie_upper_title_idx'),
+                   models.Index(fields=['imdb_rating_value', 'id']),
+                   models.Index(fields=['imdb_votes_value', 'id']),
+                   models.Index(fields=['metascore_value', 'id']),
+                   models.Index(fields=['box_office_value', 'id']),
+                   models.Index(fields=['-imdb_rating_value', 'id']),
+                   models.Index(fields=['-imdb_votes_value', 'id']),
+                   models.Index(fields=['-metascore_value', 'id']),
+                   models.Index(fields=['-box_office_value', 'id'])]
+
+    def fill_typed_fields(self):
+        """ Numbers and dates OMDb sends as text are kept in typed columns as well,
+        so movies can be sorted by them without parsing every row. Deferred text
+        fields aren't saved, so they're left unloaded. """
+        deferred = self.get_deferred_fields()
+        for field, (text_field, parse) in TYPED_FIELDS.items():
+            if text_field not in deferred:
+                setattr(self, field, parse(getattr(self, text_field)))
+
+    # values of LINKED_FIELDS movie was loaded or last linked with
+    _linked_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        movie = super().from_db(db, field_names, values)
+        movie._linked_values = movie.__get_linked_values()
+        return movie
+
+    def __get_linked_values(self):
+        """ Text fields genres and people are linked from, deferred ones as None. """
+        return tuple(self.__dict__.get(field) for field in LINKED_FIELDS.values())
+
+    def __links_changed(self, adding, update_fields):
+        if adding:
+            return True
+        if update_fields is not None:
+            return bool(set(LINKED_FIELDS.values()) & set(update_fields))
+        return self._linked_values != self.__get_linked_values()
+
+    @staticmethod
+    def link_genres_and_people(movies):
+        """ Links saved movies to genres and people listed in their text fields, replacing
+        previous links. Missing names are created, all with a few queries per field. """
+        movie_ids = [movie.pk for movie in movies]
+        for relation, text_field in LINKED_FIELDS.items():
+            field = Movie._meta.get_field(relation)
+            through, target = field.remote_field.through, field.m2m_reverse_field_name()
+            names = {movie.pk: split_names(getattr(movie, text_field)) for movie in movies}
+            ids = field.related_model.get_ids({name for movie_names in names.values()
+                                               for name in movie_names})
+            through.objects.filter(movie_id__in=movie_ids).delete()
+            through.objects.bulk_create(through(movie_id=movie_id, **{f"{target}_id": ids[name]})
+                                        for movie_id, movie_names in names.items()
+                                        for name in movie_names)
+
+    def save(self, *args, **kwargs):
+        """ New movies appear in rankings including movies without comments. Typed
+        fields and links to genres and people follow text fields they come from. """
+        with transaction.atomic():
+            adding = self._state.adding
+            self.fill_typed_fields()
+            super().save(*args, **kwargs)
+            if self.__links_changed(adding, kwargs.get("update_fields")):
+                Movie.link_genres_and_people([self])
+                self._linked_values = self.__get_linked_values()
+            ResourceVersion.bump(ResourceVersion.MOVIES)
+            if adding:
+                RankingCache.invalidate(include_all=True)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """ Counter of comments is only changed with F() expressions, so it's left out
+        of updates and never overwritten with a value loaded earlier. """
+        values = [value for value in values if value[0].name != "comment_count"]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def delete(self, *args, **kwargs):
+        """ Comments of the movie are deleted along with it. """
+        with transaction.atomic():
+            CommentSearch.changed(self.comments.values_list("pk", flat=True))
+            deleted = super().delete(*args, **kwargs)
+            ResourceVersion.bump(ResourceVersion.MOVIES, ResourceVersion.COMMENTS)
+            RankingCache.invalidate(everything=True)
+        return deleted
 
     class DuplicateError(Exception):
         """ Movie already exists in database. Uniqueness ensured
@@ -65,6 +204,36 @@ class Movie(models.Model):
             pass
 
 
+class NamedEntity(models.Model):
+    """ Name listed in text fields of movies, e.g. genre or person. """
+    name = models.CharField(max_length=long, unique=True)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_ids(cls, names):
+        """ Ids of given names, missing ones are created. """
+        ids = dict(cls.objects.filter(name__in=names).values_list("name", "pk"))
+        missing = [name for name in names if name not in ids]
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(cls.objects.filter(name__in=missing).values_list("name", "pk"))
+        return ids
+
+
+class Genre(NamedEntity):
+
+    class Meta:
+        indexes = [models.Index(Upper('name'), name='genre_upper_name_idx')]
+
+
+class Person(NamedEntity):
+
+    class Meta:
+        indexes = [models.Index(Upper('name'), name='person_upper_name_idx')]
+
+
 class Rating(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='ratings')
     source = models.CharField(max_length=50)
@@ -72,25 +241,536 @@ class Rating(models.Model):
 
 
 class Comment(models.Model):
+    """ Helpers return lazy querysets, so comments are only loaded when they're used,
+    and big ranges can be read chunk by chunk with .iterator(). """
 
     @staticmethod
     def for_movie(movie):
-        return list(Comment.objects.filter(movie=movie))
+        return Comment.objects.filter(movie=movie)
 
     @staticmethod
     def for_movie_in_range(movie, date_from, date_to):
-        return list(Comment.objects.filter(movie=movie, created_date__gte=date_from,
-                                           created_date__lte=date_to))
+        return Comment.objects.filter(movie=movie, created_date__gte=date_from,
+                                      created_date__lte=date_to)
 
     @staticmethod
     def sum_for_movie_in_range(movie, date_from, date_to):
-        return Comment.objects.filter(movie=movie, created_date__gte=date_from,
-                                      created_date__lte=date_to).count()
+        return Comment.for_movie_in_range(movie, date_from, date_to).count()
 
     @staticmethod
     def in_range(date_from, date_to):
-        return list(Comment.objects.filter(created_date__gte=date_from, created_date__lte=date_to))
+        return Comment.objects.filter(created_date__gte=date_from, created_date__lte=date_to)
+
+    @staticmethod
+    def movie_ids_in_range(date_from, date_to, chunk_size=2000):
+        """ Movie ID of every comment in range, without loading comments' texts
+        or movies, fetched chunk_size rows at a time. """
+        return Comment.in_range(date_from, date_to).values_list("movie_id", flat=True) \
+            .iterator(chunk_size=chunk_size)
+
+    @staticmethod
+    def bulk_create(comments):
+        """ Inserts all comments in a single transaction, counting them
+        once for every movie and day instead of once per comment. """
+        batch_size = min(1000, connection.ops.bulk_batch_size(Comment._meta.concrete_fields,
+                                                              comments))
+        with transaction.atomic():
+            created = Comment.objects.bulk_create(comments, batch_size=batch_size)
+            counts = Counter((c.movie_id, c.created_date) for c in created)
+            epoch = TrendingEpoch.get(TrendingEpoch.SHARE)
+            for (movie_id, day), count in counts.items():
+                Comment.count_changed(movie_id, day, count, epoch)
+            RankingCache.invalidate(days={day for _, day in counts})
+            ResourceVersion.bump(ResourceVersion.COMMENTS)
+        return created
+
+    @staticmethod
+    def count_changed(movie_id, day, delta, trending_epoch=None):
+        """ Called whenever number of comments for movie on given day changes.
+        Epoch of trending scores can be passed if it's already locked. """
+        CommentDailyCount.add(movie_id, day, delta)
+        CommentMonthlyCount.add(movie_id, CommentMonthlyCount.month_of(day), delta)
+        Movie.objects.filter(pk=movie_id).update(comment_count=F('comment_count') + delta)
+        TrendingScore.add(movie_id, day, delta, trending_epoch)
 
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='comments')
     created_date = models.DateField(auto_now_add=True)
     text = models.TextField()
+
+    class Meta:
+        indexes = [models.Index(fields=['movie', 'created_date']),
+                   models.Index(fields=['created_date'])]
+
+    # (movie id, created date) the comment is counted for in daily counts
+    _counted_as = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counted_as = instance.__counts_key_from_dict()
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            counted_as = self.__saved_counts_key()
+            super().save(*args, **kwargs)
+            counts_key = (self.movie_id, self._meta.get_field('created_date').to_python(
+                self.created_date))
+            if counted_as != counts_key:
+                if counted_as:
+                    Comment.count_changed(*counted_as, -1)
+                Comment.count_changed(*counts_key, 1)
+                RankingCache.invalidate(days={key[1] for key in (counted_as, counts_key) if key})
+            if counted_as:
+                CommentSearch.changed([self.pk])
+            ResourceVersion.bump(ResourceVersion.COMMENTS)
+        self._counted_as = counts_key
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            counted_as, pk = self.__saved_counts_key(), self.pk
+            deleted = super().delete(*args, **kwargs)
+            if counted_as:
+                Comment.count_changed(*counted_as, -1)
+                RankingCache.invalidate(days={counted_as[1]})
+                CommentSearch.changed([pk])
+            ResourceVersion.bump(ResourceVersion.COMMENTS)
+        self._counted_as = None
+        return deleted
+
+    def __counts_key_from_dict(self):
+        """ Deferred fields are not loaded to avoid additional queries. """
+        if "movie_id" in self.__dict__ and "created_date" in self.__dict__:
+            return self.movie_id, self.created_date
+        return None
+
+    def __saved_counts_key(self):
+        if self._state.adding or self.pk is None:
+            return None
+        if self._counted_as is None:
+            return Comment.objects.filter(pk=self.pk).values_list("movie_id",
+                                                                  "created_date").first()
+        return self._counted_as
+
+
+class AbstractModelMeta(abc.ABCMeta, type(models.Model)):
+    """ Lets abstract models declare methods their subclasses have to implement. """
+    pass
+
+
+class CommentCount(models.Model, metaclass=AbstractModelMeta):
+    """ Number of comments movie received in a period, starting on the day kept in
+    PERIOD field. Maintained on every comment write, so rankings don't have to scan
+    comments. Rows are only kept for periods with comments. """
+    PERIOD = None
+
+    @classmethod
+    def add(cls, movie_id, period_start, delta):
+        with transaction.atomic():
+            if cls.__increment(movie_id, period_start, delta):
+                if delta < 0:
+                    cls.objects.filter(movie_id=movie_id, count__lte=0,
+                                       **{cls.PERIOD: period_start}).delete()
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(movie_id=movie_id, count=delta,
+                                       **{cls.PERIOD: period_start})
+            except IntegrityError:
+                """ row was created concurrently in the meantime """
+                cls.__increment(movie_id, period_start, delta)
+
+    @classmethod
+    def __increment(cls, movie_id, period_start, delta):
+        return cls.objects.filter(movie_id=movie_id, **{cls.PERIOD: period_start}) \
+            .update(count=F('count') + delta)
+
+    @classmethod
+    @abc.abstractmethod
+    def counted_from_comments(cls):
+        """ (movie id, period start, number of comments) rows counted from saved comments. """
+
+    @classmethod
+    def rebuild(cls):
+        """ Recounts everything from scratch, returns number of rows created. """
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create(
+                (cls(movie_id=movie_id, count=count, **{cls.PERIOD: period_start})
+                 for movie_id, period_start, count in cls.counted_from_comments().iterator()))
+            RankingCache.invalidate(everything=True)
+        return len(created)
+
+    @classmethod
+    def reconcile(cls):
+        """ Repairs only rows that drifted from saved comments, returns their number. """
+        with transaction.atomic():
+            counted = {(movie_id, period_start): count for movie_id, period_start, count
+                       in cls.counted_from_comments().iterator()}
+            saved = {(movie_id, period_start): (pk, count) for pk, movie_id, period_start, count
+                     in cls.objects.values_list("pk", "movie_id", cls.PERIOD, "count").iterator()}
+            stale = [pk for key, (pk, _) in saved.items() if key not in counted]
+            changed = [cls(pk=saved[key][0], count=count) for key, count in counted.items()
+                       if key in saved and saved[key][1] != count]
+            missing = [cls(movie_id=movie_id, count=count, **{cls.PERIOD: period_start})
+                       for (movie_id, period_start), count in counted.items()
+                       if (movie_id, period_start) not in saved]
+            for i in range(0, len(stale), 500):
+                cls.objects.filter(pk__in=stale[i:i + 500]).delete()
+            cls.objects.bulk_update(changed, ["count"])
+            cls.objects.bulk_create(missing)
+            if stale or changed or missing:
+                RankingCache.invalidate(everything=True)
+        return len(stale) + len(changed) + len(missing)
+
+    class Meta:
+        abstract = True
+
+
+class CommentDailyCount(CommentCount):
+    """ Number of comments movie received on given day. """
+    PERIOD = 'day'
+
+    @classmethod
+    def counted_from_comments(cls):
+        return Comment.objects.values_list('movie', 'created_date').annotate(
+            count=Count('pk')).order_by()
+
+    @staticmethod
+    def totals_in_range(date_from, date_to, include_all=False):
+        """ (movie id, number of comments) pairs for given date range, summed
+        up from daily counts in a single grouped query. They're unordered, as
+        rankings sort them themselves. If include_all is set, movies without
+        any comments in range are returned as well, with zero. Ranges of whole
+        months are summed up from monthly counts instead. """
+        model = CommentMonthlyCount if CommentMonthlyCount.covers_whole_months(date_from, date_to) \
+            else CommentDailyCount
+        related, period = model.movie.field.related_query_name(), model.PERIOD
+        if include_all:
+            # range is a condition of the join, so only counts in range are joined to
+            # movies, through the (movie, period) index
+            in_range = FilteredRelation(related, condition=Q(**{
+                f'{related}__{period}__gte': date_from, f'{related}__{period}__lte': date_to}))
+            return Movie.objects.annotate(in_range=in_range).values('pk') \
+                .annotate(total=Coalesce(Sum('in_range__count'), 0)) \
+                .order_by().values_list('pk', 'total')
+        return model.objects.filter(**{f'{period}__gte': date_from, f'{period}__lte': date_to}) \
+            .values('movie').annotate(total=Sum('count')).filter(total__gt=0) \
+            .order_by().values_list('movie', 'total')
+
+    @staticmethod
+    def totals_all_time(include_all=False):
+        """ The same pairs for all comments ever saved, read from movies' comment
+        counters. """
+        movies = Movie.objects.all() if include_all else Movie.objects.filter(comment_count__gt=0)
+        return movies.order_by().values_list('pk', 'comment_count')
+
+    @staticmethod
+    def timeline(movie_ids, date_from, date_to, bucket):
+        """ (movie id, bucket start, number of comments) rows of given movies in date
+        range, for buckets of a 'day', 'week' (starting on Monday) or 'month', summed up
+        in grouped queries. Months lying wholly in range are read from monthly counts,
+        only days of months cut by the range from daily ones. Buckets without comments
+        are left out. """
+        daily = CommentDailyCount.objects.filter(movie_id__in=movie_ids)
+        if bucket == 'day':
+            return list(daily.filter(day__gte=date_from, day__lte=date_to)
+                        .values_list('movie', 'day', 'count').order_by('movie', 'day'))
+        if bucket == 'week':
+            return list(daily.filter(day__gte=date_from, day__lte=date_to)
+                        .annotate(week=TruncWeek('day')).values_list('movie', 'week')
+                        .annotate(total=Sum('count')).order_by('movie', 'week'))
+        # months from first_month up to, but excluding, end_month are wholly in range,
+        # None stands for the month after December 9999
+        first_month = date_from if date_from.day == 1 else \
+            CommentMonthlyCount.month_after(date_from)
+        end_month = CommentMonthlyCount.month_after(date_to) \
+            if CommentMonthlyCount.is_last_day_of_month(date_to) \
+            else CommentMonthlyCount.month_of(date_to)
+        rows = Counter()
+        if first_month is not None and (end_month is None or first_month < end_month):
+            months = CommentMonthlyCount.objects.filter(movie_id__in=movie_ids,
+                                                        month__gte=first_month)
+            cut_days = Q(day__lt=first_month)
+            if end_month is not None:
+                months = months.filter(month__lt=end_month)
+                cut_days |= Q(day__gte=end_month)
+            rows.update({(movie_id, month): count for movie_id, month, count in
+                         months.values_list('movie', 'month', 'count')})
+        else:
+            cut_days = Q()
+        rows.update({(movie_id, month): total for movie_id, month, total in
+                     daily.filter(cut_days, day__gte=date_from, day__lte=date_to)
+                     .annotate(month=TruncMonth('day')).values_list('movie', 'month')
+                     .annotate(total=Sum('count')).order_by()})
+        return [(movie_id, month, count) for (movie_id, month), count in sorted(rows.items())]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE,
+                              related_name='daily_comment_counts')
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('movie', 'day')
+        indexes = [models.Index(fields=['day'])]
+
+
+class CommentMonthlyCount(CommentCount):
+    """ Number of comments movie received in given month, kept under its first day. """
+    PERIOD = 'month'
+
+    @classmethod
+    def counted_from_comments(cls):
+        return Comment.objects.annotate(month=TruncMonth('created_date')) \
+            .values_list('movie', 'month').annotate(count=Count('pk')).order_by()
+
+    @staticmethod
+    def month_of(day):
+        return day.replace(day=1)
+
+    @staticmethod
+    def month_after(day):
+        """ First day of the month following the one of given day, None after December 9999. """
+        if day.year == datetime.MAXYEAR and day.month == 12:
+            return None
+        return CommentMonthlyCount.month_of(day.replace(day=28) + datetime.timedelta(days=4))
+
+    @staticmethod
+    def is_last_day_of_month(day):
+        return day == datetime.date.max or (day + datetime.timedelta(days=1)).day == 1
+
+    @staticmethod
+    def covers_whole_months(date_from, date_to):
+        return date_from <= date_to and date_from.day == 1 \
+            and CommentMonthlyCount.is_last_day_of_month(date_to)
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE,
+                              related_name='monthly_comment_counts')
+    month = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('movie', 'month')
+        indexes = [models.Index(fields=['month'])]
+
+
+class TrendingScore(models.Model):
+    """ Comments of movie, each weighing less the older it is, halving every
+    TRENDING_HALF_LIFE_DAYS. Instead of decaying every score every day, weights
+    of comments are kept relative to a common epoch: comment from day d weighs
+    2 ** ((d - epoch) / half-life). Current scores are weights scaled by the same
+    factor for all movies, so movies are ranked by weights read in order from index.
+    Compaction moves epoch forward before weights outgrow floats. """
+
+    @staticmethod
+    def add(movie_id, day, delta, epoch=None):
+        with transaction.atomic():
+            epoch = epoch or TrendingEpoch.get(TrendingEpoch.SHARE)
+            weight = delta * TrendingScore.decay(day - epoch)
+            if TrendingScore.__increment(movie_id, weight):
+                return
+            try:
+                with transaction.atomic():
+                    TrendingScore.objects.create(movie_id=movie_id, weight=weight)
+            except IntegrityError:
+                """ row was created concurrently in the meantime """
+                TrendingScore.__increment(movie_id, weight)
+
+    @staticmethod
+    def __increment(movie_id, weight):
+        return TrendingScore.objects.filter(movie_id=movie_id).update(weight=F('weight') + weight)
+
+    @staticmethod
+    def decay(age):
+        """ Factor of score after age (timedelta), negative age makes it grow. """
+        return 2 ** (age.days / settings.TRENDING_HALF_LIFE_DAYS)
+
+    @staticmethod
+    def top(limit, today=None):
+        """ (movie id, current score) of up to limit movies with the highest scores.
+        Scores that faded below TRENDING_MIN_SCORE are left out. """
+        scale = TrendingScore.decay(TrendingEpoch.get() - (today or datetime.date.today()))
+        rows = TrendingScore.objects.filter(weight__gte=settings.TRENDING_MIN_SCORE / scale) \
+            .order_by('-weight', '-movie').values_list('movie', 'weight')[:limit]
+        return [(movie_id, round(weight * scale, 4)) for movie_id, weight in rows]
+
+    @staticmethod
+    def compact(today=None):
+        """ Moves epoch to today, rescaling weights, and drops faded scores,
+        returns their number. """
+        today = today or datetime.date.today()
+        with transaction.atomic():
+            epoch = TrendingEpoch.get(TrendingEpoch.UPDATE)
+            TrendingScore.objects.update(weight=F('weight') * TrendingScore.decay(epoch - today))
+            TrendingEpoch.objects.filter(pk=TrendingEpoch.ID).update(day=today)
+            dropped, _ = TrendingScore.objects \
+                .filter(weight__lt=settings.TRENDING_MIN_SCORE).delete()
+        return dropped
+
+    @staticmethod
+    def rebuild(today=None):
+        """ Recomputes scores from daily comment counts with epoch moved to today,
+        so rounding errors of increments are dropped as well. Only days within
+        horizon, after which a comment weighs less than TRENDING_MIN_SCORE,
+        are counted. Returns number of scores saved. """
+        today = today or datetime.date.today()
+        horizon = math.ceil(settings.TRENDING_HALF_LIFE_DAYS
+                            * math.log2(1 / settings.TRENDING_MIN_SCORE))
+        with transaction.atomic():
+            TrendingEpoch.get(TrendingEpoch.UPDATE)
+            weights = dict()
+            for movie_id, day, count in CommentDailyCount.objects \
+                    .filter(day__gt=today - datetime.timedelta(days=horizon)) \
+                    .values_list('movie', 'day', 'count').iterator():
+                weights[movie_id] = weights.get(movie_id, 0) \
+                    + count * TrendingScore.decay(day - today)
+            TrendingScore.objects.all().delete()
+            TrendingEpoch.objects.filter(pk=TrendingEpoch.ID).update(day=today)
+            created = TrendingScore.objects.bulk_create(
+                TrendingScore(movie_id=movie_id, weight=weight)
+                for movie_id, weight in weights.items()
+                if weight >= settings.TRENDING_MIN_SCORE)
+        return len(created)
+
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True,
+                                 related_name='trending_score')
+    weight = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['weight', 'movie'])]
+
+
+class TrendingEpoch(models.Model):
+    """ Day weights of trending scores are relative to, kept in a single row, so
+    scores are never changed with a weight computed for another epoch. Writers of
+    scores lock it for share, so they don't wait for each other, only compaction
+    locks it for update, waiting for them and holding them off until it's done. """
+    ID = 1
+    SHARE, UPDATE = "share", "update"
+
+    @staticmethod
+    def get(lock=None):
+        epoch = TrendingEpoch.__read(lock)
+        if epoch is not None:
+            return epoch
+        try:
+            with transaction.atomic():
+                return TrendingEpoch.objects.create(pk=TrendingEpoch.ID,
+                                                    day=datetime.date.today()).day
+        except IntegrityError:
+            """ row was created concurrently in the meantime """
+            return TrendingEpoch.__read(lock)
+
+    @staticmethod
+    def __read(lock):
+        """ Django only locks rows for update, shared lock is taken with plain SQL.
+        Databases without row locks (e.g. SQLite) serialize writes anyway. """
+        if lock == TrendingEpoch.SHARE and connection.vendor in ("postgresql", "mysql"):
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT {qn('day')} FROM {qn(TrendingEpoch._meta.db_table)} "
+                               f"WHERE {qn('id')} = %s FOR SHARE", [TrendingEpoch.ID])
+                row = cursor.fetchone()
+            return row[0] if row else None
+        queryset = TrendingEpoch.objects.select_for_update() if lock == TrendingEpoch.UPDATE \
+            else TrendingEpoch.objects
+        return queryset.filter(pk=TrendingEpoch.ID).values_list('day', flat=True).first()
+
+    day = models.DateField()
+
+
+class MovieLookup(models.Model):
+    """ Title waiting to be looked up and saved as a movie by background worker.
+    Lookups in progress are claimed for a while, so if worker dies, lookup will
+    be claimed again by another one after claim expires. """
+    PENDING, IN_PROGRESS, DONE, FAILED = "pending", "in progress", "done", "failed"
+    STATUSES = ((PENDING, PENDING), (IN_PROGRESS, IN_PROGRESS), (DONE, DONE), (FAILED, FAILED))
+
+    @staticmethod
+    def enqueue(title):
+        """ Titles already waiting for lookup are not queued again. """
+        normalized_title = Movie.normalize_title(title)
+        with single_flight(f"lookup:{normalized_title}"):
+            waiting = MovieLookup.objects.filter(normalized_title=normalized_title,
+                                                 status__in=(MovieLookup.PENDING,
+                                                             MovieLookup.IN_PROGRESS)).first()
+            return waiting or MovieLookup.objects.create(title=title,
+                                                         normalized_title=normalized_title)
+
+    @staticmethod
+    def claim(limit, claim_for):
+        """ Claims up to limit lookups for claim_for (timedelta). Rows locked
+        by other workers are skipped, where database supports it. """
+        now = timezone.now()
+        with transaction.atomic():
+            claimable = Q(status=MovieLookup.PENDING) | Q(status=MovieLookup.IN_PROGRESS,
+                                                          claimed_until__lt=now)
+            ids = list(MovieLookup.objects.select_for_update(skip_locked=True)
+                       .filter(claimable).order_by("pk").values_list("pk", flat=True)[:limit])
+            MovieLookup.objects.filter(pk__in=ids).update(
+                status=MovieLookup.IN_PROGRESS, claimed_until=now + claim_for,
+                attempts=F("attempts") + 1)
+        return list(MovieLookup.objects.filter(pk__in=ids).order_by("pk"))
+
+    def finish(self, movie):
+        self.status, self.movie, self.claimed_until = MovieLookup.DONE, movie, None
+        self.save()
+
+    def fail(self, error, retry):
+        self.status = MovieLookup.PENDING if retry else MovieLookup.FAILED
+        self.error, self.claimed_until = error[:long], None
+        self.save()
+
+    title = models.CharField(max_length=long)
+    normalized_title = models.CharField(max_length=long)
+    status = models.CharField(max_length=short, choices=STATUSES, default=PENDING)
+    movie = models.ForeignKey(Movie, null=True, on_delete=models.SET_NULL,
+                              related_name='lookups')
+    error = models.CharField(max_length=long, blank=True)
+    attempts = models.IntegerField(default=0)
+    claimed_until = models.DateTimeField(null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'claimed_until']),
+                   models.Index(fields=['normalized_title', 'status'])]
+
+
+class ResourceVersion(models.Model):
+    """ Version of a resource listed by the API, bumped in the same transaction
+    as every write to it, so cached lists can be revalidated with a single query. """
+    MOVIES, COMMENTS = "movies", "comments"
+
+    @staticmethod
+    def get(*names):
+        """ (version, last modification time) of every resource by its name.
+        Resources that were never written have version 0 and no modification time. """
+        versions = dict.fromkeys(names, (0, None))
+        versions.update((name, (version, modified)) for name, version, modified in
+                        ResourceVersion.objects.filter(name__in=names)
+                        .values_list("name", "version", "modified"))
+        return versions
+
+    @staticmethod
+    def bump(*names):
+        now = timezone.now()
+        with transaction.atomic():
+            for name in names:
+                if ResourceVersion.__increment(name, now):
+                    continue
+                try:
+                    with transaction.atomic():
+                        ResourceVersion.objects.create(name=name, version=1, modified=now)
+                except IntegrityError:
+                    """ row was created concurrently in the meantime """
+                    ResourceVersion.__increment(name, now)
+
+    @staticmethod
+    def __increment(name, now):
+        return ResourceVersion.objects.filter(name=name).update(version=F('version') + 1,
+                                                                modified=now)
+
+    name = models.CharField(max_length=short, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField()
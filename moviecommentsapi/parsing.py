@@ -0,0 +1,48 @@
+""" Parsing of values OMDb sends as text, e.g. "135 min", "376,032" or "$326,898,358".
+Values that are missing ("N/A") or can't be parsed become None. Also used by migrations,
+so it shouldn't depend on models. """
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+MISSING = "N/A"
+
+
+def parse_integer(value):
+    """ First number in text, with thousands separators. """
+    match = re.search(r"\d[\d,]*", value or "")
+    return int(match.group().replace(",", "")) if match else None
+
+
+def parse_rating(value):
+    """ Rating with a single decimal place, from 0.0 to 99.9. """
+    try:
+        rating = Decimal(value).quantize(Decimal("0.1"))
+    except (InvalidOperation, TypeError):
+        return None
+    return rating if rating.is_finite() and 0 <= rating < 100 else None
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%d %b %Y').date()
+    except (ValueError, TypeError):
+        return None
+
+
+def split_names(value):
+    """ Distinct items of a comma separated list, in order. """
+    names = (name.strip() for name in (value or "").split(","))
+    return list(dict.fromkeys(name for name in names if name and name != MISSING))
+
+
+# typed field -> (text field it's parsed from, parser)
+TYPED_FIELDS = {
+    "imdb_rating_value": ("imdb_rating", parse_rating),
+    "imdb_votes_value": ("imdb_votes", parse_integer),
+    "metascore_value": ("metascore", parse_integer),
+    "runtime_minutes": ("runtime", parse_integer),
+    "box_office_value": ("box_office", parse_integer),
+    "released_date": ("released", parse_date),
+    "dvd_date": ("dvd", parse_date),
+}
@@ -0,0 +1,67 @@
+""" Columnar ranking of movies by number of comments. Movie ids and totals are kept
+in two parallel columns, sorted once by a composite key (total descending, then movie
+id) and dense ranked in bulk, without building a dict per movie along the way. NumPy
+is used when it's installed, otherwise the same is done with builtins. """
+from itertools import accumulate
+from operator import ne
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below that many movies NumPy doesn't pay off its conversion costs
+NUMPY_MIN_ROWS = 1000
+
+
+def rank_totals(movie_ids, totals, use_numpy=None):
+    """ (movie ids, totals, ranks) lists, ordered by total descending, then by movie
+    id. Movies with equal totals share a rank, the next total gets the following one.
+    By default NumPy is used if it's installed and there are enough movies. """
+    if use_numpy is None:
+        use_numpy = numpy is not None and len(movie_ids) >= NUMPY_MIN_ROWS
+    if use_numpy:
+        return _rank_with_numpy(movie_ids, totals)
+    return _rank_with_builtins(movie_ids, totals)
+
+
+def rank_pairs(pairs, use_numpy=None):
+    """ The same for an iterable of (movie id, total) pairs. """
+    columns = tuple(zip(*pairs)) or ((), ())
+    return rank_totals(*columns, use_numpy=use_numpy)
+
+
+def _rank_with_numpy(movie_ids, totals):
+    if not len(movie_ids):
+        return [], [], []
+    movie_ids, totals = numpy.asarray(movie_ids, dtype=numpy.int64), \
+        numpy.asarray(totals, dtype=numpy.int64)
+    # lexsort orders by the last key first
+    order = numpy.lexsort((movie_ids, -totals))
+    movie_ids, totals = movie_ids[order], totals[order]
+    return movie_ids.tolist(), totals.tolist(), dense_ranks(totals)
+
+
+def _rank_with_builtins(movie_ids, totals):
+    if not movie_ids:
+        return [], [], []
+    # total and movie id packed into a single integer, so sorting compares plain
+    # ints instead of tuples: higher total first, then lower id
+    lowest, span = min(movie_ids), max(movie_ids) - min(movie_ids) + 1
+    keys = [total * span - (movie_id - lowest) for movie_id, total in zip(movie_ids, totals)]
+    order = sorted(range(len(keys)), key=keys.__getitem__, reverse=True)
+    movie_ids, totals = [movie_ids[i] for i in order], [totals[i] for i in order]
+    return movie_ids, totals, dense_ranks(totals)
+
+
+def dense_ranks(values):
+    """ Ranks of values ordered descending, as a list. Equal values share a rank,
+    the next value gets the following one. NumPy arrays are ranked in bulk. """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        if not len(values):
+            return []
+        return numpy.concatenate(([1], 1 + numpy.cumsum(values[1:] != values[:-1]))).tolist()
+    values = list(values)
+    if not values:
+        return []
+    return list(accumulate(map(ne, values[1:], values[:-1]), initial=1))
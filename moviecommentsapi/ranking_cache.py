@@ -0,0 +1,103 @@
+""" Cache of /top/ rankings by date range. Cached ranges are kept in a registry,
+so a comment saved on some day invalidates only rankings of ranges containing it. """
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .locks import cache_lock
+
+
+class RankingCache:
+    RANGES_KEY, GENERATION_KEY = "top:ranges", "top:generation"
+    HITS_KEY, MISSES_KEY = "top:hits", "top:misses"
+
+    @staticmethod
+    def get_or_compute(date_from, date_to, include_all, compute):
+        """ Ranking computed with compute() is stored only if nothing was invalidated
+        while it was computed, as it could've been computed from outdated counts. """
+        cache = RankingCache.__cache()
+        key = RankingCache.get_key(date_from, date_to, include_all)
+        ranking = cache.get(key)
+        if ranking is not None:
+            RankingCache.__increment(RankingCache.HITS_KEY)
+            return ranking
+        RankingCache.__increment(RankingCache.MISSES_KEY)
+        generation = cache.get(RankingCache.GENERATION_KEY, 0)
+        ranking = compute()
+        with RankingCache.__registry_lock():
+            if cache.get(RankingCache.GENERATION_KEY, 0) == generation:
+                if RankingCache.__register(key, (date_from, date_to, include_all)):
+                    cache.set(key, ranking, settings.TOP_CACHE_TIMEOUT)
+        return ranking
+
+    @staticmethod
+    def get_key(date_from, date_to, include_all):
+        return f"top:{date_from.isoformat()}:{date_to.isoformat()}:{int(include_all)}"
+
+    @staticmethod
+    def invalidate(days=(), include_all=False, everything=False):
+        """ Drops rankings of ranges containing any of days and, if include_all is set,
+        all rankings including movies without comments, once current transaction is
+        committed. Rankings computed before the commit won't be stored. """
+        transaction.on_commit(lambda: RankingCache.__invalidate(set(days), include_all,
+                                                                everything))
+
+    @staticmethod
+    def __invalidate(days, include_all, everything):
+        cache = RankingCache.__cache()
+        with RankingCache.__registry_lock():
+            RankingCache.__increment(RankingCache.GENERATION_KEY)
+            ranges = cache.get(RankingCache.RANGES_KEY, dict())
+            stale = [key for key, (date_from, date_to, all_movies) in ranges.items()
+                     if everything or (include_all and all_movies)
+                     or any(date_from <= day <= date_to for day in days)]
+            if stale:
+                cache.delete_many(stale)
+                cache.set(RankingCache.RANGES_KEY,
+                          {key: r for key, r in ranges.items() if key not in stale}, None)
+
+    @staticmethod
+    def __register(key, date_range):
+        """ Ranges of expired rankings are dropped from the registry when it's full.
+        If it's still full, ranking isn't cached, so invalidation stays cheap. """
+        cache = RankingCache.__cache()
+        ranges = cache.get(RankingCache.RANGES_KEY, dict())
+        if key not in ranges and len(ranges) >= settings.TOP_CACHE_MAX_RANGES:
+            cached = cache.get_many(ranges.keys())
+            ranges = {k: r for k, r in ranges.items() if k in cached}
+            if len(ranges) >= settings.TOP_CACHE_MAX_RANGES:
+                return False
+        ranges[key] = date_range
+        cache.set(RankingCache.RANGES_KEY, ranges, None)
+        return True
+
+    @staticmethod
+    def stats():
+        cache = RankingCache.__cache()
+        values = cache.get_many([RankingCache.HITS_KEY, RankingCache.MISSES_KEY,
+                                 RankingCache.RANGES_KEY])
+        hits, misses = values.get(RankingCache.HITS_KEY, 0), values.get(RankingCache.MISSES_KEY, 0)
+        return {"Hits": hits, "Misses": misses,
+                "HitRatio": round(hits / (hits + misses), 4) if hits + misses else None,
+                "CachedRanges": len(values.get(RankingCache.RANGES_KEY, ()))}
+
+    @staticmethod
+    def __increment(key):
+        cache = RankingCache.__cache()
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            """ counter was reset or evicted in the meantime """
+            cache.add(key, 1, None)
+
+    @staticmethod
+    def __registry_lock():
+        """ Held in the cache rankings are kept in, so when it's shared by workers,
+        none of them overwrites registry with a copy missing ranges of another. """
+        return cache_lock(RankingCache.RANGES_KEY, RankingCache.__cache(),
+                          settings.TOP_CACHE_LOCK_TIMEOUT)
+
+    @staticmethod
+    def __cache():
+        return caches[settings.TOP_CACHE]
@@ -0,0 +1,160 @@
+""" Full-text search of comments. On PostgreSQL comments are matched and ranked
+by the database, using GIN index on their tsvector. Elsewhere (e.g. SQLite in tests)
+an inverted index kept in process memory is used instead. It's built incrementally:
+every search first indexes comments added since the previous one, while edited and
+deleted comments are reindexed once their transaction is committed. """
+import math
+import re
+import threading
+from collections import Counter
+
+from django.db import connection, transaction
+
+# has to match text search configuration of the index created in migrations
+SEARCH_CONFIG = "english"
+
+
+class CommentSearch:
+
+    @staticmethod
+    def search(query, offset, limit, movie_id=None, date_from=None, date_to=None):
+        """ (comment id, relevance) of comments containing every word of query, most
+        relevant first, starting from offset. Date range filter is inclusive. """
+        if connection.vendor == "postgresql":
+            return CommentSearch.__search_database(query, offset, limit, movie_id,
+                                                   date_from, date_to)
+        return InvertedIndex.get().search(query, offset, limit, movie_id, date_from, date_to)
+
+    @staticmethod
+    def changed(comment_ids):
+        """ Called whenever text, movie or date of saved comments change, or they're deleted. """
+        if connection.vendor != "postgresql":
+            comment_ids = set(comment_ids)
+            transaction.on_commit(lambda: InvertedIndex.get().reindex(comment_ids))
+
+    @staticmethod
+    def reset():
+        """ Drops in-process index, it's built from scratch by the next search. """
+        InvertedIndex.instance = None
+
+    @staticmethod
+    def __search_database(query, offset, limit, movie_id, date_from, date_to):
+        """ Built with django.contrib.postgres, imported only here, as it needs psycopg.
+        Vector has to match expression of the index created in migrations. """
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        vector = SearchVector("text", config=SEARCH_CONFIG)
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        queryset = _comment_model().objects.annotate(document=vector) \
+            .filter(document=search_query) \
+            .annotate(relevance=SearchRank(vector, search_query))
+        if movie_id is not None:
+            queryset = queryset.filter(movie_id=movie_id)
+        if date_from is not None:
+            queryset = queryset.filter(created_date__gte=date_from)
+        if date_to is not None:
+            queryset = queryset.filter(created_date__lte=date_to)
+        return list(queryset.order_by("-relevance", "-pk")
+                    .values_list("pk", "relevance")[offset:offset + limit])
+
+
+def _comment_model():
+    """ Imported when needed, as models call search on every change of comments. """
+    from .models import Comment
+    return Comment
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+class InvertedIndex:
+    """ Words of every comment, with number of their occurrences, mapped to comment
+    ids. Comments are ranked with BM25, the longer the comment is, the less
+    a single occurrence of a word counts. """
+    K1, B = 1.2, 0.75
+    instance = None
+    __instance_guard = threading.Lock()
+
+    def __init__(self):
+        self.postings = dict()
+        # comment id -> (movie id, created date, words with their counts, number of words)
+        self.documents = dict()
+        self.total_length = 0
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        with InvertedIndex.__instance_guard:
+            if InvertedIndex.instance is None:
+                InvertedIndex.instance = InvertedIndex()
+            return InvertedIndex.instance
+
+    def search(self, query, offset, limit, movie_id=None, date_from=None, date_to=None):
+        words = set(tokenize(query))
+        with self.lock:
+            self.__catch_up()
+            if not words:
+                return []
+            postings = sorted((self.postings.get(word, dict()) for word in words), key=len)
+            matching = set(postings[0]).intersection(*postings[1:])
+            scored = list()
+            for comment_id in matching:
+                document_movie, created_date, counts, length = self.documents[comment_id]
+                if movie_id is not None and document_movie != movie_id \
+                        or date_from is not None and created_date < date_from \
+                        or date_to is not None and created_date > date_to:
+                    continue
+                scored.append((-self.__score(words, counts, length), -comment_id))
+        scored.sort()
+        return [(-comment_id, -score) for score, comment_id in scored[offset:offset + limit]]
+
+    def reindex(self, comment_ids):
+        """ Only comments that were already indexed, newer ones are indexed by the next search. """
+        with self.lock:
+            indexed = [comment_id for comment_id in comment_ids if comment_id <= self.last_id]
+            for comment_id in indexed:
+                self.__remove(comment_id)
+            comments = _comment_model()
+            for row in comments.objects.filter(pk__in=indexed) \
+                    .values_list("pk", "movie_id", "created_date", "text"):
+                self.__add(*row)
+
+    def __catch_up(self, chunk_size=2000):
+        comments = _comment_model()
+        rows = comments.objects.filter(pk__gt=self.last_id).order_by("pk") \
+            .values_list("pk", "movie_id", "created_date", "text").iterator(chunk_size=chunk_size)
+        for row in rows:
+            self.__add(*row)
+            self.last_id = row[0]
+
+    def __add(self, comment_id, movie_id, created_date, text):
+        words = tokenize(text)
+        counts = Counter(words)
+        for word, count in counts.items():
+            self.postings.setdefault(word, dict())[comment_id] = count
+        self.documents[comment_id] = (movie_id, created_date, counts, len(words))
+        self.total_length += len(words)
+
+    def __remove(self, comment_id):
+        document = self.documents.pop(comment_id, None)
+        if document is None:
+            return
+        _, _, counts, length = document
+        for word in counts:
+            del self.postings[word][comment_id]
+            if not self.postings[word]:
+                del self.postings[word]
+        self.total_length -= length
+
+    def __score(self, words, counts, length):
+        documents = len(self.documents)
+        average_length = self.total_length / documents or 1
+        score = 0.0
+        for word in words:
+            frequency = len(self.postings[word])
+            idf = math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+            count = counts[word]
+            score += idf * count * (self.K1 + 1) / \
+                (count + self.K1 * (1 - self.B + self.B * length / average_length))
+        return round(score, 4)
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from itertools import islice
+
 from django.db import transaction
 from rest_framework import serializers
 from .models import Movie, Rating, Comment, short, medium, long
@@ -76,11 +79,107 @@ class MovieSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         with transaction.atomic():
-            ratings_data = validated_data.pop("ratings")
-            movie = Movie.objects.create(**validated_data)
-            for rd in ratings_data:
-                movie.ratings.create(source=rd["source"], value=rd["value"])
+            movie, ratings = self.build(validated_data)
+            movie.save()
+            for rating in ratings:
+                rating.movie = movie
+            Rating.objects.bulk_create(ratings)
         return movie
 
+    @staticmethod
+    def build(validated_data):
+        """ Unsaved movie and its ratings, so they can also be inserted in bulk.
+        Typed fields are filled here, as bulk inserts don't call save(). """
+        validated_data = dict(validated_data)
+        ratings_data = validated_data.pop("ratings", [])
+        ratings = [Rating(source=rd["source"], value=rd["value"]) for rd in ratings_data]
+        movie = Movie(**validated_data)
+        movie.fill_typed_fields()
+        return movie, ratings
+
     def update(self, instance, validated_data):
         pass
+
+
+class ValuesSerializer:
+    """ Read-only counterpart of a serializer class above. Produces the same
+    output, but straight from .values_list() rows, without creating model
+    instances and calling fields one by one. Nested many=True serializers are
+    fetched with a single query for every chunk of rows. """
+
+    def __init__(self, serializer_class, chunk_size=2000):
+        self.serializer_class = serializer_class
+        self.chunk_size = chunk_size
+        self.__field_map = None
+
+    def serialize(self, queryset):
+        """ Lazily yields serialized objects, in order of queryset. """
+        return (data for _, data in self.__serialize(queryset))
+
+    def serialize_grouped(self, fk, ids):
+        """ Serialized objects pointing with fk to any of given ids, grouped by id. """
+        model = self.serializer_class.Meta.model
+        queryset = model.objects.filter(**{f"{fk}__in": ids}).order_by("pk")
+        grouped = dict()
+        for (fk_value,), data in self.__serialize(queryset, fk):
+            grouped.setdefault(fk_value, []).append(data)
+        return grouped
+
+    def __serialize(self, queryset, *leading_columns):
+        """ Yields values of leading columns along with every serialized object. """
+        columns, fields, nested = self.__get_field_map()
+        pk_position = len(leading_columns)
+        offset = pk_position + 1
+        rows = queryset.values_list(*leading_columns, "pk", *columns) \
+            .iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            pks = [row[pk_position] for row in chunk]
+            related = {key: serializer.serialize_grouped(fk, pks)
+                       for key, (serializer, fk) in nested.items()}
+            for row in chunk:
+                data = dict()
+                for key, position, convert in fields:
+                    if position is None:
+                        data[key] = related[key].get(row[pk_position], [])
+                    else:
+                        value = row[offset + position]
+                        data[key] = None if value is None else convert(value)
+                yield row[:pk_position], data
+
+    def __get_field_map(self):
+        if self.__field_map is None:
+            self.__field_map = self.__build_field_map()
+        return self.__field_map
+
+    def __build_field_map(self):
+        """ Selected columns, (output key, column position, converter) of every
+        field and nested serializers, computed once. """
+        model = self.serializer_class.Meta.model
+        columns, fields, nested = list(), list(), dict()
+        for key, field in self.serializer_class().fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                relation = model._meta.get_field(field.source)
+                nested[key] = (ValuesSerializer(type(field.child), self.chunk_size),
+                               relation.field.attname)
+                fields.append((key, None, None))
+                continue
+            if isinstance(field, serializers.RelatedField):
+                columns.append(model._meta.get_field(field.source).attname)
+            else:
+                columns.append(field.source)
+            fields.append((key, len(columns) - 1, self.__get_converter(field)))
+        return columns, fields, nested
+
+    @staticmethod
+    def __get_converter(field):
+        if isinstance(field, serializers.CharField):
+            return str
+        elif isinstance(field, (serializers.IntegerField, serializers.PrimaryKeyRelatedField)):
+            return int
+        elif isinstance(field, serializers.DateField):
+            """ there are usually many rows with the same date """
+            return lru_cache(maxsize=4096)(field.to_representation)
+        return field.to_representation
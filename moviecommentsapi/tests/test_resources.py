@@ -1,4 +1,5 @@
-from django.db import transaction
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 
 from ..serializers import MovieSerializer
 from ..models import Movie
@@ -94,6 +95,21 @@ def get_saved_test_movie():
     return movie
 
 
+def assert_queries_independent_of_catalog_size(test_case, url, sizes=(1, 3, 10)):
+    """ Requests url with number of saved movies growing to each of given sizes.
+    Number of executed queries should stay the same for all of them. """
+    queries = list()
+    for size in sizes:
+        while Movie.objects.count() < size:
+            get_saved_test_movie()
+        with CaptureQueriesContext(connection) as context:
+            test_case.client.get(url, format='json')
+        queries.append(len(context))
+    test_case.assertEqual(len(set(queries)), 1,
+                          msg=f"number of queries for {url} changes with catalog size "
+                              f"{list(zip(sizes, queries))}")
+
+
 class MockMovieDetailsProvider(Movie.AbstractDetailsProvider):
     def get_details(self, title):
         return get_expected_external_api_response()
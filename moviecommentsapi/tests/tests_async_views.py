@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework import status
+from rest_framework.utils import json
+
+from ..models import Movie, Comment
+from .test_resources import get_saved_test_movie, get_expected_api_response
+from .tests_omdb_details_provider import StubOMDbServer
+
+urlpatterns = [
+    path('', include('moviecommentsapi.async_urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewsTests(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        caches[settings.OMDB_CACHE].clear()
+        caches[settings.TOP_CACHE].clear()
+        self.server = StubOMDbServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings = override_settings(OMDB_URL=self.server.url, OMDB_READ_TIMEOUT=0.5,
+                                          OMDB_RETRY_BACKOFF=0)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def post_movie(self, title):
+        return await self.async_client.post('/movies/', {"title": title},
+                                            content_type="application/json")
+
+    async def test_movie_created(self):
+        response = await self.post_movie("It")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        expected = get_expected_api_response()
+        expected["Id"] = (await Movie.objects.aget(title="It")).pk
+        self.assertEqual(json.loads(response.content), expected)
+        response = await self.post_movie("it")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.server.requests, 1)
+
+    async def test_concurrent_lookups_not_blocking(self):
+        """ Requests waiting for OMDb should be served concurrently. """
+        titles = ["It", "Shrek", "The Room", "Heat", "Alien", "Jaws"]
+        self.server.responses = [(200, 0.3)] * len(titles)
+        start = time.monotonic()
+        responses = await asyncio.gather(*(self.post_movie(title) for title in titles))
+        self.assertLess(time.monotonic() - start, 0.3 * len(titles) / 2)
+        self.assertEqual([r.status_code for r in responses],
+                         [status.HTTP_201_CREATED] * len(titles))
+        self.assertEqual(await Movie.objects.acount(), len(titles))
+
+    async def test_concurrent_lookups_of_same_title_coalesced(self):
+        self.server.responses = [(200, 0.2)]
+        responses = await asyncio.gather(*(self.post_movie(title) for title in ("It", "it ")))
+        self.assertEqual(sorted(r.status_code for r in responses),
+                         [status.HTTP_200_OK, status.HTTP_201_CREATED])
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(await Movie.objects.acount(), 1)
+
+    @override_settings(OMDB_MAX_RETRIES=1)
+    async def test_lookup_retried_on_server_error(self):
+        self.server.responses = [(503, 0)]
+        response = await self.post_movie("It")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.server.requests, 2)
+
+    @override_settings(OMDB_MAX_RETRIES=0)
+    async def test_lookup_timeout(self):
+        self.server.responses = [(200, 2)]
+        start = time.monotonic()
+        response = await self.post_movie("It")
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(json.loads(response.content),
+                         {"message": "problem with external API occurred"})
+
+    async def test_post_without_title(self):
+        response = await self.async_client.post('/movies/', {}, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(response.content), {"message": "no movie title provided"})
+
+    async def test_malformed_body(self):
+        response = await self.async_client.post('/movies/', "{", content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.delete('/top/')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_responses_same_as_sync_views(self):
+        """ Reads served by async views should be the same as ones of synchronous views. """
+        movie = await sync_to_async(get_saved_test_movie)()
+        await Comment.objects.acreate(movie=movie, text="test comment")
+        date = datetime.date.today().strftime("%d %b %Y")
+        for url in ('/movies/', '/movies/?sort=-title&limit=1', '/comments/',
+                    f'/comments/?id={movie.pk}&limit=1', f'/top/?from={date}&to={date}'):
+            response = await self.async_client.get(url)
+            expected = await sync_to_async(self.get_from_sync_view)(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content), url)
+
+    @override_settings(ROOT_URLCONF='moviecommentsapi.urls')
+    def get_from_sync_view(self, url):
+        return self.client.get(url)
+
+    async def test_comment_created(self):
+        movie = await sync_to_async(get_saved_test_movie)()
+        response = await self.async_client.post('/comments/', {"id": movie.pk, "text": "Nice"},
+                                                content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Comment.objects.filter(movie=movie).acount(), 1)
+
+    async def test_comments_streamed(self):
+        movie = await sync_to_async(get_saved_test_movie)()
+        for i in range(3):
+            await Comment.objects.acreate(movie=movie, text=f"comment {i}")
+        with override_settings(STREAM_CHUNK_SIZE=2):
+            response = await self.async_client.get('/comments/?stream=ndjson')
+            self.assertTrue(response.is_async)
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([json.loads(line)["Text"] for line in content.decode().splitlines()],
+                         ["comment 0", "comment 1", "comment 2"])
+
+    async def test_not_modified(self):
+        await sync_to_async(get_saved_test_movie)()
+        etag = (await self.async_client.get('/movies/'))["ETag"]
+        response = await self.async_client.get('/movies/', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -1,6 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 import datetime
 
+from ..management.commands.benchmark_comment_indexes import SCRATCH_TABLE
 from ..models import Comment
 from .test_resources import get_saved_test_movie
 
@@ -46,6 +51,43 @@ class CommentTests(TestCase):
         self.assertTrue(Comment.objects.get(text="test comment 8") in days_range)
         self.assertEqual(len(days_range), 3)
 
+    def test_helpers_lazy(self):
+        movie = get_saved_test_movie()
+        with self.assertNumQueries(0):
+            Comment.for_movie(movie)
+            Comment.for_movie_in_range(movie, datetime.date(2016, 1, 1), datetime.date(2018, 1, 1))
+            Comment.in_range(datetime.date(2016, 1, 1), datetime.date(2018, 1, 1))
+
+    def test_movie_ids_in_range(self):
+        movie, another_movie = get_saved_test_movie(), get_saved_test_movie()
+        self.prepare_dates(movie)
+        self.prepare_dates(another_movie)
+        movie_ids = Comment.movie_ids_in_range(datetime.date(2016, 1, 1),
+                                               datetime.date(2018, 12, 30), chunk_size=2)
+        self.assertEqual(sorted(movie_ids), [movie.pk] * 9 + [another_movie.pk] * 9)
+
+    def test_memory_benchmark(self):
+        """ All ways of counting comments should give the same counts
+        and leave no seeded data behind. """
+        out = StringIO()
+        call_command("benchmark_comment_memory", movies=5, comments=500, stdout=out)
+        for name in ("movie_ids_in_range", "in_range iterator", "in_range list"):
+            self.assertIn(f"{name}: ", out.getvalue())
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_indexes_benchmark(self):
+        """ Benchmark should compare date range queries without and with
+        indexes on a scratch table and leave no seeded data behind. """
+        out = StringIO()
+        call_command("benchmark_comment_indexes", movies=5, comments=500, repeat=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn("before (without indexes)", output)
+        self.assertIn("after (with indexes)", output)
+        for name in ("for_movie_in_range", "sum_for_movie_in_range", "in_range"):
+            self.assertIn(f"{name}: ", output.split("== summary ==")[1])
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertNotIn(SCRATCH_TABLE, connection.introspection.table_names())
+
     @staticmethod
     def prepare_dates(movie):
         dates = [datetime.date(2015, 5, 4), datetime.date(2016, 5, 4), datetime.date(2016, 6, 4),
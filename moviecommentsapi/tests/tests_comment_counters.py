@@ -0,0 +1,171 @@
+import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from ..models import Movie, Comment, CommentDailyCount, CommentMonthlyCount
+from ..serializers import CommentSerializer
+from .test_resources import get_saved_test_movie
+
+
+class CommentCountersTests(APITestCase):
+
+    def setUp(self):
+        caches[settings.TOP_CACHE].clear()
+        self.movie = get_saved_test_movie()
+
+    @staticmethod
+    def get_comment_count(movie):
+        return Movie.objects.values_list("comment_count", flat=True).get(pk=movie.pk)
+
+    @staticmethod
+    def get_monthly_counts():
+        return set(CommentMonthlyCount.objects.values_list("movie", "month", "count"))
+
+    @staticmethod
+    def get_comment_with_date(movie, created_date):
+        comment = movie.comments.create(text="test comment")
+        comment.created_date = created_date
+        comment.save()
+        return comment
+
+    def test_counter_after_comments_posted(self):
+        self.client.post('/comments/', {"id": self.movie.pk, "text": "first"}, format="json")
+        self.client.post('/comments/', [{"id": self.movie.pk, "text": "second"},
+                                        {"id": self.movie.pk, "text": "third"}], format="json")
+        self.assertEqual(self.get_comment_count(self.movie), 3)
+
+    def test_counter_after_serializer_create(self):
+        cs = CommentSerializer(data={"MovieId": self.movie.pk, "Text": "test comment",
+                                     "CreatedDate": "05 Aug 2019"})
+        cs.is_valid()
+        cs.save()
+        self.assertEqual(self.get_comment_count(self.movie), 1)
+        self.assertEqual(self.get_monthly_counts(),
+                         {(self.movie.pk, datetime.date(2019, 8, 1), 1)})
+
+    def test_counter_after_comment_moved_and_deleted(self):
+        another_movie = get_saved_test_movie()
+        comment = self.movie.comments.create(text="test comment")
+        comment.movie = another_movie
+        comment.save()
+        self.assertEqual((self.get_comment_count(self.movie),
+                          self.get_comment_count(another_movie)), (0, 1))
+        comment.delete()
+        self.assertEqual(self.get_comment_count(another_movie), 0)
+
+    def test_counter_not_overwritten_by_saved_movie(self):
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.movie.comments.create(text="test comment")
+        movie.plot = "Changed plot"
+        movie.save()
+        self.assertEqual(self.get_comment_count(movie), 1)
+
+    def test_saved_movie_keeps_deferred_fields(self):
+        movie = Movie.objects.only("title").get(pk=self.movie.pk)
+        movie.title = "Changed title"
+        movie.save()
+        self.assertTrue({"plot", "imdb_rating", "comment_count"} <= movie.get_deferred_fields())
+        self.assertEqual(Movie.objects.get(pk=movie.pk).title, "Changed title")
+
+    def test_saved_movie_inserted_again_after_deleted(self):
+        movie = Movie.objects.get(pk=self.movie.pk)
+        Movie.objects.filter(pk=movie.pk).delete()
+        movie.save()
+        self.assertTrue(Movie.objects.filter(pk=movie.pk).exists())
+
+    def test_monthly_counts_after_date_change(self):
+        comment = self.get_comment_with_date(self.movie, datetime.date(2019, 8, 5))
+        self.get_comment_with_date(self.movie, datetime.date(2019, 8, 25))
+        comment.created_date = datetime.date(2019, 9, 1)
+        comment.save()
+        self.assertEqual(self.get_monthly_counts(),
+                         {(self.movie.pk, datetime.date(2019, 8, 1), 1),
+                          (self.movie.pk, datetime.date(2019, 9, 1), 1)})
+
+    def test_whole_months_ranked_from_monthly_counts(self):
+        for day in (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31),
+                    datetime.date(2019, 9, 30), datetime.date(2019, 10, 1)):
+            self.get_comment_with_date(self.movie, day)
+        CommentDailyCount.objects.all().delete()
+        self.assertEqual(list(CommentDailyCount.totals_in_range(
+            datetime.date(2019, 8, 1), datetime.date(2019, 9, 30))), [(self.movie.pk, 3)])
+        self.assertEqual(list(CommentDailyCount.totals_in_range(
+            datetime.date(2019, 8, 1), datetime.date(2019, 9, 29))), [])
+
+    def test_include_all_ranks_movies_commented_out_of_range_with_zero(self):
+        another_movie = get_saved_test_movie()
+        self.get_comment_with_date(self.movie, datetime.date(2019, 8, 1))
+        self.get_comment_with_date(another_movie, datetime.date(2019, 7, 31))
+        for date_to in (datetime.date(2019, 8, 30), datetime.date(2019, 8, 31)):
+            totals = CommentDailyCount.totals_in_range(datetime.date(2019, 8, 1), date_to,
+                                                       include_all=True)
+            self.assertEqual(sorted(totals), [(self.movie.pk, 1), (another_movie.pk, 0)])
+
+    def test_range_up_to_last_possible_day_ranked(self):
+        self.get_comment_with_date(self.movie, datetime.date(2019, 8, 1))
+        response = self.client.get('/top/?from=01 Jan 2019&to=31 Dec 9999')
+        self.assertEqual(response.json(), [{"MovieId": self.movie.pk, "TotalComments": 1,
+                                            "Rank": 1}])
+
+    def test_all_time_ranking(self):
+        another_movie, third_movie = get_saved_test_movie(), get_saved_test_movie()
+        for day in (datetime.date(2019, 8, 1), datetime.date(2015, 1, 1)):
+            self.get_comment_with_date(another_movie, day)
+        self.get_comment_with_date(self.movie, datetime.date(2019, 8, 1))
+        with self.assertNumQueries(1):
+            response = self.client.get('/top/?all_time=true')
+        self.assertEqual(response.json(),
+                         [{"MovieId": another_movie.pk, "TotalComments": 2, "Rank": 1},
+                          {"MovieId": self.movie.pk, "TotalComments": 1, "Rank": 2}])
+        response = self.client.get('/top/?all_time=true&include_all=true')
+        self.assertEqual(response.json()[-1],
+                         {"MovieId": third_movie.pk, "TotalComments": 0, "Rank": 3})
+
+    def test_movies_sorted_by_comments(self):
+        another_movie = get_saved_test_movie()
+        self.get_comment_with_date(another_movie, datetime.date(2019, 8, 1))
+        ids = [m["Id"] for m in self.client.get('/movies/?sort=-comments').json()]
+        self.assertEqual(ids, [another_movie.pk, self.movie.pk])
+        ids = [m["Id"] for m in self.client.get('/movies/?sort=c').json()]
+        self.assertEqual(ids, [self.movie.pk, another_movie.pk])
+
+    def test_movies_sorted_by_comments_revalidated_after_comment(self):
+        etag = self.client.get('/movies/?sort=-comments')["ETag"]
+        unsorted_etag = self.client.get('/movies/')["ETag"]
+        self.movie.comments.create(text="test comment")
+        self.assertNotEqual(self.client.get('/movies/?sort=-comments')["ETag"], etag)
+        self.assertEqual(self.client.get('/movies/')["ETag"], unsorted_etag)
+
+    def test_reconcile_command(self):
+        """ Only counters that drifted from comments should be repaired. """
+        another_movie = get_saved_test_movie()
+        for day in (datetime.date(2019, 8, 5), datetime.date(2019, 8, 6),
+                    datetime.date(2019, 9, 6)):
+            self.get_comment_with_date(self.movie, day)
+        self.get_comment_with_date(another_movie, datetime.date(2019, 8, 5))
+        daily, monthly = set(CommentDailyCount.objects.values_list("movie", "day", "count")), \
+            self.get_monthly_counts()
+        Movie.objects.filter(pk=self.movie.pk).update(comment_count=10)
+        CommentDailyCount.objects.filter(movie=another_movie).delete()
+        CommentMonthlyCount.objects.filter(month=datetime.date(2019, 9, 1)).update(count=5)
+        CommentMonthlyCount.objects.create(movie=another_movie, month=datetime.date(2018, 1, 1),
+                                           count=1)
+        out = StringIO()
+        call_command("reconcile_comment_counters", stdout=out)
+        self.assertIn("Repaired 1 movie counters, 1 daily and 2 monthly counts.", out.getvalue())
+        self.assertEqual(self.get_comment_count(self.movie), 3)
+        self.assertEqual(set(CommentDailyCount.objects.values_list("movie", "day", "count")),
+                         daily)
+        self.assertEqual(self.get_monthly_counts(), monthly)
+
+    def test_rebuild_command_rebuilds_monthly_counts(self):
+        self.get_comment_with_date(self.movie, datetime.date(2019, 8, 5))
+        expected = self.get_monthly_counts()
+        CommentMonthlyCount.objects.all().delete()
+        call_command("rebuild_comment_counts", stdout=StringIO())
+        self.assertEqual(self.get_monthly_counts(), expected)
+        self.assertEqual(Comment.objects.count(), 1)
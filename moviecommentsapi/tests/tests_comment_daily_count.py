@@ -0,0 +1,92 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, CommentDailyCount
+from ..serializers import CommentSerializer
+from .test_resources import get_saved_test_movie
+
+
+class CommentDailyCountTests(TestCase):
+
+    @staticmethod
+    def get_count(movie, day):
+        try:
+            return CommentDailyCount.objects.get(movie=movie, day=day).count
+        except CommentDailyCount.DoesNotExist:
+            return 0
+
+    @staticmethod
+    def get_comment_with_date(movie, created_date):
+        comment = movie.comments.create(text="test comment")
+        comment.created_date = created_date
+        comment.save()
+        return comment
+
+    def test_count_after_comment_create(self):
+        """ Creating comment should be counted for its movie and day. """
+        movie = get_saved_test_movie()
+        movie.comments.create(text="test comment 1")
+        movie.comments.create(text="test comment 2")
+        self.assertEqual(self.get_count(movie, datetime.date.today()), 2)
+
+    def test_count_after_comment_date_change(self):
+        """ If comment's date is changed, it should be counted for the new day only. """
+        movie = get_saved_test_movie()
+        day = datetime.date(2019, 8, 5)
+        self.get_comment_with_date(movie, day)
+        self.assertEqual(self.get_count(movie, day), 1)
+        self.assertEqual(self.get_count(movie, datetime.date.today()), 0)
+
+    def test_count_after_loaded_comment_change(self):
+        """ Comments loaded from database should be recounted properly when changed. """
+        movie = get_saved_test_movie()
+        another_movie = get_saved_test_movie()
+        day = datetime.date(2019, 8, 5)
+        comment_id = self.get_comment_with_date(movie, day).pk
+        comment = Comment.objects.get(pk=comment_id)
+        comment.movie = another_movie
+        comment.save()
+        self.assertEqual(self.get_count(movie, day), 0)
+        self.assertEqual(self.get_count(another_movie, day), 1)
+        deferred = Comment.objects.only("text").get(pk=comment_id)
+        deferred.created_date = day + datetime.timedelta(days=1)
+        deferred.save()
+        self.assertEqual(self.get_count(another_movie, day), 0)
+        self.assertEqual(self.get_count(another_movie, day + datetime.timedelta(days=1)), 1)
+
+    def test_count_after_comment_delete(self):
+        """ Deleted comments shouldn't be counted anymore. """
+        movie = get_saved_test_movie()
+        day = datetime.date(2019, 8, 5)
+        self.get_comment_with_date(movie, day)
+        self.get_comment_with_date(movie, day).delete()
+        self.assertEqual(self.get_count(movie, day), 1)
+
+    def test_count_after_comment_deserialization(self):
+        """ Comments saved through serializer should be counted for their date. """
+        movie = get_saved_test_movie()
+        cs = CommentSerializer(data={"MovieId": movie.pk, "Text": "test comment",
+                                     "CreatedDate": "10 Mar 2019"})
+        cs.is_valid()
+        cs.save()
+        self.assertEqual(self.get_count(movie, datetime.date(2019, 3, 10)), 1)
+        self.assertEqual(self.get_count(movie, datetime.date.today()), 0)
+
+    def test_rebuild_command(self):
+        """ Rebuilding should restore counts after they drifted from comments. """
+        movie = get_saved_test_movie()
+        another_movie = get_saved_test_movie()
+        days = [datetime.date(2019, 8, 5), datetime.date(2019, 8, 5), datetime.date(2019, 8, 6)]
+        for day in days:
+            self.get_comment_with_date(movie, day)
+        self.get_comment_with_date(another_movie, days[0])
+        expected = set(CommentDailyCount.objects.values_list("movie", "day", "count"))
+        CommentDailyCount.objects.filter(movie=movie).update(count=10)
+        Comment.objects.filter(movie=another_movie).delete()
+        call_command("rebuild_comment_counts", stdout=StringIO())
+        expected.discard((another_movie.pk, days[0], 1))
+        self.assertEqual(set(CommentDailyCount.objects.values_list("movie", "day", "count")),
+                         expected)
@@ -0,0 +1,142 @@
+import datetime
+from unittest import skipIf
+
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..search import CommentSearch, InvertedIndex
+from .test_resources import get_saved_test_movie
+
+
+class CommentSearchTestCase(APITestCase):
+
+    def setUp(self):
+        """ Index of previous test could contain comments rolled back since. """
+        CommentSearch.reset()
+        self.movie = get_saved_test_movie()
+
+    def add_comment(self, text, movie=None, created_date=None):
+        comment = (movie or self.movie).comments.create(text=text)
+        if created_date:
+            comment.created_date = created_date
+            comment.save()
+        return comment
+
+    def search(self, query_string):
+        response = self.client.get(f'/comments/search/?{query_string}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def search_texts(self, query_string):
+        return [c["Text"] for c in self.search(query_string)["Results"]]
+
+
+class CommentSearchTests(CommentSearchTestCase):
+    """ Run against either database or in-process search. """
+
+    def test_comments_ranked_by_relevance(self):
+        self.add_comment("A scary clown in a small town, scary!")
+        self.add_comment("Scary clown")
+        self.add_comment("Clown, a long comment about everything but the word the search is for")
+        self.add_comment("Nothing to see here")
+        results = self.search("q=scary+clown")["Results"]
+        self.assertEqual(sorted(c["Text"] for c in results),
+                         ["A scary clown in a small town, scary!", "Scary clown"])
+        relevance = [c["Relevance"] for c in results]
+        self.assertEqual(relevance, sorted(relevance, reverse=True))
+        self.assertEqual(results[0]["MovieId"], self.movie.pk)
+
+    def test_every_word_required_regardless_of_case(self):
+        self.add_comment("Great movie")
+        self.add_comment("Great soundtrack")
+        self.assertEqual(self.search_texts("q=GREAT+movie"), ["Great movie"])
+        self.assertEqual(self.search_texts("q=great+unknown"), [])
+
+    def test_filtered_by_movie_and_date_range(self):
+        another_movie = get_saved_test_movie()
+        self.add_comment("Good one", created_date=datetime.date(2019, 8, 5))
+        self.add_comment("Good too", created_date=datetime.date(2019, 9, 5))
+        self.add_comment("Good as well", movie=another_movie,
+                         created_date=datetime.date(2019, 8, 5))
+        self.assertEqual(sorted(self.search_texts(f"q=good&id={self.movie.pk}")),
+                         ["Good one", "Good too"])
+        self.assertEqual(sorted(self.search_texts("q=good&from=01 Aug 2019&to=31 Aug 2019")),
+                         ["Good as well", "Good one"])
+        self.assertEqual(self.search_texts(f"q=good&id={self.movie.pk}&from=01 Sep 2019"),
+                         ["Good too"])
+
+    def test_paginated(self):
+        for i in range(5):
+            self.add_comment(f"Comment number {i}")
+        page = self.search("q=comment&limit=2")
+        self.assertEqual(page["NextOffset"], 2)
+        texts = [c["Text"] for c in page["Results"]]
+        while page["NextOffset"] is not None:
+            page = self.search(f"q=comment&limit=2&offset={page['NextOffset']}")
+            texts += [c["Text"] for c in page["Results"]]
+        self.assertEqual(sorted(texts), [f"Comment number {i}" for i in range(5)])
+
+    def test_new_comments_found(self):
+        self.add_comment("First comment")
+        self.assertEqual(self.search_texts("q=comment"), ["First comment"])
+        self.add_comment("Second comment")
+        self.client.post('/comments/', [{"id": self.movie.pk, "text": "Third comment"}],
+                         format="json")
+        self.assertEqual(sorted(self.search_texts("q=comment")),
+                         ["First comment", "Second comment", "Third comment"])
+
+    def test_edited_and_deleted_comments_found_as_they_are(self):
+        comment = self.add_comment("Boring")
+        deleted = self.add_comment("Boring as well")
+        another_movie = get_saved_test_movie()
+        self.add_comment("Boring too", movie=another_movie)
+        self.search("q=boring")
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.text = "Exciting"
+            comment.save()
+            deleted.delete()
+            another_movie.delete()
+        self.assertEqual(self.search_texts("q=boring"), [])
+        self.assertEqual(self.search_texts("q=exciting"), ["Exciting"])
+
+    def test_wrong_params(self):
+        for query_string, status_code in (("", status.HTTP_400_BAD_REQUEST),
+                                          ("q=+", status.HTTP_400_BAD_REQUEST),
+                                          ("q=good&id=x", status.HTTP_400_BAD_REQUEST),
+                                          ("q=good&id=0", status.HTTP_404_NOT_FOUND),
+                                          ("q=good&from=2019-08-01", status.HTTP_400_BAD_REQUEST),
+                                          ("q=good&limit=0", status.HTTP_400_BAD_REQUEST)):
+            response = self.client.get(f'/comments/search/?{query_string}')
+            self.assertEqual(response.status_code, status_code, query_string)
+
+
+@skipIf(connection.vendor == "postgresql", "PostgreSQL searches with its own text search")
+class InvertedIndexTests(CommentSearchTestCase):
+    """ In-process index used instead of database text search. """
+
+    def test_comments_ranked_by_bm25(self):
+        self.add_comment("A scary clown in a small town, scary!")
+        self.add_comment("Scary clown")
+        self.assertEqual(self.search_texts("q=scary+clown"),
+                         ["Scary clown", "A scary clown in a small town, scary!"])
+
+    def test_index_built_incrementally(self):
+        self.add_comment("First comment")
+        self.search("q=comment")
+        self.add_comment("Second comment")
+        self.client.post('/comments/', [{"id": self.movie.pk, "text": "Third comment"}],
+                         format="json")
+        self.assertEqual(self.search_texts("q=comment"),
+                         ["Third comment", "Second comment", "First comment"])
+        self.assertEqual(len(InvertedIndex.get().documents), 3)
+
+    def test_edited_and_deleted_comments_reindexed(self):
+        comment = self.add_comment("Boring")
+        deleted = self.add_comment("Boring as well")
+        self.search("q=boring")
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.text = "Exciting"
+            comment.save()
+            deleted.delete()
+        self.assertEqual(len(InvertedIndex.get().documents), 1)
@@ -0,0 +1,108 @@
+import datetime
+import random
+from collections import Counter
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Comment, CommentDailyCount, CommentMonthlyCount
+from ..views.comments import bucket_of
+from .test_resources import get_saved_test_movie
+
+
+class CommentTimelineTests(APITestCase):
+
+    def setUp(self):
+        self.movie, self.another_movie = get_saved_test_movie(), get_saved_test_movie()
+
+    def add_comments(self, movie, *days):
+        for day in days:
+            comment = movie.comments.create(text="test comment")
+            comment.created_date = day
+            comment.save()
+
+    def get_timeline(self, query_string):
+        response = self.client.get(f'/comments/timeline/?{query_string}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_daily_buckets(self):
+        self.add_comments(self.movie, datetime.date(2019, 9, 2), datetime.date(2019, 9, 2),
+                          datetime.date(2019, 9, 4), datetime.date(2019, 9, 9))
+        self.assertEqual(self.get_timeline(f"id={self.movie.pk}&from=01 Sep 2019&to=04 Sep 2019"),
+                         [{"MovieId": self.movie.pk,
+                           "Timeline": [{"Start": "01 Sep 2019", "TotalComments": 0},
+                                        {"Start": "02 Sep 2019", "TotalComments": 2},
+                                        {"Start": "03 Sep 2019", "TotalComments": 0},
+                                        {"Start": "04 Sep 2019", "TotalComments": 1}]}])
+
+    def test_weekly_buckets_of_several_movies(self):
+        self.add_comments(self.movie, datetime.date(2019, 9, 2), datetime.date(2019, 9, 8),
+                          datetime.date(2019, 9, 9))
+        self.add_comments(self.another_movie, datetime.date(2019, 9, 4))
+        timeline = self.get_timeline(f"id={self.another_movie.pk}&id={self.movie.pk}"
+                                     f"&from=03 Sep 2019&to=09 Sep 2019&bucket=week")
+        self.assertEqual([(m["MovieId"], [(b["Start"], b["TotalComments"]) for b in m["Timeline"]])
+                          for m in timeline],
+                         [(self.movie.pk, [("02 Sep 2019", 1), ("09 Sep 2019", 1)]),
+                          (self.another_movie.pk, [("02 Sep 2019", 1), ("09 Sep 2019", 0)])])
+
+    def test_buckets_match_comments(self):
+        rnd, first_day = random.Random(0), datetime.date(2019, 1, 1)
+        days = [first_day + datetime.timedelta(days=rnd.randrange(400)) for _ in range(200)]
+        self.add_comments(self.movie, *days)
+        for date_from, date_to in ((datetime.date(2019, 1, 17), datetime.date(2019, 12, 3)),
+                                   (datetime.date(2019, 2, 1), datetime.date(2019, 4, 30)),
+                                   (datetime.date(2019, 5, 5), datetime.date(2019, 5, 25))):
+            for bucket in ("day", "week", "month"):
+                expected = Counter(bucket_of(day, bucket) for day in days
+                                   if date_from <= day <= date_to)
+                timeline = self.get_timeline(f"id={self.movie.pk}&bucket={bucket}"
+                                             f"&from={date_from:%d %b %Y}&to={date_to:%d %b %Y}")
+                counts = {datetime.datetime.strptime(b["Start"], '%d %b %Y').date():
+                          b["TotalComments"] for b in timeline[0]["Timeline"]}
+                self.assertEqual(+Counter(counts), expected, (bucket, date_from, date_to))
+
+    def test_number_of_queries_independent_of_comments(self):
+        self.add_comments(self.movie, *(datetime.date(2019, 9, day) for day in range(1, 31)))
+        with self.assertNumQueries(4):
+            self.get_timeline(f"id={self.movie.pk}&from=15 Aug 2019&to=15 Oct 2019&bucket=month")
+        with self.assertNumQueries(3):
+            self.get_timeline(f"id={self.movie.pk}&from=15 Aug 2019&to=15 Oct 2019&bucket=week")
+
+    def test_monthly_buckets_at_end_of_calendar(self):
+        for day in (datetime.date(9999, 11, 30), datetime.date(9999, 12, 5),
+                    datetime.date(9999, 12, 31)):
+            comment = self.movie.comments.create(text="test comment")
+            Comment.objects.filter(pk=comment.pk).update(created_date=day)
+        CommentDailyCount.rebuild()
+        CommentMonthlyCount.rebuild()
+        for date_from, date_to, expected in (("02 Dec 9999", "30 Dec 9999", 1),
+                                             ("01 Dec 9999", "31 Dec 9999", 2),
+                                             ("02 Nov 9999", "31 Dec 9999", 2)):
+            timeline = self.get_timeline(f"id={self.movie.pk}&from={date_from}&to={date_to}"
+                                         f"&bucket=month")
+            self.assertEqual(timeline[0]["Timeline"][-1],
+                             {"Start": "01 Dec 9999", "TotalComments": expected}, date_from)
+        timeline = self.get_timeline(f"id={self.movie.pk}&from=01 Nov 9999&to=31 Dec 9999"
+                                     f"&bucket=month")
+        self.assertEqual(timeline[0]["Timeline"][0], {"Start": "01 Nov 9999", "TotalComments": 1})
+
+    @override_settings(COMMENT_TIMELINE_MAX_BUCKETS=10)
+    def test_number_of_buckets_limited(self):
+        response = self.client.get(f'/comments/timeline/?id={self.movie.pk}&id='
+                                   f'{self.another_movie.pk}&from=01 Sep 2019&to=06 Sep 2019')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.get_timeline(f"id={self.movie.pk}&from=01 Sep 2019&to=10 Sep 2019")
+
+    def test_wrong_params(self):
+        dates = "from=01 Sep 2019&to=04 Sep 2019"
+        for query_string in (dates, f"id=x&{dates}", f"id={self.movie.pk}",
+                             f"id={self.movie.pk}&from=2019-09-01&to=2019-09-04",
+                             f"id={self.movie.pk}&from=04 Sep 2019&to=01 Sep 2019",
+                             f"id={self.movie.pk}&{dates}&bucket=year"):
+            response = self.client.get(f'/comments/timeline/?{query_string}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query_string)
+        response = self.client.get(f'/comments/timeline/?id={self.movie.pk}&id=0&{dates}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,10 +1,12 @@
 import datetime
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.utils import json
 
-from ..models import Comment
+from ..models import Comment, TrendingEpoch
 from .test_resources import get_saved_test_movie
 
 
@@ -133,3 +135,137 @@ class CommentsViewTests(APITestCase):
         response = self.client.post(self.get_url(), data, format='json')
         self.assertEqual(json.loads(response.content).get("message"), "wrong id provided")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comments_get_paginated(self):
+        """ If limit is provided, comments should be returned in pages,
+        each with a cursor pointing to the next one. """
+        movie = get_saved_test_movie()
+        for i in range(5):
+            movie.comments.create(text=f"test comment {i}")
+        texts, cursor, pages = list(), "", 0
+        while cursor is not None:
+            response = self.client.get(f"{self.get_url()}?limit=2&cursor={cursor}", format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = json.loads(response.content)
+            self.assertLessEqual(len(content["Results"]), 2)
+            texts += [c["Text"] for c in content["Results"]]
+            cursor, pages = content["NextCursor"], pages + 1
+        self.assertEqual(texts, [f"test comment {i}" for i in range(5)])
+        self.assertEqual(pages, 3)
+
+    def test_comments_get_paginated_with_movie_id(self):
+        """ Pagination should also work for comments of a single movie. """
+        movie = get_saved_test_movie()
+        another_movie = get_saved_test_movie()
+        movie.comments.create(text="test comment 1")
+        another_movie.comments.create(text="test comment for another movie 1")
+        another_movie.comments.create(text="test comment for another movie 2")
+        response = self.client.get(f"{self.get_url()}?id={another_movie.pk}&limit=1",
+                                   format='json')
+        content = json.loads(response.content)
+        self.assertEqual([c["Text"] for c in content["Results"]],
+                         ["test comment for another movie 1"])
+        response = self.client.get(f"{self.get_url()}?id={another_movie.pk}&limit=1"
+                                   f"&cursor={content['NextCursor']}", format='json')
+        content = json.loads(response.content)
+        self.assertEqual([c["Text"] for c in content["Results"]],
+                         ["test comment for another movie 2"])
+        self.assertIsNone(content["NextCursor"])
+
+    def test_comments_get_with_wrong_pagination(self):
+        """ If limit or cursor are formatted incorrectly
+        information about it should be returned. """
+        for params, message in (("limit=abc", "wrong limit provided"),
+                                ("limit=0", "wrong limit provided"),
+                                ("cursor=abc", "wrong cursor provided")):
+            response = self.client.get(f"{self.get_url()}?{params}", format='json')
+            self.assertEqual(json.loads(response.content).get("message"), message)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comments_get_streamed(self):
+        """ Streamed comments, both as JSON lines and as JSON array,
+        should be the same as regular response. """
+        movie = get_saved_test_movie()
+        for i in range(3):
+            movie.comments.create(text=f"test comment {i}")
+        expected = json.loads(self.client.get(self.get_url(), format='json').content)
+
+        response = self.client.get(f"{self.get_url()}?stream=ndjson", format='json')
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+        response = self.client.get(f"{self.get_url()}?stream=json", format='json')
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), expected)
+
+        first_id = Comment.objects.first().pk
+        response = self.client.get(f"{self.get_url()}?stream=json&cursor={first_id}",
+                                   format='json')
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), expected[1:])
+
+    def test_comments_get_streamed_with_wrong_format(self):
+        response = self.client.get(f"{self.get_url()}?stream=xml", format='json')
+        self.assertEqual(json.loads(response.content).get("message"),
+                         "wrong stream format provided")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comments_post_batch(self):
+        """ If list of comments is POSTed, all of them should be saved at once. """
+        movie = get_saved_test_movie()
+        another_movie = get_saved_test_movie()
+        data = [{"id": movie.pk, "text": "test comment 1"},
+                {"id": another_movie.pk, "text": "test comment 2"},
+                {"id": movie.pk, "text": "test comment 3"}]
+        today = datetime.date.today()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.get_url(), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        queries = [q["sql"] for q in context.captured_queries]
+        epoch_read = f"FROM {connection.ops.quote_name(TrendingEpoch._meta.db_table)}"
+        self.assertEqual(len([q for q in queries if q.startswith("SELECT")
+                              and epoch_read not in q]), 1)
+        self.assertEqual(len([q for q in queries if epoch_read in q]), 1)
+        comment_insert = f"INSERT INTO {connection.ops.quote_name(Comment._meta.db_table)} "
+        self.assertEqual(len([q for q in queries if q.startswith(comment_insert)]), 1)
+        content = json.loads(response.content)
+        self.assertEqual(content["Errors"], [])
+        self.assertEqual(content["Created"],
+                         [{"MovieId": d["id"], "Text": d["text"],
+                           "CreatedDate": today.strftime('%d %b %Y')} for d in data])
+        self.assertEqual(len(Comment.for_movie(movie)), 2)
+        self.assertEqual(len(Comment.for_movie(another_movie)), 1)
+        self.assertEqual(movie.daily_comment_counts.get(day=today).count, 2)
+
+    def test_comments_post_batch_with_errors(self):
+        """ Comments that can't be saved should be reported with their
+        index in the batch, without failing the whole batch. """
+        movie = get_saved_test_movie()
+        data = [{"id": movie.pk, "text": "test comment 1"},
+                {"id": movie.pk + 1, "text": "test comment 2"},
+                {"id": "abc", "text": "test comment 3"},
+                {"text": "test comment 4"},
+                {"id": movie.pk, "text": None},
+                "test comment 5"]
+        response = self.client.post(self.get_url(), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        content = json.loads(response.content)
+        self.assertEqual([c["Text"] for c in content["Created"]], ["test comment 1"])
+        self.assertEqual(content["Errors"],
+                         [{"Index": 1, "message": "movie with given id not found"},
+                          {"Index": 2, "message": "wrong id provided"},
+                          {"Index": 3, "message": "no movie id or no comment text provided"},
+                          {"Index": 4, "message": "no movie id or no comment text provided"},
+                          {"Index": 5, "message": "no movie id or no comment text provided"}])
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_comments_post_batch_all_failed(self):
+        movie = get_saved_test_movie()
+        response = self.client.post(self.get_url(), [{"id": movie.pk + 1, "text": "test"}],
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_comments_post_empty_batch(self):
+        response = self.client.post(self.get_url(), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"message": "no comments provided"})
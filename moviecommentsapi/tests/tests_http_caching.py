@@ -0,0 +1,100 @@
+import datetime
+from unittest import mock
+
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Comment, ResourceVersion
+from .test_resources import get_saved_test_movie
+
+
+class HTTPCachingTests(APITestCase):
+
+    def setUp(self):
+        self.movie = get_saved_test_movie()
+        self.movie.comments.create(text="test comment")
+        self.backdate_versions()
+
+    @staticmethod
+    def backdate_versions():
+        """ Last-Modified is only sent once the second of the last change is over. """
+        ResourceVersion.objects.update(modified=timezone.now() - datetime.timedelta(minutes=1))
+
+    def assert_not_modified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        return response
+
+    def test_validators_set(self):
+        for url in ('/movies/', '/comments/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.has_header("ETag"))
+            self.assertTrue(response.has_header("Last-Modified"))
+            self.assertIn("must-revalidate", response["Cache-Control"])
+
+    def test_not_modified_for_current_etag(self):
+        for url in ('/movies/', '/comments/', f'/comments/?id={self.movie.pk}&limit=1'):
+            etag = self.client.get(url)["ETag"]
+            response = self.assert_not_modified(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response["ETag"], etag)
+
+    def test_not_modified_since_last_modification(self):
+        last_modified = self.client.get('/movies/')["Last-Modified"]
+        self.assert_not_modified('/movies/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    def test_no_last_modified_in_the_second_of_change(self):
+        """ Another change could be made later in the same second, client sending
+        that second as If-Modified-Since would get an outdated list. """
+        now = timezone.now()
+        ResourceVersion.objects.update(modified=now)
+        with mock.patch("moviecommentsapi.views.caching.time.time", return_value=now.timestamp()):
+            response = self.client.get('/movies/')
+            self.assertFalse(response.has_header("Last-Modified"))
+            ResourceVersion.bump(ResourceVersion.MOVIES)
+            response = self.client.get('/movies/',
+                                       HTTP_IF_MODIFIED_SINCE=http_date(now.timestamp()))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_differs_between_pages(self):
+        self.assertNotEqual(self.client.get('/comments/?limit=1')["ETag"],
+                            self.client.get('/comments/?limit=2')["ETag"])
+
+    def test_new_comment_changes_only_comments_etag(self):
+        movies_etag, comments_etag = self.client.get('/movies/')["ETag"], \
+            self.client.get('/comments/')["ETag"]
+        self.client.post('/comments/', {"id": self.movie.pk, "text": "another comment"},
+                         format="json")
+        response = self.client.get('/comments/', HTTP_IF_NONE_MATCH=comments_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 2)
+        self.assert_not_modified('/movies/', HTTP_IF_NONE_MATCH=movies_etag)
+
+    def test_comments_batch_changes_etag(self):
+        etag = self.client.get('/comments/')["ETag"]
+        Comment.bulk_create([Comment(movie=self.movie, text="bulk comment")])
+        self.assertNotEqual(self.client.get('/comments/')["ETag"], etag)
+
+    def test_new_movie_changes_movies_etag(self):
+        etag = self.client.get('/movies/')["ETag"]
+        get_saved_test_movie()
+        self.assertNotEqual(self.client.get('/movies/')["ETag"], etag)
+
+    def test_movie_deletion_changes_comments_etag(self):
+        etag = self.client.get('/comments/')["ETag"]
+        self.movie.delete()
+        response = self.client.get('/comments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+
+    def test_versions_of_resources_never_written(self):
+        ResourceVersion.objects.all().delete()
+        self.assertEqual(ResourceVersion.get(ResourceVersion.MOVIES),
+                         {ResourceVersion.MOVIES: (0, None)})
+        response = self.client.get('/movies/')
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assert_not_modified('/movies/', HTTP_IF_NONE_MATCH=response["ETag"])
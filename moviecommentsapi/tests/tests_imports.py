@@ -0,0 +1,147 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.utils import json
+
+from ..imports import MovieImporter
+from ..management.commands.import_movies import Command as ImportMoviesCommand
+from ..models import Movie
+from ..views.movies import import_movies
+from .test_resources import MockMovieDetailsProvider, get_expected_external_api_response, \
+    get_saved_test_movie
+from .tests_movies_views import MockRequest
+
+
+def get_details_with_title(title):
+    return dict(get_expected_external_api_response(), Title=title)
+
+
+class TitleMockMovieDetailsProvider(MockMovieDetailsProvider):
+    """ Returns details with formal title being requested title with capital letters. """
+
+    def get_details(self, title):
+        if title == "not existing":
+            raise APIException("Movie not found!")
+        return get_details_with_title(title.title())
+
+    def get_formal_title(self, title):
+        return title.title()
+
+
+class MovieImporterTests(TestCase):
+
+    def test_import_titles(self):
+        """ Looked up titles should be saved along with their ratings. """
+        report = MovieImporter(TitleMockMovieDetailsProvider).run(["shrek", "the room"])
+        self.assertEqual(sorted(m["Title"] for m in report["Created"]), ["Shrek", "The Room"])
+        self.assertEqual(report["Existing"], [])
+        self.assertEqual(report["Errors"], [])
+        for created in report["Created"]:
+            movie = Movie.objects.get(pk=created["Id"])
+            self.assertEqual(movie.title, created["Title"])
+            self.assertEqual(movie.ratings.count(), 3)
+
+    def test_import_documents(self):
+        """ Documents should be saved without looking them up. """
+        report = MovieImporter(None).run([get_details_with_title("Shrek")])
+        self.assertEqual([m["Title"] for m in report["Created"]], ["Shrek"])
+        self.assertEqual(Movie.objects.get().genre, "Horror")
+
+    def test_import_existing_and_duplicated(self):
+        """ Saved movies and titles repeated in import, also with different
+        spelling, shouldn't be saved again. """
+        movie = get_saved_test_movie()
+        report = MovieImporter(TitleMockMovieDetailsProvider).run(
+            ["it", "IT ", "shrek", get_details_with_title("Shrek"), "Shrek  "])
+        self.assertEqual(report["Existing"], [{"Id": movie.pk, "Title": "It"}])
+        self.assertEqual([m["Title"] for m in report["Created"]], ["Shrek"])
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_import_existing_found_by_normalized_title(self):
+        """ Titles are matched with saved ones the same way as titles of requested
+        movies, so spellings of a saved title aren't looked up at all. """
+        movie = get_saved_test_movie()
+        movie.title = "The Room"
+        movie.save()
+        report = MovieImporter(None).run(["THE ROOM", "  the \t room "])
+        self.assertEqual(report["Existing"], [{"Id": movie.pk, "Title": "The Room"}])
+        self.assertEqual(report["Errors"], [])
+
+    def test_import_formal_title_existing(self):
+        """ Titles which turn out to be already saved under formal title
+        shouldn't be saved again. """
+        movie = get_saved_test_movie()
+        movie.title = "The Room"
+        movie.save()
+        report = MovieImporter(TitleMockMovieDetailsProvider).run(["the  room"])
+        self.assertEqual(report["Created"], [])
+        self.assertEqual(report["Existing"], [{"Id": movie.pk, "Title": "The Room"}])
+
+    def test_import_errors(self):
+        """ Titles that can't be looked up and invalid documents should be reported,
+        without stopping import of other movies. """
+        invalid = get_details_with_title("Invalid")
+        del invalid["Year"]
+        report = MovieImporter(TitleMockMovieDetailsProvider).run(
+            ["not existing", invalid, "", "shrek"])
+        self.assertEqual([m["Title"] for m in report["Created"]], ["Shrek"])
+        self.assertEqual([(e["Title"], e["message"]) for e in report["Errors"]],
+                         [("", "no movie title provided"),
+                          ("not existing", "Movie not found!"),
+                          ("Invalid", "wrong movie details provided")])
+
+    def test_import_in_batches(self):
+        titles = [f"movie {i}" for i in range(7)]
+        report = MovieImporter(TitleMockMovieDetailsProvider, workers=3, batch_size=2).run(titles)
+        self.assertEqual(len(report["Created"]), 7)
+        self.assertEqual(Movie.objects.count(), 7)
+
+
+class MoviesImportViewTests(TestCase):
+
+    def test_import_response(self):
+        get_saved_test_movie()
+        response = import_movies(MockRequest(["it", "shrek"]), TitleMockMovieDetailsProvider)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        content = json.loads(response.content)
+        self.assertEqual([m["Title"] for m in content["Created"]], ["Shrek"])
+        self.assertEqual([m["Title"] for m in content["Existing"]], ["It"])
+
+    def test_import_nothing_created(self):
+        get_saved_test_movie()
+        response = import_movies(MockRequest(["it"]), TitleMockMovieDetailsProvider)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_import_without_movies(self):
+        for data in ([], {"title": "It"}):
+            response = import_movies(MockRequest(data), TitleMockMovieDetailsProvider)
+            self.assertEqual(json.loads(response.content).get("message"),
+                             "no movie titles or details provided")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportMoviesCommandTests(TestCase):
+
+    def test_import_from_file(self):
+        """ Lines can be movie documents, JSON strings or plain titles. """
+        get_saved_test_movie()
+        lines = [json.dumps(get_details_with_title("Shrek")), json.dumps("It"), "", "it"]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as file:
+            file.write("\n".join(lines))
+        try:
+            out = StringIO()
+            call_command("import_movies", file.name, chunk_size=2, stdout=out)
+        finally:
+            os.remove(file.name)
+        self.assertIn("Imported 1 movies, 2 already existed, 0 failed.", out.getvalue())
+        self.assertTrue(Movie.objects.filter(title="Shrek").exists())
+
+    def test_numeric_lines_parsed_as_titles(self):
+        self.assertEqual([ImportMoviesCommand.parse(line) for line in
+                          ("1917\n", " 300 ", '"1917"\n', "null\n", '{"Title": "300"}\n')],
+                         ["1917", "300", "1917", "null", {"Title": "300"}])
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+
+from ..locks import single_flight
+from ..models import Movie
+from ..views.movies import post_movies
+from .test_resources import MockMovieDetailsProvider
+from .tests_movies_views import MockRequest
+
+
+def run_concurrently(func, args_list):
+    results = [None] * len(args_list)
+
+    def run(i, args):
+        try:
+            results[i] = func(*args)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def run_with_lock(self, keys):
+        """ Returns the highest number of concurrently running calls for each key. """
+        running, highest, guard = dict(), dict(), threading.Lock()
+
+        def call(key):
+            with single_flight(key):
+                with guard:
+                    running[key] = running.get(key, 0) + 1
+                    highest[key] = max(highest.get(key, 0), running[key])
+                time.sleep(0.05)
+                with guard:
+                    running[key] -= 1
+
+        threads = [threading.Thread(target=call, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return highest
+
+    def test_same_key_serialized(self):
+        self.assertEqual(self.run_with_lock(["a"] * 5), {"a": 1})
+
+    def test_different_keys_not_blocked(self):
+        start = time.monotonic()
+        self.run_with_lock(["a", "b", "c", "d"])
+        self.assertLess(time.monotonic() - start, 0.15)
+
+    @override_settings(MOVIE_CREATION_LOCK="cache")
+    def test_same_key_serialized_with_cache_lock(self):
+        self.assertEqual(self.run_with_lock(["a"] * 3), {"a": 1})
+
+
+class SlowMockMovieDetailsProvider(MockMovieDetailsProvider):
+    calls = 0
+
+    def get_details(self, title):
+        SlowMockMovieDetailsProvider.calls += 1
+        time.sleep(0.1)
+        return super().get_details(title)
+
+    def get_formal_title(self, title):
+        return "It"
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentMoviePostTests(TransactionTestCase):
+
+    def test_concurrent_posts_of_same_title(self):
+        """ Only one of concurrent requests for the same title should look it up
+        and create the movie, others should return the created movie. """
+        SlowMockMovieDetailsProvider.calls = 0
+        titles = ["It", "it", " IT "]
+        responses = run_concurrently(
+            lambda t: post_movies(MockRequest({"title": t}), SlowMockMovieDetailsProvider()),
+            [(t,) for t in titles])
+        self.assertEqual(Movie.objects.count(), 1)
+        self.assertEqual(SlowMockMovieDetailsProvider.calls, 1)
+        self.assertEqual(sorted(r.status_code for r in responses), [200, 200, 201])
@@ -0,0 +1,70 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import Movie
+from .test_resources import get_saved_test_movie
+
+
+class MovieFiltersTests(APITestCase):
+
+    def setUp(self):
+        self.it = get_saved_test_movie()
+        self.shining = self.save_movie(title="The Shining", year=1980, genre="Drama, Horror",
+                                       director="Stanley Kubrick",
+                                       actors="Jack Nicholson, Shelley Duvall",
+                                       language="English", country="UK, USA")
+        self.heat = self.save_movie(title="Heat", year=1995, genre="Crime, Drama, Thriller",
+                                    director="Michael Mann", actors="Al Pacino, Robert De Niro",
+                                    language="English, Spanish", country="USA")
+
+    @staticmethod
+    def save_movie(**fields):
+        movie = Movie.objects.get(pk=get_saved_test_movie().pk)
+        for field, value in fields.items():
+            setattr(movie, field, value)
+        movie.save()
+        return movie
+
+    def get_titles(self, query_string):
+        response = self.client.get(f'/movies/?{query_string}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [m["Title"] for m in response.json()]
+
+    def test_list_fields_matched_as_whole_items(self):
+        self.assertEqual(self.get_titles("genre=horror"), ["It", "The Shining"])
+        self.assertEqual(self.get_titles("genre=Drama"), ["The Shining", "Heat"])
+        self.assertEqual(self.get_titles("genre=Thrill"), [])
+        self.assertEqual(self.get_titles("language=spanish"), ["Heat"])
+        self.assertEqual(self.get_titles("country=USA&sort=t"), ["Heat", "It", "The Shining"])
+        self.assertEqual(self.get_titles("country=Canada"), ["It"])
+
+    def test_people_matched_by_any_part_of_name(self):
+        self.assertEqual(self.get_titles("director=muschietti"), ["It"])
+        self.assertEqual(self.get_titles("actors=De Niro"), ["Heat"])
+        self.assertEqual(self.get_titles("actors=jack&actors=shelley"), ["The Shining"])
+        self.assertEqual(self.get_titles("actors=jack&actors=pacino"), [])
+
+    def test_title_prefix(self):
+        self.assertEqual(self.get_titles("title=the sh"), ["The Shining"])
+        self.assertEqual(self.get_titles("title=hea"), ["Heat"])
+        self.assertEqual(self.get_titles("title=shining"), [])
+
+    def test_year_ranges(self):
+        self.assertEqual(self.get_titles("year=1995"), ["Heat"])
+        self.assertEqual(self.get_titles("year=1980-1995"), ["The Shining", "Heat"])
+        self.assertEqual(self.get_titles("year=1990-"), ["It", "Heat"])
+        self.assertEqual(self.get_titles("year=-1990"), ["The Shining"])
+
+    def test_filters_combined_with_sorting_and_pages(self):
+        self.assertEqual(self.get_titles("genre=horror&year=2017&director=andy muschietti"),
+                         ["It"])
+        self.assertEqual(self.get_titles("genre=drama&sort=-y"), ["Heat", "The Shining"])
+        response = self.client.get('/movies/?genre=drama&sort=y&limit=1').json()
+        self.assertEqual(([m["Title"] for m in response["Results"]], response["NextOffset"]),
+                         (["The Shining"], 1))
+
+    def test_wrong_year(self):
+        for year in ("abc", "-", "1990-abc"):
+            response = self.client.get(f'/movies/?year={year}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {"message": "wrong year provided"})
@@ -0,0 +1,149 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.test import APITestCase
+from rest_framework.utils import json
+
+from ..lookups import process_lookups
+from ..models import Movie, MovieLookup
+from ..views.movies import post_movies
+from .test_resources import MockMovieDetailsProvider, get_expected_api_response, \
+    get_saved_test_movie
+from .tests_movies_views import MockRequest
+
+
+class FailingMockMovieDetailsProvider(MockMovieDetailsProvider):
+    NOT_FOUND_ERROR = "Movie not found!"
+    error = "Request limit reached!"
+
+    def get_details(self, title):
+        raise APIException(self.error)
+
+
+class BrokenMockMovieDetailsProvider(MockMovieDetailsProvider):
+
+    def get_details(self, title):
+        if title == "Broken":
+            raise DatabaseError("Unexpected error!")
+        return super().get_details(title)
+
+
+class MovieLookupsTests(APITestCase):
+    maxDiff = None
+
+    def post_async(self, title):
+        return post_movies(MockRequest({"title": title, "async": "true"}),
+                           MockMovieDetailsProvider())
+
+    def test_async_post_queues_lookup(self):
+        """ If async param is set, title should only be queued for lookup. """
+        response = self.post_async("It")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        lookup = MovieLookup.objects.get()
+        self.assertEqual(json.loads(response.content),
+                         {"Id": lookup.pk, "Title": "It", "Status": "pending",
+                          "StatusUrl": f"/movies/lookups/{lookup.pk}/"})
+        self.assertEqual(Movie.objects.count(), 0)
+
+    @override_settings(MOVIES_ASYNC_LOOKUPS=True)
+    def test_async_post_by_default(self):
+        response = post_movies(MockRequest({"title": "It"}), MockMovieDetailsProvider())
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = post_movies(MockRequest({"title": "It", "async": "false"}),
+                               MockMovieDetailsProvider())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_async_post_of_existing_movie(self):
+        """ Saved movies should be returned right away. """
+        get_saved_test_movie()
+        response = self.post_async("it")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(MovieLookup.objects.count(), 0)
+
+    def test_async_post_of_queued_title(self):
+        """ Title waiting for lookup shouldn't be queued again. """
+        first = json.loads(self.post_async("It").content)
+        second = json.loads(self.post_async(" it ").content)
+        self.assertEqual(first["Id"], second["Id"])
+        self.assertEqual(MovieLookup.objects.count(), 1)
+
+    def test_lookup_processed(self):
+        """ Worker should save looked up movie, which then should
+        be returned by lookup status endpoint. """
+        lookup_id = json.loads(self.post_async("It").content)["Id"]
+        self.assertEqual(len(process_lookups(MockMovieDetailsProvider)), 1)
+        self.assertEqual(process_lookups(MockMovieDetailsProvider), [])
+        movie = Movie.objects.get()
+        response = self.client.get(f"/movies/lookups/{lookup_id}/", format='json')
+        expected_movie = get_expected_api_response()
+        expected_movie["Id"] = movie.pk
+        self.assertEqual(json.loads(response.content),
+                         {"Id": lookup_id, "Title": "It", "Status": "done",
+                          "StatusUrl": f"/movies/lookups/{lookup_id}/",
+                          "Movie": expected_movie})
+
+    def test_lookup_of_movie_saved_in_the_meantime(self):
+        self.post_async("It")
+        movie = get_saved_test_movie()
+        process_lookups(MockMovieDetailsProvider)
+        self.assertEqual(MovieLookup.objects.get().movie, movie)
+        self.assertEqual(Movie.objects.count(), 1)
+
+    @override_settings(MOVIE_LOOKUP_MAX_ATTEMPTS=2)
+    def test_lookup_retried(self):
+        """ Failed lookups should be retried until they run out of attempts. """
+        self.post_async("It")
+        process_lookups(FailingMockMovieDetailsProvider)
+        self.assertEqual(MovieLookup.objects.get().status, MovieLookup.PENDING)
+        process_lookups(FailingMockMovieDetailsProvider)
+        lookup = MovieLookup.objects.get()
+        self.assertEqual((lookup.status, lookup.attempts), (MovieLookup.FAILED, 2))
+        response = self.client.get(f"/movies/lookups/{lookup.pk}/", format='json')
+        self.assertEqual(json.loads(response.content)["message"], "Request limit reached!")
+
+    def test_lookup_of_not_existing_movie_not_retried(self):
+        self.post_async("It")
+        with mock.patch.object(FailingMockMovieDetailsProvider, "error", "Movie not found!"):
+            process_lookups(FailingMockMovieDetailsProvider)
+        self.assertEqual(MovieLookup.objects.get().status, MovieLookup.FAILED)
+
+    def test_unexpected_error_fails_only_its_lookup(self):
+        self.post_async("Broken")
+        self.post_async("It")
+        with self.assertLogs("moviecommentsapi.lookups", level="ERROR"):
+            process_lookups(BrokenMockMovieDetailsProvider)
+        broken, processed = MovieLookup.objects.order_by("pk")
+        self.assertEqual((broken.status, broken.error), (MovieLookup.PENDING, "Unexpected error!"))
+        self.assertEqual(processed.status, MovieLookup.DONE)
+
+    def test_abandoned_lookup_claimed_again(self):
+        """ Lookups claimed by workers that didn't finish them should be claimed
+        again after claim expires. """
+        self.post_async("It")
+        self.assertEqual(len(MovieLookup.claim(10, datetime.timedelta(minutes=1))), 1)
+        self.assertEqual(MovieLookup.claim(10, datetime.timedelta(minutes=1)), [])
+        MovieLookup.objects.update(claimed_until=datetime.datetime(2019, 1, 1,
+                                                                   tzinfo=datetime.timezone.utc))
+        self.assertEqual(len(MovieLookup.claim(10, datetime.timedelta(minutes=1))), 1)
+
+    def test_lookup_status_not_found(self):
+        response = self.client.get("/movies/lookups/1/", format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProcessMovieLookupsCommandTests(TestCase):
+
+    def test_process_once(self):
+        MovieLookup.enqueue("It")
+        out = StringIO()
+        with mock.patch("moviecommentsapi.management.commands.process_movie_lookups."
+                        "OMDbDetailsProvider", MockMovieDetailsProvider):
+            call_command("process_movie_lookups", once=True, stdout=out)
+        self.assertEqual(out.getvalue(), "It: done\n")
+        self.assertEqual(Movie.objects.count(), 1)
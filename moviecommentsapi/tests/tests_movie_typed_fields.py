@@ -0,0 +1,116 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from ..imports import MovieImporter
+from ..models import Movie, Genre, Person
+from ..parsing import parse_integer, parse_rating, parse_date, split_names
+from .test_resources import get_saved_test_movie, get_expected_api_response, \
+    get_expected_external_api_response
+
+
+class ParsingTests(TestCase):
+
+    def test_parse_integer(self):
+        for text, number in (("376,032", 376032), ("$326,898,358", 326898358), ("135 min", 135),
+                             ("69", 69), ("N/A", None), ("", None)):
+            self.assertEqual(parse_integer(text), number, text)
+
+    def test_parse_rating(self):
+        for text, rating in (("7.4", Decimal("7.4")), ("10", Decimal("10.0")), ("N/A", None),
+                             ("NaN", None), ("Infinity", None), ("-1", None)):
+            self.assertEqual(parse_rating(text), rating, text)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date("08 Sep 2017"), datetime.date(2017, 9, 8))
+        self.assertIsNone(parse_date("N/A"))
+
+    def test_split_names(self):
+        self.assertEqual(split_names("Drama, Horror,Drama, "), ["Drama", "Horror"])
+        self.assertEqual(split_names("N/A"), [])
+
+
+class MovieTypedFieldsTests(APITestCase):
+
+    def test_typed_fields_filled(self):
+        movie = Movie.objects.get(pk=get_saved_test_movie().pk)
+        self.assertEqual((movie.imdb_rating_value, movie.imdb_votes_value, movie.metascore_value,
+                          movie.runtime_minutes, movie.box_office_value, movie.released_date,
+                          movie.dvd_date),
+                         (Decimal("7.4"), 376032, 69, 135, 326898358, datetime.date(2017, 9, 8),
+                          datetime.date(2018, 1, 9)))
+
+    def test_typed_fields_follow_text_fields(self):
+        movie = get_saved_test_movie()
+        movie.imdb_votes = "N/A"
+        movie.save()
+        self.assertIsNone(Movie.objects.get(pk=movie.pk).imdb_votes_value)
+
+    def test_genres_and_people_linked(self):
+        movie = get_saved_test_movie()
+        self.assertEqual(list(movie.genres.values_list("name", flat=True)), ["Horror"])
+        self.assertEqual(list(movie.directors.values_list("name", flat=True)),
+                         ["Andy Muschietti"])
+        self.assertEqual(movie.cast.count(), 4)
+        movie.genre, movie.actors = "Horror, Drama", "Finn Wolfhard"
+        movie.save()
+        self.assertEqual(sorted(movie.genres.values_list("name", flat=True)), ["Drama", "Horror"])
+        self.assertEqual(list(movie.cast.values_list("name", flat=True)), ["Finn Wolfhard"])
+        get_saved_test_movie()
+        self.assertEqual((Genre.objects.count(), Person.objects.count()), (2, 5))
+
+    def test_links_kept_when_other_fields_saved(self):
+        movie = Movie.objects.get(pk=get_saved_test_movie().pk)
+        movie.plot = "Changed plot"
+        with CaptureQueriesContext(connection) as queries:
+            movie.save()
+        link_tables = {Movie._meta.get_field(relation).remote_field.through._meta.db_table
+                       for relation in ("genres", "directors", "cast")}
+        self.assertFalse([q["sql"] for q in queries.captured_queries
+                          if any(table in q["sql"] for table in link_tables)])
+        movie.director = "Someone Else"
+        movie.save()
+        self.assertEqual(list(movie.directors.values_list("name", flat=True)), ["Someone Else"])
+
+    def test_imported_movies_linked(self):
+        MovieImporter(None).run([dict(get_expected_external_api_response(), Title="Shrek",
+                                      Genre="Animation, Comedy", imdbRating="7.9")])
+        movie = Movie.objects.get()
+        self.assertEqual(sorted(movie.genres.values_list("name", flat=True)),
+                         ["Animation", "Comedy"])
+        self.assertEqual(movie.imdb_rating_value, Decimal("7.9"))
+
+    def test_public_json_unchanged(self):
+        movie = get_saved_test_movie()
+        expected = get_expected_api_response()
+        expected["Id"] = movie.pk
+        self.assertEqual(self.client.get('/movies/').json(), [expected])
+
+    def test_sorted_by_typed_fields(self):
+        low, high = get_saved_test_movie(), get_saved_test_movie()
+        for movie, rating, votes, box_office in ((low, "9.1", "1,000", "$20,000"),
+                                                 (high, "10.0", "999", "$3,000")):
+            movie.imdb_rating, movie.imdb_votes, movie.box_office = rating, votes, box_office
+            movie.save()
+        for sort, ids in (("rating", [low.pk, high.pk]), ("-r", [high.pk, low.pk]),
+                          ("votes", [high.pk, low.pk]), ("-BoxOffice", [low.pk, high.pk])):
+            self.assertEqual([m["Id"] for m in self.client.get(f'/movies/?sort={sort}').json()],
+                             ids, sort)
+
+    def test_movies_without_value_sorted_last(self):
+        rated, unknown = get_saved_test_movie(), get_saved_test_movie()
+        unknown.imdb_rating = "N/A"
+        unknown.save()
+        for sort in ("rating", "-rating"):
+            self.assertEqual([m["Id"] for m in self.client.get(f'/movies/?sort={sort}').json()],
+                             [rated.pk, unknown.pk], sort)
+
+    def test_filtered_by_linked_genre(self):
+        movie = get_saved_test_movie()
+        Movie.objects.filter(pk=movie.pk).update(genre="Comedy")
+        self.assertEqual([m["Id"] for m in self.client.get('/movies/?genre=HORROR').json()],
+                         [movie.pk])
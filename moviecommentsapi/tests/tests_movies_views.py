@@ -7,7 +7,7 @@ from rest_framework.utils import json
 from ..views.movies import post_movies
 from ..models import Movie
 from .test_resources import MockMovieDetailsProvider, get_expected_api_response, \
-    get_saved_test_movie
+    get_saved_test_movie, assert_queries_independent_of_catalog_size
 
 
 class MoviesViewTests(APITestCase):
@@ -121,6 +121,61 @@ class MoviesViewTests(APITestCase):
             ex_mv["Id"] = mv.pk
         self.assertEqual(json.loads(response.content), expected)
 
+    def test_movies_get_with_descending_year_title_sorting(self):
+        """ If sort flag is prefixed with "-", movies should be returned in reversed order. """
+        years_titles = [(2010, "Bcd"), (1987, "Abc"), (2010, "Abc")]
+        movies = list()
+        for year, title in years_titles:
+            movie = get_saved_test_movie()
+            movie.year, movie.title = year, title
+            movie.save()
+            movies.append(movie)
+        response = self.client.get(f"{self.get_url()}?sort=-yeartitle", format='json')
+        expected = sorted(movies, key=lambda m: (m.year, m.title), reverse=True)
+        self.assertEqual([m["Id"] for m in json.loads(response.content)],
+                         [m.pk for m in expected])
+
+    def test_movies_get_paginated(self):
+        """ If limit is provided, movies should be returned in sorted pages,
+        each with an offset of the next one. """
+        titles = ["Bcd", "Abc", "Bde", "Cde", "Aaa"]
+        for title in titles:
+            movie = get_saved_test_movie()
+            movie.title = title
+            movie.save()
+        received, offset = list(), 0
+        while offset is not None:
+            response = self.client.get(f"{self.get_url()}?sort=title&limit=2&offset={offset}",
+                                       format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = json.loads(response.content)
+            self.assertLessEqual(len(content["Results"]), 2)
+            received += [m["Title"] for m in content["Results"]]
+            offset = content["NextOffset"]
+        self.assertEqual(received, sorted(titles))
+
+    def test_movies_get_with_wrong_pagination(self):
+        """ If limit or offset are formatted incorrectly
+        information about it should be returned. """
+        for params, message in (("limit=abc", "wrong limit provided"),
+                                ("offset=-1", "wrong offset provided")):
+            response = self.client.get(f"{self.get_url()}?{params}", format='json')
+            self.assertEqual(json.loads(response.content).get("message"), message)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_movies_get_number_of_queries(self):
+        """ Ratings should be fetched for all listed movies at once, so number
+        of queries shouldn't grow with number of movies. """
+        for params in ("", "?sort=-title", "?limit=5"):
+            assert_queries_independent_of_catalog_size(self, f"{self.get_url()}{params}")
+
+    def test_existing_movie_post_number_of_queries(self):
+        """ Details of an existing movie should be returned with its ratings
+        fetched in a single query. """
+        post_movies(MockRequest({'title': 'It'}), MockMovieDetailsProvider())
+        with self.assertNumQueries(3):
+            post_movies(MockRequest({'title': 'It'}), MockMovieDetailsProvider())
+
     @skip("Dependent on external calls. Can be run as a sanity check once in a while.")
     def test_response_after_first_movie_post_with_external_call(self):
         """ If movie title is POSTed for the first time object should be created
@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import APIException
+from rest_framework.utils import json
+
+from ..views.movies import OMDbDetailsProvider
+from .test_resources import get_expected_external_api_response
+
+
+class MockResponse:
+    def __init__(self, data, status_code=200):
+        self.text = json.dumps(data)
+        self.status_code = status_code
+
+
+class OMDbDetailsProviderCacheTests(TestCase):
+
+    def setUp(self):
+        caches[settings.OMDB_CACHE].clear()
+
+    @staticmethod
+    def mock_omdb(data):
+        return mock.patch.object(OMDbDetailsProvider.get_session(), "get",
+                                 return_value=MockResponse(data))
+
+    def test_details_shared_between_providers(self):
+        """ Details fetched by one provider should be reused by other ones,
+        also when title is requested with different spelling. """
+        with self.mock_omdb(get_expected_external_api_response()) as get:
+            details = OMDbDetailsProvider().get_details("It")
+            self.assertEqual(OMDbDetailsProvider().get_details("it"), details)
+            self.assertEqual(OMDbDetailsProvider().get_details("  IT "), details)
+        self.assertEqual(get.call_count, 1)
+
+    def test_details_cached_under_formal_title(self):
+        with self.mock_omdb(get_expected_external_api_response()) as get:
+            OMDbDetailsProvider().get_details("It 2017")
+            self.assertEqual(OMDbDetailsProvider().get_formal_title("It"), "It")
+        self.assertEqual(get.call_count, 1)
+
+    def test_not_found_cached(self):
+        """ Movies that don't exist shouldn't be looked up again. """
+        not_found = {"Response": "False", "Error": "Movie not found!"}
+        with self.mock_omdb(not_found) as get:
+            for _ in range(2):
+                with self.assertRaisesMessage(APIException, "Movie not found!"):
+                    OMDbDetailsProvider().get_details("Not existing movie")
+        self.assertEqual(get.call_count, 1)
+
+    def test_other_errors_not_cached(self):
+        """ Errors that aren't about movie itself (e.g. exceeded
+        request limit) shouldn't be cached. """
+        limit_reached = {"Response": "False", "Error": "Request limit reached!"}
+        with self.mock_omdb(limit_reached) as get:
+            for _ in range(2):
+                with self.assertRaisesMessage(APIException, "Request limit reached!"):
+                    OMDbDetailsProvider().get_details("It")
+        self.assertEqual(get.call_count, 2)
+
+    @override_settings(OMDB_CACHE_NOT_FOUND_TIMEOUT=0)
+    def test_not_found_timeout(self):
+        """ Not found responses should expire according to their own timeout. """
+        not_found = {"Response": "False", "Error": "Movie not found!"}
+        with self.mock_omdb(not_found) as get:
+            for _ in range(2):
+                with self.assertRaises(APIException):
+                    OMDbDetailsProvider().get_details("Not existing movie")
+        self.assertEqual(get.call_count, 2)
+
+
+class StubOMDbHandler(BaseHTTPRequestHandler):
+    """ Keeps connections alive and records every connection and request. """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        status, delay = self.server.responses.pop(0) if self.server.responses else (200, 0)
+        time.sleep(delay)
+        title = parse_qs(urlparse(self.path).query)["t"][0]
+        body = json.dumps(dict(get_expected_external_api_response(), Title=title)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOMDbServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubOMDbHandler)
+        self.connections, self.requests, self.responses = 0, 0, list()
+
+    def handle_error(self, request, client_address):
+        """ clients giving up on slow responses are expected """
+        pass
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class OMDbDetailsProviderHTTPTests(TestCase):
+
+    def setUp(self):
+        caches[settings.OMDB_CACHE].clear()
+        OMDbDetailsProvider.close_session()
+        self.server = StubOMDbServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings = override_settings(OMDB_URL=self.server.url, OMDB_READ_TIMEOUT=0.5,
+                                          OMDB_RETRY_BACKOFF=0)
+        self.settings.enable()
+
+    def tearDown(self):
+        OMDbDetailsProvider.close_session()
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        """ Consecutive lookups should reuse kept alive connection. """
+        for title in ("It", "Shrek", "The Room"):
+            self.assertEqual(OMDbDetailsProvider().get_details(title)["Title"], title)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retry_on_server_error(self):
+        """ Temporary OMDb failures should be retried. """
+        self.server.responses = [(503, 0), (502, 0)]
+        self.assertEqual(OMDbDetailsProvider().get_details("It")["Title"], "It")
+        self.assertEqual(self.server.requests, 3)
+
+    @override_settings(OMDB_MAX_RETRIES=0)
+    def test_read_timeout(self):
+        """ Slow OMDb shouldn't block request longer than read timeout. """
+        self.server.responses = [(200, 2)]
+        start = time.monotonic()
+        with self.assertRaisesMessage(APIException, "problem with external API occurred"):
+            OMDbDetailsProvider().get_details("It")
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    @override_settings(OMDB_MAX_RETRIES=1)
+    def test_retries_exhausted(self):
+        self.server.responses = [(503, 0), (503, 0)]
+        with self.assertRaisesMessage(APIException, "problem with external API occurred"):
+            OMDbDetailsProvider().get_details("It")
+        self.assertEqual(self.server.requests, 2)
@@ -0,0 +1,55 @@
+import random
+from io import StringIO
+from unittest import skipIf
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from .. import ranking
+from ..management.commands._benchmark import rank_dicts
+from ..ranking import rank_pairs, rank_totals
+from ..views.others import prepare_ranking
+
+
+class RankingTests(SimpleTestCase):
+
+    def random_pairs(self, rnd):
+        """ Unique movie ids, totals drawn from a range small enough to make ties common. """
+        count = rnd.choice((0, 1, 2, 10, 500, 2000))
+        movie_ids = rnd.sample(range(1, 5 * count + 2), count)
+        max_total = rnd.choice((0, 3, 50, 10 ** 6))
+        return [(movie_id, rnd.randint(0, max_total)) for movie_id in movie_ids]
+
+    def assert_matches_dicts(self, use_numpy):
+        rnd = random.Random(0)
+        for _ in range(200):
+            pairs = self.random_pairs(rnd)
+            expected = rank_dicts(pairs)
+            movie_ids, totals, ranks = rank_pairs(pairs, use_numpy=use_numpy)
+            self.assertEqual([{"MovieId": m, "TotalComments": t, "Rank": r}
+                              for m, t, r in zip(movie_ids, totals, ranks)], expected)
+            self.assertTrue(all(type(value) is int for value in movie_ids + totals + ranks))
+
+    def test_builtins_match_dict_ranking(self):
+        self.assert_matches_dicts(use_numpy=False)
+
+    @skipIf(ranking.numpy is None, "NumPy isn't installed")
+    def test_numpy_matches_dict_ranking(self):
+        self.assert_matches_dicts(use_numpy=True)
+
+    def test_ranks_are_dense(self):
+        self.assertEqual(rank_totals([4, 1, 3, 2, 5], [1, 7, 7, 0, 1], use_numpy=False),
+                         ([1, 3, 4, 5, 2], [7, 7, 1, 1, 0], [1, 1, 2, 2, 3]))
+        self.assertEqual(rank_pairs([]), ([], [], []))
+
+    def test_prepare_ranking_independent_of_order(self):
+        pairs = self.random_pairs(random.Random(1)) + [(10 ** 9, 0)]
+        shuffled = list(pairs)
+        random.Random(2).shuffle(shuffled)
+        self.assertEqual(prepare_ranking(shuffled), rank_dicts(pairs))
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command("benchmark_ranking", movies=[50], repeat=1, stdout=out)
+        self.assertIn("== 50 movies ==", out.getvalue())
+        self.assertIn("columns:", out.getvalue())
@@ -0,0 +1,115 @@
+import datetime
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from ..models import Comment
+from ..ranking_cache import RankingCache
+from .test_resources import get_saved_test_movie
+
+
+class RankingCacheTests(APITestCase):
+
+    def setUp(self):
+        caches[settings.TOP_CACHE].clear()
+        self.movie = get_saved_test_movie()
+        self.add_comment(datetime.date(2019, 8, 5))
+
+    def add_comment(self, created_date, movie=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = (movie or self.movie).comments.create(text="test comment")
+            comment.created_date = created_date
+            comment.save()
+        return comment
+
+    def get_top(self, date_from, date_to, include_all=False):
+        url = f'/top/?from={date_from.strftime("%d %b %Y")}&to={date_to.strftime("%d %b %Y")}'
+        return self.client.get(url + ("&include_all=True" if include_all else "")).json()
+
+    def test_ranking_cached(self):
+        august = (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        ranking = self.get_top(*august)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_top(*august), ranking)
+        self.assertEqual(RankingCache.stats(), {"Hits": 1, "Misses": 1, "HitRatio": 0.5,
+                                                "CachedRanges": 1})
+
+    def test_only_ranges_containing_comment_invalidated(self):
+        august = (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        september = (datetime.date(2019, 9, 1), datetime.date(2019, 9, 30))
+        self.get_top(*august), self.get_top(*september)
+        self.add_comment(datetime.date(2019, 8, 20))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_top(*august)[0]["TotalComments"], 2)
+        with self.assertNumQueries(0):
+            self.get_top(*september)
+
+    def test_batch_of_comments_invalidates_ranges(self):
+        august = (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        today = (datetime.date.today(), datetime.date.today())
+        self.get_top(*august), self.get_top(*today)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.bulk_create([Comment(movie=self.movie, text="bulk comment")])
+        self.assertEqual(self.get_top(*today)[0]["TotalComments"], 1)
+        with self.assertNumQueries(0):
+            self.get_top(*august)
+
+    def test_deleted_comment_invalidates_range(self):
+        august = (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        comment = self.add_comment(datetime.date(2019, 8, 20))
+        self.assertEqual(self.get_top(*august)[0]["TotalComments"], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.delete()
+        self.assertEqual(self.get_top(*august)[0]["TotalComments"], 1)
+
+    def test_new_movie_invalidates_only_rankings_including_all_movies(self):
+        august = (datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        self.get_top(*august), self.get_top(*august, include_all=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            another_movie = get_saved_test_movie()
+        self.assertEqual(self.get_top(*august, include_all=True)[-1],
+                         {"MovieId": another_movie.pk, "TotalComments": 0, "Rank": 2})
+        with self.assertNumQueries(0):
+            self.get_top(*august)
+
+    def test_ranking_computed_during_invalidation_not_cached(self):
+        day = datetime.date(2019, 8, 5)
+
+        def compute():
+            with self.captureOnCommitCallbacks(execute=True):
+                RankingCache.invalidate(days=[datetime.date(2019, 1, 1)])
+            return []
+
+        RankingCache.get_or_compute(day, day, False, compute)
+        self.assertEqual(RankingCache.stats()["CachedRanges"], 0)
+
+    def test_registry_locked_in_top_cache(self):
+        """ Another worker sharing the cache holds the lock of registry, ranking
+        is registered only after it's released. """
+        cache, day = caches[settings.TOP_CACHE], datetime.date(2019, 8, 5)
+        cache.add(f"lock:{RankingCache.RANGES_KEY}", "another worker", 10)
+        worker = threading.Thread(target=RankingCache.get_or_compute,
+                                  args=(day, day, False, lambda: []))
+        worker.start()
+        worker.join(0.3)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(RankingCache.stats()["CachedRanges"], 0)
+        cache.delete(f"lock:{RankingCache.RANGES_KEY}")
+        worker.join()
+        self.assertEqual(RankingCache.stats()["CachedRanges"], 1)
+
+    @override_settings(TOP_CACHE_MAX_RANGES=1)
+    def test_number_of_cached_ranges_limited(self):
+        self.get_top(datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        self.get_top(datetime.date(2019, 9, 1), datetime.date(2019, 9, 30))
+        self.assertEqual(RankingCache.stats()["CachedRanges"], 1)
+        with self.assertNumQueries(1):
+            self.get_top(datetime.date(2019, 9, 1), datetime.date(2019, 9, 30))
+
+    def test_stats_endpoint(self):
+        self.get_top(datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        self.assertEqual(self.client.get('/top/cache/').json(),
+                         {"Hits": 0, "Misses": 1, "HitRatio": 0.0, "CachedRanges": 1})
@@ -1,11 +1,14 @@
 import datetime
+from io import StringIO
 from itertools import zip_longest
 
+from django.core.management import call_command
 from django.test import TestCase
 
 from .test_resources import get_expected_api_response, get_expected_external_api_response, \
     get_saved_test_movie
-from ..serializers import MovieSerializer, CommentSerializer
+from ..models import Movie, Comment
+from ..serializers import MovieSerializer, CommentSerializer, ValuesSerializer
 
 
 class MovieSerializerTests(TestCase):
@@ -68,3 +71,48 @@ class CommentSerializerTests(TestCase):
         self.assertEqual(comment.text, comment_serialized["Text"])
         self.assertEqual(comment.created_date.strftime('%d %b %Y'),
                          comment_serialized["CreatedDate"])
+
+
+class ValuesSerializerTests(TestCase):
+    maxDiff = None
+
+    def test_movies_serialization(self):
+        """ Output should be exactly the same as serializer's, including order of keys. """
+        movie = get_saved_test_movie()
+        another_movie = get_saved_test_movie()
+        another_movie.ratings.all().delete()
+        movies = Movie.objects.order_by("-pk")
+        expected = MovieSerializer(movies, many=True).data
+        result = list(ValuesSerializer(MovieSerializer).serialize(movies))
+        self.assertEqual(result, expected)
+        self.assertEqual([list(r.keys()) for r in result], [list(e.keys()) for e in expected])
+        self.assertEqual([r["Id"] for r in result], [another_movie.pk, movie.pk])
+
+    def test_movies_serialization_in_chunks(self):
+        """ Nested objects should be matched properly when rows are split into chunks. """
+        for _ in range(5):
+            get_saved_test_movie()
+        movies = Movie.objects.order_by("pk")
+        self.assertEqual(list(ValuesSerializer(MovieSerializer, chunk_size=2).serialize(movies)),
+                         MovieSerializer(movies, many=True).data)
+
+    def test_comments_serialization(self):
+        movie = get_saved_test_movie()
+        for i, day in enumerate((datetime.date(2019, 3, 10), datetime.date(2019, 3, 11))):
+            comment = movie.comments.create(text=f"test comment {i}")
+            comment.created_date = day
+            comment.save()
+        comments = Comment.objects.order_by("pk")
+        result = list(ValuesSerializer(CommentSerializer).serialize(comments))
+        self.assertEqual(result, CommentSerializer(comments, many=True).data)
+        self.assertEqual(result[0], {"MovieId": movie.pk, "Text": "test comment 0",
+                                     "CreatedDate": "10 Mar 2019"})
+
+    def test_serializers_benchmark(self):
+        """ Benchmark should check both serializers give the same output
+        and leave no seeded data behind. """
+        out = StringIO()
+        call_command("benchmark_serializers", rows=[20], stdout=out)
+        self.assertIn("movies: serializer", out.getvalue())
+        self.assertIn("comments: serializer", out.getvalue())
+        self.assertEqual(Movie.objects.count(), 0)
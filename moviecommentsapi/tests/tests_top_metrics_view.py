@@ -0,0 +1,49 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..ranking import dense_ranks
+from .test_resources import get_saved_test_movie
+
+
+class TopMetricsViewTests(APITestCase):
+
+    def setUp(self):
+        self.movies = list()
+        for title, rating, box_office in (("Low", "6.1", "$100"), ("High", "8.0", "$1,000"),
+                                          ("Tied", "8.0", "N/A"), ("Unknown", "N/A", "$10")):
+            movie = get_saved_test_movie()
+            movie.title, movie.imdb_rating, movie.box_office = title, rating, box_office
+            movie.save()
+            self.movies.append(movie)
+
+    def get_top(self, query_string):
+        response = self.client.get(f'/top/metrics/?{query_string}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_ties_share_dense_rank(self):
+        low, high, tied, _ = self.movies
+        self.assertEqual(self.get_top("metric=imdbRating"),
+                         [{"MovieId": high.pk, "Title": "High", "imdbRating": "8.0", "Rank": 1},
+                          {"MovieId": tied.pk, "Title": "Tied", "imdbRating": "8.0", "Rank": 1},
+                          {"MovieId": low.pk, "Title": "Low", "imdbRating": "6.1", "Rank": 2}])
+
+    def test_top_k(self):
+        ranking = self.get_top("metric=BoxOffice&limit=2")
+        self.assertEqual([(m["Title"], m["BoxOffice"], m["Rank"]) for m in ranking],
+                         [("High", "$1,000", 1), ("Low", "$100", 2)])
+
+    def test_number_of_queries_independent_of_catalog_size(self):
+        for _ in range(20):
+            get_saved_test_movie()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.get_top("metric=imdbVotes&limit=3")), 3)
+
+    def test_wrong_params(self):
+        for query_string in ("", "metric=rating", "metric=Metascore&limit=0"):
+            response = self.client.get(f'/top/metrics/?{query_string}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query_string)
+
+    def test_dense_ranks(self):
+        self.assertEqual(list(dense_ranks([5, 5, 3, 2, 2, 2, 1])), [1, 1, 2, 3, 3, 3, 4])
+        self.assertEqual(list(dense_ranks([])), [])
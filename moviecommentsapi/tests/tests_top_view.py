@@ -1,6 +1,8 @@
 import datetime
 from itertools import zip_longest
 
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.utils import json
@@ -11,6 +13,9 @@ from .test_resources import get_saved_test_movie
 class TopViewTests(APITestCase):
     maxDiff = None
 
+    def setUp(self):
+        caches[settings.TOP_CACHE].clear()
+
     @staticmethod
     def get_url():
         return '/top/'
@@ -160,3 +165,13 @@ class TopViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(json.loads(response.content).get("message"), "wrong date format provided")
 
+    def test_top_query_count_independent_of_movies_number(self):
+        """ Ranking should be computed with a single query, no matter
+        how many movies are there in the database. """
+        for _ in range(5):
+            self.get_comment_with_date(get_saved_test_movie(), datetime.date(2019, 8, 5))
+        url = self.get_url_with_params(datetime.date(2019, 8, 1), datetime.date(2019, 8, 31))
+        with self.assertNumQueries(1):
+            self.client.get(url, format='json')
+        with self.assertNumQueries(1):
+            self.client.get(url + "&include_all=True", format='json')
@@ -0,0 +1,137 @@
+import datetime
+import threading
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import TrendingScore, TrendingEpoch
+from .test_resources import get_saved_test_movie
+from .tests_locks import run_concurrently
+
+
+@override_settings(TRENDING_HALF_LIFE_DAYS=7, TRENDING_MIN_SCORE=0.01)
+class TrendingTests(APITestCase):
+
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.movie, self.another_movie = get_saved_test_movie(), get_saved_test_movie()
+
+    def add_comment(self, movie, days_ago):
+        comment = movie.comments.create(text="test comment")
+        comment.created_date = self.today - datetime.timedelta(days=days_ago)
+        comment.save()
+        return comment
+
+    def get_trending(self, query_string=""):
+        response = self.client.get(f'/trending/?{query_string}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_recent_comments_weigh_more(self):
+        self.add_comment(self.movie, 14)
+        self.add_comment(self.movie, 14)
+        self.add_comment(self.movie, 14)
+        self.add_comment(self.another_movie, 0)
+        self.assertEqual(self.get_trending(),
+                         [{"MovieId": self.another_movie.pk, "Score": 1.0, "Rank": 1},
+                          {"MovieId": self.movie.pk, "Score": 0.75, "Rank": 2}])
+
+    def test_scores_follow_changes_of_comments(self):
+        comment = self.add_comment(self.movie, 7)
+        self.add_comment(self.another_movie, 7)
+        self.assertEqual([m["Rank"] for m in self.get_trending()], [1, 1])
+        comment.created_date = self.today
+        comment.save()
+        self.assertEqual(self.get_trending()[0], {"MovieId": self.movie.pk, "Score": 1.0,
+                                                  "Rank": 1})
+        comment.delete()
+        self.assertEqual(self.get_trending(),
+                         [{"MovieId": self.another_movie.pk, "Score": 0.5, "Rank": 1}])
+
+    def test_batch_of_comments_scored(self):
+        self.client.post('/comments/', [{"id": self.movie.pk, "text": "first"},
+                                        {"id": self.movie.pk, "text": "second"}], format="json")
+        self.assertEqual(self.get_trending(), [{"MovieId": self.movie.pk, "Score": 2.0,
+                                                "Rank": 1}])
+
+    def test_faded_scores_left_out(self):
+        self.add_comment(self.movie, 70)
+        self.add_comment(self.another_movie, 0)
+        self.assertEqual([m["MovieId"] for m in self.get_trending()], [self.another_movie.pk])
+
+    def test_top_read_with_constant_number_of_queries(self):
+        for days_ago in range(10):
+            self.add_comment(get_saved_test_movie(), days_ago)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.get_trending("limit=3")), 3)
+
+    def test_compaction_keeps_scores(self):
+        TrendingEpoch.objects.update(day=self.today - datetime.timedelta(days=700))
+        self.add_comment(self.movie, 1)
+        self.add_comment(self.another_movie, 80)
+        expected = TrendingScore.top(10)
+        out = StringIO()
+        call_command("compact_trending_scores", stdout=out)
+        self.assertIn("dropped 1 faded ones", out.getvalue())
+        self.assertEqual(TrendingEpoch.get(), self.today)
+        self.assertEqual(TrendingScore.top(10), expected)
+        self.assertAlmostEqual(TrendingScore.objects.get().weight, expected[0][1], places=4)
+
+    def test_rebuild_matches_maintained_scores(self):
+        for days_ago in (0, 3, 3, 10, 100):
+            self.add_comment(self.movie, days_ago)
+        self.add_comment(self.another_movie, 5)
+        expected = TrendingScore.top(10)
+        call_command("compact_trending_scores", rebuild=True, stdout=StringIO())
+        self.assertEqual(TrendingScore.top(10), expected)
+
+    def test_wrong_limit(self):
+        response = self.client.get('/trending/?limit=x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(TRENDING_HALF_LIFE_DAYS=7, TRENDING_MIN_SCORE=0.01)
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentTrendingTests(TransactionTestCase):
+
+    def test_compaction_waits_for_writers_which_dont_wait_for_each_other(self):
+        """ Writer holding its transaction open doesn't stop another one, while
+        compaction waits for it, so its weight is rescaled to the new epoch too. """
+        today = datetime.date.today()
+        TrendingEpoch.get()
+        TrendingEpoch.objects.update(day=today - datetime.timedelta(days=30))
+        movie, another_movie = get_saved_test_movie(), get_saved_test_movie()
+        held, events = threading.Event(), list()
+
+        def hold_score():
+            with transaction.atomic():
+                TrendingScore.add(movie.pk, today, 1)
+                held.set()
+                time.sleep(0.5)
+                events.append("committed")
+            return True
+
+        def add_score():
+            held.wait()
+            TrendingScore.add(another_movie.pk, today, 1)
+            events.append("added")
+            return True
+
+        def compact():
+            held.wait()
+            time.sleep(0.1)
+            TrendingScore.compact()
+            events.append("compacted")
+            return True
+
+        results = run_concurrently(lambda task: task(),
+                                   [(hold_score,), (add_score,), (compact,)])
+        self.assertNotIn(None, results)
+        self.assertEqual(events, ["added", "committed", "compacted"])
+        self.assertEqual(TrendingEpoch.get(), today)
+        self.assertEqual(sorted(TrendingScore.top(10)), [(movie.pk, 1.0), (another_movie.pk, 1.0)])
@@ -1,12 +1,19 @@
 from django.urls import path
 
-from .views.movies import movies
-from .views.comments import comments
-from .views.others import top
+from .views.movies import movies, movies_import, movie_lookup
+from .views.comments import comments, search_comments, comment_timeline
+from .views.others import top, top_cache, top_metrics, trending
 
 app_name = 'moviecommentsapi'
 urlpatterns = [
     path('movies/', movies, name='movies'),
+    path('movies/import/', movies_import, name='movies_import'),
+    path('movies/lookups/<int:lookup_id>/', movie_lookup, name='movie_lookup'),
     path('comments/', comments, name='comments'),
+    path('comments/search/', search_comments, name='search_comments'),
+    path('comments/timeline/', comment_timeline, name='comment_timeline'),
     path('top/', top, name='top'),
+    path('top/cache/', top_cache, name='top_cache'),
+    path('top/metrics/', top_metrics, name='top_metrics'),
+    path('trending/', trending, name='trending'),
 ]
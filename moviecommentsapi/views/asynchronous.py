@@ -0,0 +1,57 @@
+from functools import wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, QueryDict
+from rest_framework import status
+from rest_framework.utils import json
+
+
+def async_api_view(http_method_names):
+    """ Async counterpart of api_view for views answering with JsonResponse.
+    Parsed body and query string are set as request.data and request.query_params,
+    so helpers of synchronous views can be reused. """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                return JsonResponse({"detail": f"Method \"{request.method}\" not allowed."},
+                                    status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                request.data = parse_body(request)
+            except ValueError:
+                return JsonResponse({"message": "malformed request body"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            request.query_params = request.GET
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def parse_body(request):
+    if not request.body:
+        return QueryDict()
+    if request.content_type == "application/json":
+        return json.loads(request.body)
+    return request.POST
+
+
+def stream_asynchronously(response):
+    """ Content of streaming responses created by synchronous helpers is read from
+    database in a thread, chunk by chunk, instead of being loaded at once. """
+    if response.streaming and not response.is_async:
+        response.streaming_content = iterate_in_thread(response.streaming_content,
+                                                       settings.STREAM_CHUNK_SIZE)
+    return response
+
+
+async def iterate_in_thread(iterable, chunk_size):
+    iterator = iter(iterable)
+    next_chunk = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    chunk = await next_chunk()
+    while chunk:
+        for item in chunk:
+            yield item
+        chunk = await next_chunk()
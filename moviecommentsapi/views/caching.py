@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from ..models import ResourceVersion
+
+
+def conditional(*resources):
+    """ Lists are validated with versions of resources they are built from, read
+    with a single query before the list is. Clients having the current version
+    get 304 without the list being fetched or serialized at all. Resources can be
+    also given as a function returning them for a request. """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                etag, last_modified = await sync_to_async(get_validators)(request, resources)
+                response = get_conditional_response(request, etag, last_modified) or \
+                    await view(request, *args, **kwargs)
+                return set_validators(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            etag, last_modified = get_validators(request, resources)
+            response = get_conditional_response(request, etag, last_modified) or \
+                view(request, *args, **kwargs)
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def get_validators(request, resources):
+    """ ETag made of resource versions and query string, so every page, filter
+    and ordering of a list has its own one, and last modification timestamp,
+    unless the last modification was made in the current second. """
+    if len(resources) == 1 and callable(resources[0]):
+        resources = tuple(resources[0](request))
+    versions = ResourceVersion.get(*resources)
+    query_hash = hashlib.sha1(request.META.get("QUERY_STRING", "").encode()).hexdigest()[:16]
+    etag = quote_etag("-".join([*(str(versions[r][0]) for r in resources), query_hash]))
+    modified = [m for _, m in versions.values() if m is not None]
+    last_modified = int(max(modified).timestamp()) if modified else None
+    # Last-Modified has one-second resolution, a change made later in the same second
+    # would go unnoticed, so it's only used once that second is over
+    if last_modified is not None and last_modified >= int(time.time()):
+        return etag, None
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, max_age=settings.LIST_CACHE_MAX_AGE, must_revalidate=True)
+    return response
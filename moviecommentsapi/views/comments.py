@@ -1,12 +1,31 @@
-from django.http import JsonResponse
+from datetime import datetime, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view
+from rest_framework.utils import json
+
+from ..models import Movie, Comment, CommentDailyCount, ResourceVersion
+from ..search import CommentSearch
+from ..serializers import CommentSerializer, ValuesSerializer
+from .asynchronous import async_api_view, stream_asynchronously
+from .caching import conditional
+from .pagination import PaginationError, is_paginated, after_cursor, get_page, get_limit, \
+    get_offset
+
+
+comment_values_serializer = ValuesSerializer(CommentSerializer,
+                                             chunk_size=settings.STREAM_CHUNK_SIZE)
 
-from ..models import Movie, Comment
-from ..serializers import CommentSerializer
+# bucket of timeline -> number of days that surely reach into the next one
+TIMELINE_BUCKETS = {"day": 1, "week": 7, "month": 32}
 
 
 @api_view(['GET', 'POST'])
+@conditional(ResourceVersion.COMMENTS)
 def comments(request):
     if request.method == 'GET':
         return get_comments(request)
@@ -14,32 +33,191 @@ def comments(request):
         return post_comments(request)
 
 
+@async_api_view(['GET', 'POST'])
+@conditional(ResourceVersion.COMMENTS)
+async def async_comments(request):
+    if request.method == 'GET':
+        response = await sync_to_async(get_comments)(request)
+    elif request.method == 'POST':
+        response = await sync_to_async(post_comments)(request)
+    return stream_asynchronously(response)
+
+
+@api_view(['GET'])
+@conditional(ResourceVersion.COMMENTS)
+def search_comments(request):
+    try:
+        return get_search_results(request.query_params)
+    except PaginationError as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@conditional(ResourceVersion.COMMENTS)
+def comment_timeline(request):
+    return get_timeline(request.query_params)
+
+
 def get_comments(request):
-    if "id" in request.query_params:
-        return get_comments_for_movie(request.query_params.get("id"))
-    else:
-        return get_all_comments()
+    try:
+        if "id" in request.query_params:
+            return get_comments_for_movie(request.query_params.get("id"), request.query_params)
+        else:
+            return get_all_comments(request.query_params)
+    except PaginationError as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-def get_comments_for_movie(movie_id):
+def get_comments_for_movie(movie_id, query_params):
     try:
         movie = Movie.objects.get(pk=movie_id)
-        cmnts = Comment.for_movie(movie)
-        cs = CommentSerializer(cmnts, many=True)
-        return JsonResponse(cs.data, status=status.HTTP_200_OK, safe=False)
     except Movie.DoesNotExist:
         return JsonResponse({"message": "movie with given id not found"},
                             status=status.HTTP_404_NOT_FOUND)
     except ValueError:
         return JsonResponse({"message": "wrong id provided"}, status=status.HTTP_400_BAD_REQUEST)
+    return get_comments_list(Comment.objects.filter(movie=movie), query_params)
+
+
+def get_all_comments(query_params):
+    return get_comments_list(Comment.objects.all(), query_params)
+
+
+def get_comments_list(comments, query_params):
+    if "stream" in query_params:
+        return stream_comments(after_cursor(comments, query_params), query_params.get("stream"))
+    elif is_paginated(query_params):
+        page, next_cursor = get_page(comments, query_params)
+        return JsonResponse({"Results": list(comment_values_serializer.serialize(page)),
+                             "NextCursor": next_cursor}, status=status.HTTP_200_OK)
+    cmnts = list(comment_values_serializer.serialize(comments))
+    return JsonResponse(cmnts, status=status.HTTP_200_OK, safe=False)
+
+
+def get_search_results(query_params):
+    """ Comments containing every word of q, most relevant first, optionally
+    only of a single movie and from a date range, one page at a time. """
+    query = query_params.get("q", "")
+    if not query.strip():
+        return JsonResponse({"message": "no search query provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    movie_id = query_params.get("id")
+    if movie_id is not None:
+        try:
+            movie_id = int(movie_id)
+        except ValueError:
+            return JsonResponse({"message": "wrong id provided"},
+                                status=status.HTTP_400_BAD_REQUEST)
+        if not Movie.objects.filter(pk=movie_id).exists():
+            return JsonResponse({"message": "movie with given id not found"},
+                                status=status.HTTP_404_NOT_FOUND)
+    try:
+        date_from, date_to = (datetime.strptime(query_params[param], '%d %b %Y').date()
+                              if param in query_params else None for param in ("from", "to"))
+    except ValueError:
+        return JsonResponse({"message": "wrong date format provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    limit, offset = get_limit(query_params), get_offset(query_params)
+    found = CommentSearch.search(query, offset, limit + 1, movie_id, date_from, date_to)
+    page = found[:limit]
+    serialized = comment_values_serializer.serialize_grouped("id", [pk for pk, _ in page])
+    results = [dict(serialized[pk][0], Relevance=relevance)
+               for pk, relevance in page if pk in serialized]
+    return JsonResponse({"Results": results,
+                         "NextOffset": offset + limit if len(found) > limit else None},
+                        status=status.HTTP_200_OK)
+
+
+def get_timeline(query_params):
+    """ Number of comments given movies received in every day, week or month of date
+    range, including buckets without comments. Summed up from comment counts, so size
+    and cost of the response depend on the number of buckets, not of comments. """
+    bucket = query_params.get("bucket", "day")
+    if bucket not in TIMELINE_BUCKETS:
+        return JsonResponse({"message": f"wrong bucket provided, expected one of: "
+                                        f"{', '.join(TIMELINE_BUCKETS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        movie_ids = sorted({int(movie_id) for movie_id in query_params.getlist("id")})
+    except ValueError:
+        return JsonResponse({"message": "wrong id provided"}, status=status.HTTP_400_BAD_REQUEST)
+    if not movie_ids:
+        return JsonResponse({"message": "no movie id provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        date_from, date_to = (datetime.strptime(query_params[param], '%d %b %Y').date()
+                              for param in ("from", "to"))
+    except KeyError:
+        return JsonResponse({"message": "no date range provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return JsonResponse({"message": "wrong date format provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    max_buckets = settings.COMMENT_TIMELINE_MAX_BUCKETS // len(movie_ids)
+    starts = list(islice(bucket_starts(date_from, date_to, bucket), max_buckets + 1))
+    if not starts:
+        return JsonResponse({"message": "wrong date range provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if len(starts) > max_buckets:
+        return JsonResponse({"message": f"at most {settings.COMMENT_TIMELINE_MAX_BUCKETS} "
+                                        f"buckets can be returned at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if Movie.objects.filter(pk__in=movie_ids).count() != len(movie_ids):
+        return JsonResponse({"message": "movie with given id not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+    counts = {(movie_id, start): count for movie_id, start, count
+              in CommentDailyCount.timeline(movie_ids, date_from, date_to, bucket)}
+    timeline = [{"MovieId": movie_id,
+                 "Timeline": [{"Start": start.strftime('%d %b %Y'),
+                               "TotalComments": counts.get((movie_id, start), 0)}
+                              for start in starts]}
+                for movie_id in movie_ids]
+    return JsonResponse(timeline, status=status.HTTP_200_OK, safe=False)
+
+
+def bucket_of(day, bucket):
+    """ First day of bucket the day belongs to, weeks start on Monday. """
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    elif bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(date_from, date_to, bucket):
+    start = bucket_of(date_from, bucket)
+    while start <= date_to:
+        yield start
+        try:
+            start = bucket_of(start + timedelta(days=TIMELINE_BUCKETS[bucket]), bucket)
+        except OverflowError:
+            return
+
 
+def stream_comments(comments, stream_format):
+    """ Comments are fetched from database in chunks and serialized one by one
+    while response is being sent, so memory usage doesn't depend on their number. """
+    serialized = (json.dumps(c) for c in comment_values_serializer.serialize(comments))
+    if stream_format == "ndjson":
+        content = (f"{c}\n" for c in serialized)
+        return StreamingHttpResponse(content, content_type="application/x-ndjson")
+    elif stream_format == "json":
+        return StreamingHttpResponse(json_array_chunks(serialized),
+                                     content_type="application/json")
+    return JsonResponse({"message": "wrong stream format provided"},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-def get_all_comments():
-    cs = CommentSerializer(Comment.objects.all(), many=True)
-    return JsonResponse(cs.data, status=status.HTTP_200_OK, safe=False)
+
+def json_array_chunks(serialized):
+    yield "["
+    for i, item in enumerate(serialized):
+        yield f",{item}" if i else item
+    yield "]"
 
 
 def post_comments(request):
+    if isinstance(request.data, list):
+        return create_comments(request.data)
     try:
         return create_comment(request)
     except Movie.DoesNotExist:
@@ -58,3 +236,43 @@ def create_comment(request):
     comment = movie.comments.create(text=request.data["text"])
     cs = CommentSerializer(comment)
     return JsonResponse(cs.data, status=status.HTTP_201_CREATED)
+
+
+def create_comments(items):
+    """ Batch of comments is validated with a single query and saved in a single
+    transaction. Items that can't be saved are reported back by their index. """
+    if not items:
+        return JsonResponse({"message": "no comments provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.COMMENTS_BATCH_MAX_ITEMS:
+        return JsonResponse({"message": f"at most {settings.COMMENTS_BATCH_MAX_ITEMS} comments "
+                                        f"can be saved at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    parsed, errors = list(), list()
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item["text"], str):
+                raise TypeError
+            parsed.append((i, int(item["id"]), item["text"]))
+        except (KeyError, TypeError):
+            errors.append({"Index": i, "message": "no movie id or no comment text provided"})
+        except ValueError:
+            errors.append({"Index": i, "message": "wrong id provided"})
+    existing = set(Movie.objects.filter(pk__in={movie_id for _, movie_id, _ in parsed})
+                   .values_list("pk", flat=True))
+    comments = list()
+    for i, movie_id, text in parsed:
+        if movie_id in existing:
+            comments.append(Comment(movie_id=movie_id, text=text))
+        else:
+            errors.append({"Index": i, "message": "movie with given id not found"})
+    created = Comment.bulk_create(comments) if comments else list()
+    errors.sort(key=lambda e: e["Index"])
+    if not errors:
+        response_status = status.HTTP_201_CREATED
+    elif created:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return JsonResponse({"Created": CommentSerializer(created, many=True).data,
+                         "Errors": errors}, status=response_status)
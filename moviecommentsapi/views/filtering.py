@@ -0,0 +1,66 @@
+from django.db.models import Q
+
+from ..models import Movie
+
+
+class FilterError(Exception):
+    """ Filter params provided in request are incorrect. """
+    pass
+
+
+# fields holding comma separated lists, e.g. "English, Spanish"
+LIST_FILTERS = ("language", "country")
+NAME_FILTERS = ("director", "actors")
+
+
+def filter_movies(queryset, query_params):
+    """ Genres and values of list fields are matched as whole items, names as any
+    part of them and titles by their beginning, all regardless of case. Every param
+    can be given more than once, movies have to match all of its values. """
+    for value in get_values(query_params, "genre"):
+        queryset = queryset.filter(pk__in=genre_movie_ids(value))
+    for field in LIST_FILTERS:
+        for value in get_values(query_params, field):
+            queryset = queryset.filter(list_item_q(field, value))
+    for field in NAME_FILTERS:
+        for value in get_values(query_params, field):
+            queryset = queryset.filter(**{f"{field}__icontains": value})
+    for value in get_values(query_params, "title"):
+        queryset = queryset.filter(title__istartswith=value)
+    for value in get_values(query_params, "year"):
+        queryset = queryset.filter(**get_year_range(value))
+    return queryset
+
+
+def get_values(query_params, param):
+    return [value.strip() for value in query_params.getlist(param) if value.strip()]
+
+
+def genre_movie_ids(genre):
+    """ Served from genres table, names are found with index of upper cased names. """
+    return Movie.genres.through.objects.filter(genre__name__iexact=genre).values("movie_id")
+
+
+def list_item_q(field, value):
+    """ LIKE patterns only, so they can be served from trigram indexes. """
+    return Q(**{f"{field}__iexact": value}) | Q(**{f"{field}__istartswith": f"{value},"}) | \
+        Q(**{f"{field}__iendswith": f", {value}"}) | Q(**{f"{field}__icontains": f", {value},"})
+
+
+def get_year_range(value):
+    """ Single year, e.g. "2017", or inclusive range with optional ends,
+    e.g. "2010-2019", "2010-" or "-2019". """
+    try:
+        if "-" not in value:
+            return {"year": int(value)}
+        start, end = (part.strip() for part in value.split("-", 1))
+        year_range = dict()
+        if start:
+            year_range["year__gte"] = int(start)
+        if end:
+            year_range["year__lte"] = int(end)
+        if not year_range:
+            raise ValueError
+        return year_range
+    except ValueError:
+        raise FilterError("wrong year provided")
@@ -1,17 +1,39 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
 from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.urls import reverse
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.exceptions import APIException
 from rest_framework.utils import json
 
-from ..models import Movie
-from ..serializers import MovieSerializer
+from ..imports import MovieImporter
+from ..locks import single_flight
+from ..models import Movie, MovieLookup, ResourceVersion
+from ..serializers import MovieSerializer, ValuesSerializer
+from .asynchronous import async_api_view
+from .caching import conditional
+from .filtering import FilterError, filter_movies
+from .pagination import PaginationError, is_paginated, get_offset_page
+
+
+movie_values_serializer = ValuesSerializer(MovieSerializer)
 
 
 @api_view(['GET', 'POST'])
+@conditional(lambda request: get_resources(request.query_params))
 def movies(request):
     if request.method == 'GET':
         return get_movies(request)
@@ -20,31 +42,113 @@ def movies(request):
         return post_movies(request, details_provider)
 
 
+@async_api_view(['GET', 'POST'])
+@conditional(lambda request: get_resources(request.query_params))
+async def async_movies(request):
+    if request.method == 'GET':
+        return await sync_to_async(get_movies)(request)
+    elif request.method == 'POST':
+        details_provider = AsyncOMDbDetailsProvider()
+        return await async_post_movies(request, details_provider)
+
+
+@api_view(['POST'])
+def movies_import(request):
+    return import_movies(request, OMDbDetailsProvider)
+
+
+def import_movies(request, details_provider_factory):
+    """ Accepts a list of movie titles and/or movie documents in OMDb format. """
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return JsonResponse({"message": "no movie titles or details provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.MOVIE_IMPORT_MAX_ITEMS:
+        return JsonResponse({"message": f"at most {settings.MOVIE_IMPORT_MAX_ITEMS} movies "
+                                        f"can be imported at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    importer = MovieImporter(details_provider_factory, workers=settings.MOVIE_IMPORT_WORKERS,
+                             batch_size=settings.MOVIE_IMPORT_BATCH_SIZE)
+    report = importer.run(items)
+    return JsonResponse(report, status=status.HTTP_201_CREATED if report["Created"]
+                        else status.HTTP_200_OK)
+
+
 def get_movies(request):
-    mvs = MovieSerializer(Movie.objects.all(), many=True).data
-    sort_key = get_sorter(request.query_params)
-    if sort_key:
-        mvs.sort(key=sort_key)
+    """ Lists are serialized with fast read-only path, ratings of all
+    movies are fetched at once. """
+    try:
+        movies = filter_movies(Movie.objects.all(), request.query_params)
+    except FilterError as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    movies = movies.order_by(*get_ordering(request.query_params))
+    if is_paginated(request.query_params):
+        try:
+            page, next_offset = get_offset_page(movies, request.query_params)
+        except PaginationError as e:
+            return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"Results": list(movie_values_serializer.serialize(page)),
+                             "NextOffset": next_offset}, status=status.HTTP_200_OK)
+    mvs = list(movie_values_serializer.serialize(movies))
     return JsonResponse(mvs, status=status.HTTP_200_OK, safe=False)
 
 
-def get_sorter(query_params):
-    param = query_params.get("sort")
+def get_ordering(query_params):
+    """ Fields movies should be ordered by in database. Sort flag prefixed
+    with "-" reverses the order. Id is always the last field, so order of
+    movies with the same year or title is stable between pages. """
+    param = query_params.get("sort") or ""
+    descending = param.startswith("-")
+    param = param[1:] if descending else param
     year_flags = ("year", "Year", "y", "Y")
     title_flags = ("title", "Title", "t", "T")
+    comments_flags = ("comments", "Comments", "c", "C")
+    rating_flags = ("rating", "Rating", "r", "R")
+    votes_flags = ("votes", "Votes", "v", "V")
+    box_office_flags = ("boxoffice", "BoxOffice", "b", "B")
     both_flags = [f"{y}{t}" for y, t in zip(year_flags, title_flags)]
     if param in both_flags:
-        return lambda m: (m["Year"], m["Title"])
+        fields = ("year", "title")
     elif param in year_flags:
-        return lambda m: m["Year"]
+        fields = ("year",)
     elif param in title_flags:
-        return lambda m: m["Title"]
-    return False
+        fields = ("title",)
+    elif param in comments_flags:
+        fields = ("comment_count",)
+    elif param in rating_flags:
+        fields = ("imdb_rating_value",)
+    elif param in votes_flags:
+        fields = ("imdb_votes_value",)
+    elif param in box_office_flags:
+        fields = ("box_office_value",)
+    else:
+        return ("pk",)
+    if descending:
+        return tuple(order_nulls_last(f, descending) for f in fields) + ("-pk",)
+    return tuple(order_nulls_last(f, descending) for f in fields) + ("pk",)
+
+
+def order_nulls_last(field, descending):
+    """ Movies without typed value (OMDb sent "N/A") come last in both
+    directions, databases would put them first in one of them otherwise. """
+    if not Movie._meta.get_field(field).null:
+        return f"-{field}" if descending else field
+    return F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+
+
+def get_resources(query_params):
+    """ Resources list of movies depends on, movies sorted by number
+    of comments change their order with every new comment. """
+    if {"comment_count", "-comment_count"} & set(get_ordering(query_params)):
+        return ResourceVersion.MOVIES, ResourceVersion.COMMENTS
+    return (ResourceVersion.MOVIES,)
 
 
 def post_movies(request, details_provider):
     try:
         title = request.data["title"].strip()
+        if is_async_lookup(request) and not Movie.objects.filter(title__iexact=title).exists():
+            return queue_movie_lookup(title)
         return get_movie_by_title(title, details_provider)
     except KeyError:
         return JsonResponse({"message": "no movie title provided"},
@@ -58,6 +162,57 @@ def post_movies(request, details_provider):
         return get_movie_by_title(formal_title, details_provider)
 
 
+async def async_post_movies(request, details_provider):
+    """ Database is queried in a thread, while OMDb is waited for in the event loop. """
+    try:
+        title = request.data["title"].strip()
+        if is_async_lookup(request) and \
+                not await Movie.objects.filter(title__iexact=title).aexists():
+            return await sync_to_async(queue_movie_lookup)(title)
+        return await async_get_movie_by_title(title, details_provider)
+    except KeyError:
+        return JsonResponse({"message": "no movie title provided"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    except (APIException, ConnectionError) as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Movie.DuplicateError:
+        formal_title = details_provider.get_formal_title(title)
+        return await async_get_movie_by_title(formal_title, details_provider)
+
+
+def is_async_lookup(request):
+    """ Set with async param either in request body or in query string. """
+    param = request.data.get("async", getattr(request, "query_params", {}).get("async"))
+    if param is None:
+        return settings.MOVIES_ASYNC_LOOKUPS
+    return str(param) in ('True', 'true', 't', 'Yes', 'yes', 'y', '1')
+
+
+def queue_movie_lookup(title):
+    lookup = MovieLookup.enqueue(title)
+    return JsonResponse(serialize_lookup(lookup), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def movie_lookup(request, lookup_id):
+    try:
+        lookup = MovieLookup.objects.select_related("movie").get(pk=lookup_id)
+    except MovieLookup.DoesNotExist:
+        return JsonResponse({"message": "lookup with given id not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+    return JsonResponse(serialize_lookup(lookup), status=status.HTTP_200_OK)
+
+
+def serialize_lookup(lookup):
+    data = {"Id": lookup.pk, "Title": lookup.title, "Status": lookup.status,
+            "StatusUrl": reverse("moviecommentsapi:movie_lookup", args=[lookup.pk])}
+    if lookup.status == MovieLookup.DONE and lookup.movie:
+        data["Movie"] = MovieSerializer(lookup.movie).data
+    elif lookup.status == MovieLookup.FAILED:
+        data["message"] = lookup.error
+    return data
+
+
 def get_formal_title(title):
     provider = OMDbDetailsProvider()
     details = provider.get_details(title)
@@ -67,12 +222,25 @@ def get_formal_title(title):
 def get_movie_by_title(title, details_provider):
     if Movie.objects.filter(title__iexact=title).exists():
         return handle_existing_movie(title)
-    else:
+    with single_flight(f"title:{Movie.normalize_title(title)}"):
+        """ Only one of concurrent requests for the same title looks it up and
+        creates the movie, others wait and return movie it has created. """
+        if Movie.objects.filter(title__iexact=title).exists():
+            return handle_existing_movie(title)
         return handle_new_movie(title, details_provider)
 
 
+async def async_get_movie_by_title(title, details_provider):
+    """ Details are fetched before the movie is created with the synchronous path,
+    which gets them from the provider without blocking. """
+    if await Movie.objects.filter(title__iexact=title).aexists():
+        return await sync_to_async(handle_existing_movie)(title)
+    await details_provider.aget_details(title)
+    return await sync_to_async(get_movie_by_title)(title, details_provider)
+
+
 def handle_existing_movie(title):
-    movie = Movie.objects.filter(title__iexact=title).get()
+    movie = Movie.objects.filter(title__iexact=title).prefetch_related("ratings").get()
     ms = MovieSerializer(movie)
     return JsonResponse(ms.data, status=status.HTTP_200_OK)
 
@@ -84,26 +252,177 @@ def handle_new_movie(title, details_provider):
 
 
 class OMDbDetailsProvider(Movie.AbstractDetailsProvider):
+    NOT_FOUND_ERROR = "Movie not found!"
+    __session = None
+    __session_lock = threading.Lock()
+
     def __init__(self):
         self.__details = None
 
     def get_details(self, title):
-        """ Getting details lazily to avoid unnecessary or multiple calls. """
+        """ Getting details lazily to avoid unnecessary or multiple calls.
+        Responses are also shared between providers through OMDb cache. """
         if self.__details:
             return self.__details
         else:
-            response = requests.get(settings.OMDB_URL, {"apikey": settings.OMDB_KEY, "t": title})
-            response_json = json.loads(response.text)
-            if response_json.get("Response") == 'True':
-                self.__details = json.loads(response.text)
-                return self.__details
-            elif response_json.get("Response") == 'False':
-                raise APIException(response_json.get("Error"))
-            else:
-                raise APIException("problem with external API occurred")
+            response_json = OMDbDetailsProvider.get_cached_response(title)
+            if response_json is None:
+                response_json = OMDbDetailsProvider.fetch_details(title)
+                OMDbDetailsProvider.cache_response(title, response_json)
+            self.__details = OMDbDetailsProvider.check_response(response_json)
+            return self.__details
 
     def get_formal_title(self, title):
         return self.get_details(title).get("Title")
 
     def get_serializer(self, **kwargs):
         return MovieSerializer(**kwargs)
+
+    @staticmethod
+    def check_response(response_json):
+        if response_json.get("Response") == 'True':
+            return response_json
+        elif response_json.get("Response") == 'False':
+            raise APIException(response_json.get("Error"))
+        else:
+            raise APIException("problem with external API occurred")
+
+    @staticmethod
+    def fetch_details(title):
+        try:
+            response = OMDbDetailsProvider.get_session().get(
+                settings.OMDB_URL, params={"apikey": settings.OMDB_KEY, "t": title},
+                timeout=(settings.OMDB_CONNECT_TIMEOUT, settings.OMDB_READ_TIMEOUT))
+            if response.status_code >= 500:
+                raise requests.HTTPError(response=response)
+            return json.loads(response.text)
+        except (requests.RequestException, ValueError):
+            """ timeouts, server errors left after retries and responses that aren't JSON """
+            raise APIException("problem with external API occurred")
+
+    @classmethod
+    def get_session(cls):
+        """ Session is shared by all providers in the process, so connections
+        to OMDb are pooled and kept alive between requests. """
+        with cls.__session_lock:
+            if cls.__session is None:
+                retry = Retry(total=settings.OMDB_MAX_RETRIES,
+                              backoff_factor=settings.OMDB_RETRY_BACKOFF,
+                              status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OMDB_POOL_SIZE,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls.__session = session
+            return cls.__session
+
+    @classmethod
+    def close_session(cls):
+        """ Closes pooled connections, next lookup will create a new session
+        with current settings. """
+        with cls.__session_lock:
+            if cls.__session is not None:
+                cls.__session.close()
+                cls.__session = None
+
+    @staticmethod
+    def get_cache_key(title):
+        normalized = Movie.normalize_title(title)
+        return f"omdb:{hashlib.sha1(normalized.encode()).hexdigest()}"
+
+    @staticmethod
+    def get_cached_response(title):
+        return caches[settings.OMDB_CACHE].get(OMDbDetailsProvider.get_cache_key(title))
+
+    @staticmethod
+    def cache_response(title, response_json):
+        """ Found movies are cached under both requested and formal title. Movies that
+        don't exist are cached for a shorter time, other errors aren't cached at all. """
+        cache = caches[settings.OMDB_CACHE]
+        if response_json.get("Response") == 'True':
+            titles = {title, response_json.get("Title") or title}
+            cache.set_many({OMDbDetailsProvider.get_cache_key(t): response_json for t in titles},
+                           settings.OMDB_CACHE_TIMEOUT)
+        elif response_json.get("Error") == OMDbDetailsProvider.NOT_FOUND_ERROR:
+            cache.set(OMDbDetailsProvider.get_cache_key(title), response_json,
+                      settings.OMDB_CACHE_NOT_FOUND_TIMEOUT)
+
+
+class AsyncOMDbDetailsProvider(OMDbDetailsProvider):
+    """ Looks movies up with async HTTP client, so a worker serves other requests
+    while waiting for OMDb. Details fetched with aget_details are kept and
+    returned by get_details, so provider can be passed to Movie.create. """
+    __clients = weakref.WeakKeyDictionary()
+    __in_flight = dict()
+
+    def __init__(self):
+        super().__init__()
+        self.__details = None
+
+    async def aget_details(self, title):
+        if self.__details is None:
+            response_json = await AsyncOMDbDetailsProvider.get_response(title)
+            self.__details = OMDbDetailsProvider.check_response(response_json)
+        return self.__details
+
+    def get_details(self, title):
+        return self.__details or super().get_details(title)
+
+    @classmethod
+    async def get_response(cls, title):
+        """ Concurrent lookups of the same title share a single OMDb request. """
+        response_json = await sync_to_async(OMDbDetailsProvider.get_cached_response)(title)
+        if response_json is not None:
+            return response_json
+        key = OMDbDetailsProvider.get_cache_key(title)
+        task = cls.__in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(cls.fetch_and_cache_details(title))
+            cls.__in_flight[key] = task
+            task.add_done_callback(lambda _: cls.__in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def fetch_and_cache_details(cls, title):
+        response_json = await cls.async_fetch_details(title)
+        await sync_to_async(OMDbDetailsProvider.cache_response)(title, response_json)
+        return response_json
+
+    @classmethod
+    async def async_fetch_details(cls, title):
+        """ Timeouts and retries of temporary failures are the same as in
+        synchronous lookups. """
+        timeout = httpx.Timeout(settings.OMDB_READ_TIMEOUT, connect=settings.OMDB_CONNECT_TIMEOUT)
+        for attempt in range(settings.OMDB_MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(settings.OMDB_RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                response = await cls.get_client().get(
+                    settings.OMDB_URL, params={"apikey": settings.OMDB_KEY, "t": title},
+                    timeout=timeout)
+            except httpx.TransportError:
+                continue
+            if response.status_code < 500:
+                try:
+                    return json.loads(response.text)
+                except ValueError:
+                    break
+        raise APIException("problem with external API occurred")
+
+    @classmethod
+    def get_client(cls):
+        """ Client is shared by all lookups made in the event loop, so connections
+        to OMDb are pooled and kept alive between requests. """
+        loop = asyncio.get_running_loop()
+        if loop not in cls.__clients:
+            limits = httpx.Limits(max_connections=None,
+                                  max_keepalive_connections=settings.OMDB_POOL_SIZE)
+            cls.__clients[loop] = httpx.AsyncClient(limits=limits)
+        return cls.__clients[loop]
+
+    @classmethod
+    async def close_client(cls):
+        client = cls.__clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
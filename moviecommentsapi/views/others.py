@@ -1,20 +1,70 @@
-from datetime import datetime
+from datetime import date, datetime
 
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.decorators import api_view
 
-from ..models import Movie, Comment
+from ..models import Movie, CommentDailyCount, ResourceVersion, TrendingScore
+from ..parsing import TYPED_FIELDS
+from ..ranking import dense_ranks, rank_pairs
+from ..ranking_cache import RankingCache
+from .asynchronous import async_api_view
+from .caching import conditional
+from .pagination import PaginationError, get_limit
+
+# metric name, as in OMDb details -> typed field movies are ranked by
+METRICS = {"imdbRating": "imdb_rating_value", "imdbVotes": "imdb_votes_value",
+           "Metascore": "metascore_value", "BoxOffice": "box_office_value"}
 
 
 @api_view(['GET'])
 def top(request):
+    return get_top(request.query_params)
+
+
+@async_api_view(['GET'])
+async def async_top(request):
+    return await sync_to_async(get_top)(request.query_params)
+
+
+@api_view(['GET'])
+@conditional(ResourceVersion.MOVIES)
+def top_metrics(request):
     try:
-        date_from, date_to = request.query_params.get("from"), request.query_params.get("to")
-        date_from, date_to = datetime.strptime(date_from, '%d %b %Y'), datetime.strptime(date_to,
-                                                                                         '%d %b %Y')
-        include_all = include_all_param_to_bool(request.query_params)
-        return JsonResponse(get_ranking(date_from, date_to, include_all), safe=False)
+        return get_top_by_metric(request.query_params)
+    except PaginationError as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def trending(request):
+    try:
+        return get_trending(request.query_params)
+    except PaginationError as e:
+        return JsonResponse({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def top_cache(request):
+    """ Hit and miss counters of rankings cache. """
+    return JsonResponse(RankingCache.stats())
+
+
+def get_top(query_params):
+    include_all = param_to_bool(query_params, 'include_all')
+    if param_to_bool(query_params, 'all_time'):
+        """ cached as a range containing every possible day """
+        ranking = RankingCache.get_or_compute(date.min, date.max, include_all,
+                                              lambda: get_all_time_ranking(include_all))
+        return JsonResponse(ranking, safe=False)
+    try:
+        date_from, date_to = query_params.get("from"), query_params.get("to")
+        date_from, date_to = datetime.strptime(date_from, '%d %b %Y').date(), \
+            datetime.strptime(date_to, '%d %b %Y').date()
+        ranking = RankingCache.get_or_compute(date_from, date_to, include_all,
+                                              lambda: get_ranking(date_from, date_to, include_all))
+        return JsonResponse(ranking, safe=False)
     except (KeyError, TypeError):
         return JsonResponse({"message": "no date range provided"},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -23,31 +73,49 @@ def top(request):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
-def include_all_param_to_bool(req_params):
-    if req_params.get('include_all') in ('True', 'true', 't', 'Yes', 'yes', 'y', '1'):
+def param_to_bool(req_params, name):
+    if req_params.get(name) in ('True', 'true', 't', 'Yes', 'yes', 'y', '1'):
         return True
     return False
 
 
 def get_ranking(date_from, date_to, include_all):
-    if include_all:
-        return prepare_ranking(date_from, date_to, Movie.objects.all())
-    comments = Comment.in_range(date_from, date_to)
-    movies = list(set([comment.movie for comment in comments]))
-    return prepare_ranking(date_from, date_to, movies)
-
-
-def prepare_ranking(date_from, date_to, movies):
-    ranking = list()
-    for movie in movies:
-        ranking.append({"MovieId": movie.pk,
-                        "TotalComments": Comment.sum_for_movie_in_range(movie, date_from, date_to)})
-    ranking.sort(key=lambda m: m["MovieId"])
-    ranking.sort(key=lambda m: m["TotalComments"], reverse=True)
-    rank = 1
-    for i, movie in enumerate(ranking):
-        movie.update({"Rank": rank})
-        is_last_iter = i + 1 <= (len(ranking) - 1)
-        if is_last_iter and movie["TotalComments"] != ranking[i + 1]["TotalComments"]:
-            rank += 1
-    return ranking
+    return prepare_ranking(CommentDailyCount.totals_in_range(date_from, date_to, include_all))
+
+
+def get_all_time_ranking(include_all):
+    return prepare_ranking(CommentDailyCount.totals_all_time(include_all))
+
+
+def prepare_ranking(totals):
+    """ Ranking of unordered (movie id, number of comments) pairs, sorted and
+    ranked on columns, so the database doesn't have to sort them as well. """
+    return [{"MovieId": movie_id, "TotalComments": total, "Rank": rank}
+            for movie_id, total, rank in zip(*rank_pairs(totals))]
+
+
+def get_top_by_metric(query_params):
+    """ Top movies by OMDb metric, movies without its value are left out. Ties are
+    listed by ascending id, as in rankings by comments. Read from (metric descending,
+    id) index, so only the returned movies are visited. """
+    metric = query_params.get("metric")
+    if metric not in METRICS:
+        return JsonResponse({"message": f"wrong metric provided, expected one of: "
+                                        f"{', '.join(METRICS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+    field, limit = METRICS[metric], get_limit(query_params)
+    text_field = TYPED_FIELDS[field][0]
+    rows = list(Movie.objects.filter(**{f"{field}__isnull": False})
+                .order_by(f"-{field}", "pk")
+                .values_list("pk", "title", text_field, field)[:limit])
+    ranking = [{"MovieId": movie_id, "Title": title, metric: text, "Rank": rank}
+               for (movie_id, title, text, _), rank in zip(rows, dense_ranks(r[3] for r in rows))]
+    return JsonResponse(ranking, safe=False)
+
+
+def get_trending(query_params):
+    """ Movies commented the most recently, read from maintained trending scores. """
+    scores = TrendingScore.top(get_limit(query_params))
+    ranking = [{"MovieId": movie_id, "Score": score, "Rank": rank}
+               for (movie_id, score), rank in zip(scores, dense_ranks(s for _, s in scores))]
+    return JsonResponse(ranking, safe=False)
@@ -0,0 +1,70 @@
+from django.conf import settings
+
+
+class PaginationError(Exception):
+    """ Pagination params provided in request are incorrect. """
+    pass
+
+
+def is_paginated(query_params):
+    return any(param in query_params for param in ("limit", "cursor", "offset"))
+
+
+def get_limit(query_params):
+    try:
+        limit = int(query_params.get("limit", settings.PAGE_SIZE))
+    except ValueError:
+        raise PaginationError("wrong limit provided")
+    if limit < 1:
+        raise PaginationError("wrong limit provided")
+    return min(limit, settings.MAX_PAGE_SIZE)
+
+
+def get_cursor(query_params):
+    """ Cursor is the id of the last object on the previous page. """
+    try:
+        cursor = query_params.get("cursor")
+        return int(cursor) if cursor else None
+    except ValueError:
+        raise PaginationError("wrong cursor provided")
+
+
+def get_offset(query_params):
+    try:
+        offset = int(query_params.get("offset", 0))
+    except ValueError:
+        raise PaginationError("wrong offset provided")
+    if offset < 0:
+        raise PaginationError("wrong offset provided")
+    return offset
+
+
+def after_cursor(queryset, query_params):
+    """ Keyset pagination, objects are ordered by id, so next page
+    is always served from index, no matter how far it is. """
+    cursor = get_cursor(query_params)
+    queryset = queryset.order_by("pk")
+    return queryset.filter(pk__gt=cursor) if cursor is not None else queryset
+
+
+def get_page(queryset, query_params):
+    """ Returns queryset of objects on requested page and cursor of the next
+    page, or None if there are no more pages. Page boundaries are found with
+    ids only, so whole objects are loaded just for the requested page. """
+    limit = get_limit(query_params)
+    queryset = after_cursor(queryset, query_params)
+    ids = list(queryset.values_list("pk", flat=True)[:limit + 1])
+    if len(ids) > limit:
+        return queryset.filter(pk__in=ids[:limit]), ids[limit - 1]
+    return queryset.filter(pk__in=ids), None
+
+
+def get_offset_page(queryset, query_params):
+    """ Returns queryset of objects on requested page and offset of the next page,
+    or None if there are no more pages. Used where objects can be ordered
+    by other fields than id, so keyset pagination can't be applied. """
+    limit, offset = get_limit(query_params), get_offset(query_params)
+    ids = list(queryset.values_list("pk", flat=True)[offset:offset + limit + 1])
+    if len(ids) > limit:
+        return queryset.filter(pk__in=ids[:limit]), offset + limit
+    return queryset.filter(pk__in=ids), None